@@ -0,0 +1 @@
+pytest_plugins = ['daemoniser.testing']
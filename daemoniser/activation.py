@@ -0,0 +1,138 @@
+"""The :mod:`daemoniser.activation` module supports socket activation:
+listening sockets that are bound before the daemon starts and handed
+over to it.
+
+Sockets can be inherited from a supervisor that follows the
+``LISTEN_FDS``/``LISTEN_PID`` convention (as used by systemd) or bound
+by the launching process itself with :func:`bind`.  Either way, clients
+can connect (and queue in the listen backlog) while the daemon is still
+starting up.
+
+"""
+__all__ = [
+    "LISTEN_FDS_START",
+    "listen_fds",
+    "bind",
+    "from_fd",
+]
+
+import os
+import stat
+import errno
+import socket
+
+from logga.log import log
+
+#: First inherited file descriptor under the ``LISTEN_FDS`` convention.
+LISTEN_FDS_START = 3
+
+
+def listen_fds(unset_environment=True):
+    """File descriptors passed to this process by a socket activating
+    supervisor.
+
+    The descriptors are only considered ours if ``LISTEN_PID`` matches
+    the current PID.  Call this before forking.
+
+    **Kwargs:**
+        unset_environment (boolean): Remove the ``LISTEN_*`` variables
+        so that they are not passed on to child processes.
+
+    **Returns:**
+        list of inherited file descriptor numbers
+
+    """
+    fds = []
+
+    try:
+        listen_pid = int(os.environ.get('LISTEN_PID', 0))
+        count = int(os.environ.get('LISTEN_FDS', 0))
+    except ValueError as error:
+        log.warn('Invalid socket activation environment: %s' % error)
+        listen_pid = count = 0
+
+    if listen_pid == os.getpid() and count > 0:
+        fds = list(range(LISTEN_FDS_START, LISTEN_FDS_START + count))
+        log.debug('Inherited listening file descriptors: %s' % fds)
+
+    if unset_environment:
+        for name in ('LISTEN_PID', 'LISTEN_FDS', 'LISTEN_FDNAMES'):
+            os.environ.pop(name, None)
+
+    return fds
+
+
+def from_fd(fd):
+    """Wrap inherited file descriptor *fd* in a :class:`socket.socket`.
+
+    The socket family and type are detected from the descriptor.
+
+    """
+    sock = socket.socket(fileno=fd)
+    sock.set_inheritable(True)
+
+    return sock
+
+
+def _remove_stale(path):
+    """Remove the Unix domain socket at *path* if nothing is listening
+    on it.  Anything else at *path* is left for :meth:`socket.bind` to
+    fail on.
+
+    """
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        return
+
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError as error:
+        if error.errno == errno.ECONNREFUSED:
+            log.debug('Removing stale socket "%s"' % path)
+            os.remove(path)
+    finally:
+        probe.close()
+
+
+def bind(address, backlog=128):
+    """Create a listening socket for *address*.
+
+    A stale Unix domain socket left at *address* by a process that has
+    gone is replaced.  A live socket is never removed.
+
+    **Args:**
+        address: Either a filesystem path (``AF_UNIX``), a
+        ``"host:port"`` string or a ``(host, port)`` tuple.
+
+    **Kwargs:**
+        backlog (int): Listen queue length.
+
+    **Returns:**
+        inheritable, listening :class:`socket.socket`
+
+    **Raises:**
+        ``OSError`` if *address* is in use
+
+    """
+    if isinstance(address, str) and os.sep in address:
+        family = socket.AF_UNIX
+        _remove_stale(address)
+    else:
+        if isinstance(address, str):
+            (host, port) = address.rsplit(':', 1)
+            address = (host.strip('[]'), int(port))
+        family = socket.AF_INET6 if ':' in address[0] else socket.AF_INET
+
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    if family != socket.AF_UNIX:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind(address)
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    log.debug('Bound listening socket on %s' % (address,))
+
+    return sock
@@ -0,0 +1,220 @@
+"""The :mod:`daemoniser.autoscale` module sizes a
+:class:`daemoniser.pool.WorkerPool` to match the current load.
+
+"""
+__all__ = [
+    "Autoscaler",
+    "host_load",
+]
+
+import os
+import time
+
+from logga.log import log
+
+
+def host_load():
+    """One minute load average per CPU from ``/proc/loadavg``.
+
+    **Returns:**
+        load per CPU or ``None`` if it cannot be determined
+
+    """
+    try:
+        with open('/proc/loadavg') as loadavg:
+            load = float(loadavg.read().split()[0])
+    except (IOError, OSError, IndexError, ValueError) as error:
+        log.debug('Unable to read host load: %s' % error)
+        return None
+
+    return load / (os.cpu_count() or 1)
+
+
+class Autoscaler(object):
+    """Load driven worker count policy with hysteresis and cooldown.
+
+    Each :meth:`sample` of the pool derives the worker busy ratio (the
+    share of wall time the workers spent inside
+    :meth:`daemoniser.pool.WorkerContext.busy`) and the run-queue depth
+    per worker.  :meth:`decide` then applies these rules:
+
+    * scale up by :attr:`step` when busy ratio exceeds :attr:`high` or the
+      queue depth per worker exceeds :attr:`queue_high` -- unless the host
+      itself is saturated (load per CPU over :attr:`load_high`)
+    * scale down by :attr:`step` when busy ratio is under :attr:`low`
+      and the queue is empty
+    * never change more often than once per :attr:`cooldown` seconds
+
+    The gap between :attr:`low` and :attr:`high` keeps the pool from
+    flapping.
+
+    .. attribute:: min_workers
+
+        lower bound on the number of workers
+
+    .. attribute:: max_workers
+
+        upper bound on the number of workers
+
+    .. attribute:: high
+
+        busy ratio above which to scale up
+
+    .. attribute:: low
+
+        busy ratio below which to scale down
+
+    .. attribute:: queue_high
+
+        queue depth per worker above which to scale up
+
+    .. attribute:: load_high
+
+        host load per CPU above which scaling up is suppressed
+
+    .. attribute:: cooldown
+
+        minimum seconds between scaling decisions
+
+    .. attribute:: step
+
+        number of workers to add or remove per decision
+
+    """
+
+    def __init__(self,
+                 min_workers,
+                 max_workers,
+                 high=0.8,
+                 low=0.3,
+                 queue_high=2.0,
+                 load_high=1.5,
+                 cooldown=30.0,
+                 step=1,
+                 queue_depth=None):
+        """Autoscaler initialiser.
+
+        **Args:**
+            min_workers (int): Lower bound on the number of workers.
+
+            max_workers (int): Upper bound on the number of workers.
+
+        **Kwargs:**
+            queue_depth (callable): Returns the current run-queue depth.
+
+            (other keyword arguments set the attributes of the same name)
+
+        """
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.high = high
+        self.low = low
+        self.queue_high = queue_high
+        self.load_high = load_high
+        self.cooldown = cooldown
+        self.step = step
+        self._queue_depth = queue_depth
+
+        self._last_change = None
+        self._last_sample = None
+
+    def sample(self, pool):
+        """Measure the load signals of *pool* since the previous sample.
+
+        **Returns:**
+            dictionary with ``busy``, ``queue`` (per worker) and ``load``
+            (per CPU) entries (``None`` where not available)
+
+        """
+        now = time.monotonic()
+        busy_usec = pool.busy_usec()
+
+        busy = None
+        if self._last_sample is not None and pool.size:
+            (then, then_usec) = self._last_sample
+            elapsed = (now - then) * 1000000 * pool.size
+            if elapsed > 0:
+                busy = max(0.0, (busy_usec - then_usec) / elapsed)
+        self._last_sample = (now, busy_usec)
+
+        queue = None
+        if self._queue_depth is not None:
+            queue = self._queue_depth() / float(max(pool.size, 1))
+
+        return {'busy': busy, 'queue': queue, 'load': host_load()}
+
+    def decide(self, current, signals):
+        """Choose the worker count for the given load *signals*.
+
+        **Args:**
+            current (int): Current number of workers.
+
+            signals (dict): As returned by :meth:`sample`.
+
+        **Returns:**
+            tuple of the target worker count and the reason for the
+            decision
+
+        """
+        target = max(self.min_workers, min(current, self.max_workers))
+        if target != current:
+            return (target, 'outside bounds %d-%d' %
+                    (self.min_workers, self.max_workers))
+
+        now = time.monotonic()
+        if (self._last_change is not None and
+           now - self._last_change < self.cooldown):
+            return (current, 'cooldown')
+
+        busy = signals.get('busy')
+        queue = signals.get('queue')
+        load = signals.get('load')
+
+        reason = None
+        if busy is not None and busy > self.high:
+            reason = 'busy ratio %.2f > %.2f' % (busy, self.high)
+        elif queue is not None and queue > self.queue_high:
+            reason = ('queue depth %.1f/worker > %.1f' %
+                      (queue, self.queue_high))
+
+        if reason is not None and current < self.max_workers:
+            if load is not None and load > self.load_high:
+                return (current, '%s but host load %.2f/cpu > %.2f' %
+                        (reason, load, self.load_high))
+            target = min(current + self.step, self.max_workers)
+        elif (reason is None and
+              busy is not None and
+              busy < self.low and
+              not queue and
+              current > self.min_workers):
+            reason = 'busy ratio %.2f < %.2f' % (busy, self.low)
+            target = max(current - self.step, self.min_workers)
+        else:
+            return (current, 'steady')
+
+        self._last_change = now
+
+        return (target, reason)
+
+    def scale(self, pool):
+        """Run one scaling cycle against *pool*.
+
+        Exited workers are reaped (and replaced), the load is sampled and
+        the pool is resized.  Every change in size is logged along with
+        the signal that triggered it.
+
+        **Returns:**
+            the pool size after the cycle
+
+        """
+        pool.reap()
+        signals = self.sample(pool)
+        (target, reason) = self.decide(pool.size, signals)
+        if target != pool.size:
+            log.info('Autoscaler -- %d -> %d workers: %s' %
+                     (pool.size, target, reason))
+            pool.resize(target)
+        else:
+            log.debug('Autoscaler -- %d workers: %s' % (pool.size, reason))
+
+        return pool.size
@@ -0,0 +1,197 @@
+"""The :mod:`daemoniser.checkpoint` module saves and restores daemon
+state snapshots so that a restarted daemon can come back warm.
+
+Snapshots use :mod:`pickle` protocol 5.  Large binary payloads wrapped
+in :class:`pickle.PickleBuffer` (and objects such as ``numpy`` arrays
+that support out-of-band pickling) are written outside of the pickle
+stream, aligned to page boundaries.  On :func:`load` those payloads
+are returned as :class:`memoryview` objects over a read-only memory
+mapping of the snapshot, so they are never copied.
+
+Unpickling runs arbitrary code, so snapshots are private to the daemon
+user (mode ``0600``) and :func:`load` refuses any other snapshot.
+
+"""
+__all__ = [
+    "save",
+    "load",
+    "CheckpointError",
+]
+
+import os
+import mmap
+import stat
+import pickle
+import struct
+import tempfile
+
+from logga.log import log
+
+MAGIC = b'DMNS'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('=4sHHIQQ')
+BUFFER = struct.Struct('=QQ')
+
+
+class CheckpointError(Exception):
+    """Raised when a snapshot cannot be written or is corrupt.
+
+    .. attribute:: msg
+
+        An explanation of the error.
+    """
+
+    def __init__(self, value):
+        self.msg = value
+
+    def __str__(self):
+        return repr(self.msg)
+
+
+def _align(size, alignment=mmap.PAGESIZE):
+    return (size + alignment - 1) // alignment * alignment
+
+
+def save(path, state, version=0):
+    """Write *state* to the snapshot file *path*.
+
+    The snapshot is written to a private (mode ``0600``) temporary file
+    in the same directory, flushed to disk and renamed over *path*, so a
+    crash mid-write never leaves a partial snapshot behind.
+
+    **Args:**
+        path (str): Snapshot file location.
+
+        state: Any picklable object.
+
+    **Kwargs:**
+        version (int): Application defined state version.  :func:`load`
+        ignores snapshots with a different version.
+
+    **Returns:**
+        size of the snapshot in bytes
+
+    **Raises:**
+        :class:`CheckpointError` if *state* cannot be serialised
+
+        ``BufferError`` if an out-of-band buffer is not contiguous
+
+    """
+    buffers = []
+    try:
+        data = pickle.dumps(state,
+                            protocol=5,
+                            buffer_callback=buffers.append)
+    except (pickle.PicklingError, TypeError, AttributeError) as error:
+        raise CheckpointError('Unable to serialise state: %s' % error)
+
+    table_offset = HEADER.size + len(data)
+    offset = _align(table_offset + BUFFER.size * len(buffers))
+    table = []
+    raws = []
+    for buf in buffers:
+        raw = buf.raw()
+        table.append(BUFFER.pack(offset, raw.nbytes))
+        raws.append((offset, raw))
+        offset = _align(offset + raw.nbytes)
+
+    (fd, tmp_path) = tempfile.mkstemp(prefix='%s.' % os.path.basename(path),
+                                      suffix='.tmp',
+                                      dir=os.path.dirname(path) or '.')
+    try:
+        with os.fdopen(fd, 'wb') as snapshot:
+            snapshot.write(HEADER.pack(MAGIC,
+                                       FORMAT_VERSION,
+                                       0,
+                                       version,
+                                       len(data),
+                                       len(buffers)))
+            snapshot.write(data)
+            snapshot.write(b''.join(table))
+            for (buf_offset, raw) in raws:
+                snapshot.seek(buf_offset)
+                snapshot.write(raw)
+            size = snapshot.tell()
+            snapshot.flush()
+            os.fsync(snapshot.fileno())
+        os.rename(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    log.debug('Checkpoint wrote %d bytes (%d out-of-band buffers) to "%s"' %
+              (size, len(buffers), path))
+
+    return size
+
+
+def load(path, version=0):
+    """Read the snapshot file *path*.
+
+    **Args:**
+        path (str): Snapshot file location.
+
+    **Kwargs:**
+        version (int): Expected application defined state version.
+
+    **Returns:**
+        the restored state or ``None`` if there is no usable snapshot
+
+    **Raises:**
+        :class:`CheckpointError` if the snapshot is corrupt, or is not
+        owned by the current user with mode ``0600``
+
+    """
+    try:
+        with open(path, 'rb') as snapshot:
+            info = os.fstat(snapshot.fileno())
+            if (info.st_uid != os.getuid() or
+                    stat.S_IMODE(info.st_mode) != 0o600):
+                raise CheckpointError('Checkpoint "%s" is not private to '
+                                      'UID %d (owner %d, mode %o)' %
+                                      (path,
+                                       os.getuid(),
+                                       info.st_uid,
+                                       stat.S_IMODE(info.st_mode)))
+            if not info.st_size:
+                return None
+            view = mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ)
+    except (IOError, OSError) as error:
+        log.debug('No checkpoint at "%s": %s' % (path, error))
+        return None
+
+    try:
+        (magic,
+         format_version,
+         _,
+         state_version,
+         length,
+         count) = HEADER.unpack_from(view, 0)
+    except struct.error as error:
+        raise CheckpointError('Truncated checkpoint "%s": %s' % (path, error))
+
+    if magic != MAGIC or format_version != FORMAT_VERSION:
+        raise CheckpointError('Checkpoint "%s" has an unknown format' % path)
+
+    if state_version != version:
+        log.warn('Checkpoint "%s" is version %d (expected %d) -- ignored' %
+                 (path, state_version, version))
+        return None
+
+    memory = memoryview(view)
+    table_offset = HEADER.size + length
+    buffers = []
+    for index in range(count):
+        (offset, size) = BUFFER.unpack_from(view,
+                                            table_offset + index * BUFFER.size)
+        buffers.append(memory[offset:offset + size])
+
+    try:
+        state = pickle.loads(memory[HEADER.size:table_offset],
+                             buffers=buffers)
+    except Exception as error:
+        raise CheckpointError('Corrupt checkpoint "%s": %s' % (path, error))
+
+    log.debug('Checkpoint restored from "%s"' % path)
+
+    return state
@@ -0,0 +1,220 @@
+"""The :mod:`daemoniser.counters` module provides lock-free counters and
+gauges shared between a master process and its forked workers.
+
+"""
+__all__ = [
+    "Counters",
+    "CounterSlot",
+]
+
+import os
+import mmap
+import struct
+
+from logga.log import log
+
+MAGIC = b'DMNC'
+HEADER = struct.Struct('=4sIIII')
+CACHE_LINE = 64
+VALUE_SIZE = 8
+
+
+def _align(size):
+    return (size + CACHE_LINE - 1) // CACHE_LINE * CACHE_LINE
+
+
+class Counters(object):
+    """Registry of named 64-bit values with one slot per worker.
+
+    The registry is a single shared memory mapping that must be created
+    in the master *before* workers are forked.  Each worker then writes
+    only to its own slot (see :meth:`slot`) so increments need no locks
+    and slots never share a cache line.  Totals are calculated by
+    summing the slots in place (see :meth:`totals`).
+
+    If *path* is given the mapping is backed by that file so that an
+    unrelated process (for example, the ``status`` command) can
+    :meth:`attach` to it and read the values.
+
+    .. attribute:: names
+
+        tuple of counter names
+
+    .. attribute:: slots
+
+        number of worker slots
+
+    .. attribute:: path
+
+        location of the backing file (``None`` for anonymous memory)
+
+    """
+    _path = None
+
+    def __init__(self, names, slots, path=None, _create=True):
+        """Counters initialiser.
+
+        **Args:**
+            names (list): Counter and gauge names.
+
+            slots (int): Number of worker slots.
+
+        **Kwargs:**
+            path (str): Location of the backing file.
+
+        """
+        self._names = tuple(names)
+        self._slots = slots
+        self._path = path
+        self._index = dict((name, i) for i, name in enumerate(self._names))
+
+        blob = '\n'.join(self._names).encode('utf-8')
+        self._data_offset = _align(HEADER.size + len(blob))
+        self._stride = _align(len(self._names) * VALUE_SIZE) // VALUE_SIZE
+        size = self._data_offset + slots * self._stride * VALUE_SIZE
+
+        if path is None:
+            self._mmap = mmap.mmap(-1, size)
+        else:
+            flags = os.O_RDWR | os.O_CREAT if _create else os.O_RDONLY
+            fd = os.open(path, flags, 0o644)
+            try:
+                if _create:
+                    os.ftruncate(fd, size)
+                    self._mmap = mmap.mmap(fd, size)
+                else:
+                    self._mmap = mmap.mmap(fd, size, access=mmap.ACCESS_READ)
+            finally:
+                os.close(fd)
+
+        if _create:
+            HEADER.pack_into(self._mmap, 0, MAGIC, 1, slots,
+                             len(self._names), len(blob))
+            self._mmap[HEADER.size:HEADER.size + len(blob)] = blob
+
+        data = memoryview(self._mmap)[self._data_offset:size]
+        self._values = data.cast('q')
+
+    @classmethod
+    def attach(cls, path):
+        """Open an existing, file backed registry read-only.
+
+        **Args:**
+            path (str): Location of the backing file.
+
+        **Returns:**
+            :class:`Counters` object or ``None`` if *path* does not hold
+            a valid registry
+
+        """
+        try:
+            with open(path, 'rb') as counters:
+                header = counters.read(HEADER.size)
+                (magic, _, slots, _, length) = HEADER.unpack(header)
+                names = counters.read(length).decode('utf-8').split('\n')
+        except (IOError, OSError, struct.error) as error:
+            log.debug('Unable to attach counters "%s": %s' % (path, error))
+            return None
+
+        if magic != MAGIC:
+            log.warn('Counters file "%s" has invalid header' % path)
+            return None
+
+        try:
+            return cls([n for n in names if n],
+                       slots,
+                       path=path,
+                       _create=False)
+        except (ValueError, mmap.error) as error:
+            log.warn('Counters file "%s" is truncated: %s' % (path, error))
+            return None
+
+    @property
+    def names(self):
+        return self._names
+
+    @property
+    def slots(self):
+        return self._slots
+
+    @property
+    def path(self):
+        return self._path
+
+    def slot(self, index):
+        """Writable view over a single worker's values.
+
+        **Args:**
+            index (int): Worker slot number.
+
+        **Returns:**
+            :class:`CounterSlot` object
+
+        """
+        if not 0 <= index < self.slots:
+            raise IndexError('Counter slot %d out of range' % index)
+
+        start = index * self._stride
+
+        return CounterSlot(self._values[start:start + len(self._names)],
+                           self._index)
+
+    def total(self, name):
+        """Sum of *name* across all slots.
+        """
+        return sum(self._values[self._index[name]::self._stride])
+
+    def totals(self):
+        """Sum of every counter across all slots.
+
+        **Returns:**
+            dictionary of counter name to total
+
+        """
+        return dict((name, self.total(name)) for name in self.names)
+
+    def close(self):
+        """Release the mapping.
+
+        The mapping stays open if any :class:`CounterSlot` views are
+        still referenced.
+
+        """
+        self._values.release()
+        try:
+            self._mmap.close()
+        except BufferError:
+            log.debug('Counters mapping still referenced -- not closed')
+
+    def remove(self):
+        """Unmap and delete the backing file.
+        """
+        self.close()
+        if self.path is not None and os.path.exists(self.path):
+            log.debug('Removing counters file at "%s"' % self.path)
+            os.remove(self.path)
+
+
+class CounterSlot(object):
+    """A single worker's values within :class:`Counters`.
+
+    Only one process (or thread) should write to a given slot.
+
+    """
+
+    def __init__(self, values, index):
+        self._values = values
+        self._index = index
+
+    def incr(self, name, value=1):
+        """Add *value* to counter *name*.
+        """
+        self._values[self._index[name]] += value
+
+    def set(self, name, value):
+        """Set gauge *name* to *value*.
+        """
+        self._values[self._index[name]] = value
+
+    def get(self, name):
+        return self._values[self._index[name]]
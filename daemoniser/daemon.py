@@ -21,10 +21,28 @@ import atexit
 import signal
 import time
 import threading
+import faulthandler
 
 from logga.log import log
 from filer.files import (create_dir,
                          remove_files)
+from daemoniser.profiler import Profiler
+from daemoniser.stats import LoopStats
+from daemoniser.heartbeat import Heartbeat
+from daemoniser.counters import Counters
+from daemoniser.statuspage import StatusPage
+from daemoniser.shutdown import ShutdownHooks
+from daemoniser import activation
+from daemoniser.embedded import BackgroundDaemon
+from daemoniser.waiter import Waiter
+from daemoniser.election import LeaderLock
+from daemoniser import checkpoint
+from daemoniser.report import DryRunReport
+from daemoniser.pool import (WorkerPool,
+                             POOL_COUNTERS)
+from daemoniser import reaper
+from daemoniser.workqueue import WorkQueue
+from daemoniser.journal import Journal
 
 MAXFD = 1024
 
@@ -43,7 +61,7 @@ class Daemon(object):
         >>> import signal
         >>> class DummyDaemon(daemoniser.Daemon):
         ...     def _start(self, event):
-        ...         signal.signal(signal.SIGTERM, self._exit_handler)
+        ...         self.handle_signal(signal.SIGTERM, self._exit_handler)
         ...         while not event.isSet():
         ...             time.sleep(5)
         ...
@@ -57,6 +75,17 @@ class Daemon(object):
     This will promptly kill your Python shell -- but for the good
     of your program!
 
+    Most :meth:`_start` implementations are a simple work loop.  In that
+    case, :meth:`run_loop` will manage the :attr:`exit_event` check and
+    the wait between iterations while recording per-iteration latency::
+
+        >>> class DummyDaemon(daemoniser.Daemon):
+        ...     def _start(self, event):
+        ...         self.handle_signal(signal.SIGTERM, self._exit_handler)
+        ...         self.run_loop(self.work, 5)
+        ...     def work(self):
+        ...         pass
+
     Later on, to stop you will need to re-start your Python interpreter
     and reinitialise your Daemon object::
 
@@ -85,6 +114,16 @@ class Daemon(object):
         semaphore that when set, signals that the server process
         is to be terminated.
 
+    .. attribute:: waiter
+
+        :class:`daemoniser.waiter.Waiter` that wakes :meth:`wait` on
+        :attr:`exit_event`, signals, file descriptors and timers
+
+    .. attribute:: ready_event
+
+        :class:`threading.Event` object that is set once the daemon
+        is ready to do work (see :meth:`notify_ready`)
+
     .. attribute:: pidfile
 
         path to the PID file
@@ -94,9 +133,143 @@ class Daemon(object):
         boolean flag to execute :meth:`daemoniser.Daemon._start`
         method without daemonising
 
+    .. attribute:: batch
+
+        boolean flag that limits :meth:`run_loop` to a single iteration
+
+    .. attribute:: dry
+
+        boolean flag to run the daemon inline for a single
+        :meth:`run_loop` iteration while timing each phase into
+        :attr:`report`
+
+    .. attribute:: report
+
+        :class:`daemoniser.report.DryRunReport` populated by a
+        :attr:`dry` run
+
+    .. attribute:: timings
+
+        dictionary of internal phase name to seconds taken
+
+    .. attribute:: profile_window
+
+        number of seconds that a ``SIGUSR2`` triggered profile
+        will sample for
+
+    .. attribute:: profiler
+
+        :class:`daemoniser.profiler.Profiler` object that writes
+        CPU and memory reports alongside the PID file
+
+    .. attribute:: loop_stats
+
+        :class:`daemoniser.stats.LoopStats` object that accumulates
+        :meth:`run_loop` iteration latency, overruns and idle time
+
+    .. attribute:: heartbeat_timeout
+
+        seconds without a heartbeat before a running daemon is
+        considered hung.  ``None`` (the default) disables the check
+
+    .. attribute:: heartbeat
+
+        :class:`daemoniser.heartbeat.Heartbeat` object stored alongside
+        the PID file (``None`` if there is no PID file)
+
+    .. attribute:: counters
+
+        :class:`daemoniser.counters.Counters` registry shared with
+        forked workers (see :meth:`create_counters`).  In a process
+        other than the daemon, the registry of the running daemon is
+        attached read-only on first access
+
+    .. attribute:: status_page
+
+        :class:`daemoniser.statuspage.StatusPage` stored alongside
+        the PID file (``None`` if there is no PID file)
+
+    .. attribute:: shutdown_timeout
+
+        overall number of seconds allowed for the shutdown hooks
+        registered with :meth:`add_shutdown_hook`
+
+    .. attribute:: listen_sockets
+
+        list of listening :class:`socket.socket` objects that survive
+        daemonisation.  Populated from a socket activating supervisor
+        (``LISTEN_FDS``/``LISTEN_PID``) when :meth:`start` is called
+        and by :meth:`bind`.  :meth:`_start` should accept connections
+        on these rather than binding its own
+
+    .. attribute:: lockfile
+
+        path to a lock file shared by several instances of the same
+        daemon.  When set, only the instance that holds the lock (the
+        leader) runs :meth:`_start`.  The others stand by (see
+        :meth:`_prepare`) and take over as soon as the leader exits.
+        ``None`` (the default) disables leader election
+
+    .. attribute:: checkpoint_interval
+
+        seconds between periodic :meth:`checkpoint` calls made by
+        :meth:`run_loop`.  ``None`` (the default) only checkpoints when
+        :meth:`_start` returns
+
+    .. attribute:: checkpoint_version
+
+        version of the state returned by :meth:`_checkpoint`.  Snapshots
+        with a different version are not restored
+
+    .. attribute:: hosted
+
+        boolean flag set when the PID file is a virtual PID file written
+        by :class:`daemoniser.host.Host`.  :meth:`stop` then asks the
+        host to stop this daemon alone rather than terminating the host
+
+    .. attribute:: host
+
+        :class:`daemoniser.host.Host` running this daemon as a tenant
+        (``None`` otherwise).  See :meth:`handle_signal`
+
+    .. attribute:: subreaper
+
+        boolean flag to make the daemon a child subreaper, so that
+        orphaned descendants stay in its process tree and are torn down
+        by :meth:`stop`.  Exited children are reaped on ``SIGCHLD`` by
+        :attr:`reaper`
+
+    .. attribute:: reaper
+
+        :class:`daemoniser.reaper.ChildReaper` that reaps adopted
+        orphans and any other child that is not claimed (see
+        :func:`daemoniser.reaper.claim`), and runs exit callbacks for
+        watched children, when :attr:`subreaper` is set
+
+    .. attribute:: workqueue
+
+        durable :class:`daemoniser.workqueue.WorkQueue` stored in the
+        ``<pidfile>.queue`` directory (``None`` if there is no PID file).
+        Opened on first access and closed once :meth:`_start` returns.
+        See :meth:`consume`
+
+    .. attribute:: journal
+
+        :class:`daemoniser.journal.Journal` of lifecycle events stored
+        in ``<pidfile>.journal`` (``None`` if there is no PID file)
+
     """
     _pidfile = None
     _inline = False
+    _batch = False
+    _dry = False
+    _profile_window = 30.0
+    _heartbeat_timeout = None
+    _shutdown_timeout = 30.0
+    _lockfile = None
+    _checkpoint_interval = None
+    _checkpoint_version = 0
+    _subreaper = False
 
     def __init__(self,
                  pidfile,
@@ -121,7 +294,7 @@ class Daemon(object):
         **Kwargs:**
             term_parent (boolean): Attempt to terminate the parent to
             enforce true separation between parent and child processes.
-            Useful when running under test scenarios as :mod:`unittest2`
+            Useful when running under test scenarios as :mod:`unittest`
             barfs if you try to kill it.  Defaults to ``True``.
 
         **Raises:**
@@ -134,13 +307,35 @@ class Daemon(object):
         self._term_parent = term_parent
 
         self._exit_event = threading.Event()
+        self._ready_event = threading.Event()
+        self._waiter = None
 
         self.pid = None
         self.pidfs = None
+        self.hosted = False
+        self.host = None
+
+        self._profiler = None
+        self._loop_stats = LoopStats()
+        self._heartbeat = None
+        self._lifecycle = None
+        self._stacks = None
+        self._counters = None
+        self._status_page = None
+        self._shutdown_hooks = ShutdownHooks()
+        self._listen_sockets = []
+        self._leader_lock = None
+        self._reaper = None
+        self._standby_sigterm = False
+        self._workqueue = None
+        self._report = None
+        self.timings = {}
 
         # Only validate settings if a pidfile was specified.
         if self.pidfile is not None:
+            began = time.monotonic()
             self._validate()
+            self.timings['validate'] = time.monotonic() - began
 
     @property
     def pidfile(self):
@@ -149,6 +344,7 @@ class Daemon(object):
     @pidfile.setter
     def pidfile(self, value):
         self._pidfile = value
+        self._lifecycle = None
 
     @property
     def term_parent(self):
@@ -160,6 +356,70 @@ class Daemon(object):
 
     def set_exit_event(self):
         self._exit_event.set()
+        if self._waiter is not None:
+            self._waiter.wakeup()
+
+    @property
+    def waiter(self):
+        if self._waiter is None:
+            self._waiter = Waiter(exit_event=self._exit_event)
+
+        return self._waiter
+
+    def wait(self, timeout=None):
+        """Block until :attr:`exit_event` is set or an event that has
+        been registered with :attr:`waiter` is ready.
+
+        Use this in place of polling sockets, pipes and
+        :attr:`exit_event` with short timeouts::
+
+            >>> def _start(self, event):
+            ...     self.waiter.register(self.listen_sockets[0], 'accept')
+            ...     self.waiter.add_signal(signal.SIGHUP)
+            ...     while not event.is_set():
+            ...         for ready in self.wait():
+            ...             if ready.data == 'accept':
+            ...                 self.accept()
+
+        **Kwargs:**
+            timeout (float): Seconds to wait.  ``None`` waits forever.
+
+        **Returns:**
+            list of :data:`daemoniser.waiter.WaitEvent` tuples
+
+        """
+        return self.waiter.wait(timeout)
+
+    @property
+    def ready_event(self):
+        return self._ready_event
+
+    def notify_ready(self):
+        """Signal that the daemon has finished starting up.
+
+        :meth:`run_loop` calls this before its first iteration.
+        :meth:`_start` implementations that do not use :meth:`run_loop`
+        should call it once they are ready to do work.
+
+        """
+        if not self._ready_event.is_set():
+            log.debug('%s -- ready' % type(self).__name__)
+            self._journal('ready')
+            self._ready_event.set()
+
+    @property
+    def journal(self):
+        if self._lifecycle is None and self.pidfile is not None:
+            self._lifecycle = Journal('%s.journal' % self.pidfile)
+
+        return self._lifecycle
+
+    def _journal(self, event, pid=None):
+        """Record a lifecycle *event* in the :attr:`journal` (if any).
+        """
+        journal = self.journal
+        if journal is not None:
+            journal.record(event, pid=pid)
 
     @property
     def inline(self):
@@ -169,6 +429,393 @@ class Daemon(object):
     def inline(self, value):
         self._inline = value
 
+    @property
+    def batch(self):
+        return self._batch
+
+    @batch.setter
+    def batch(self, value):
+        self._batch = value
+
+    @property
+    def dry(self):
+        return self._dry
+
+    @dry.setter
+    def dry(self, value):
+        self._dry = value
+
+    @property
+    def report(self):
+        if self._report is None:
+            self._report = DryRunReport()
+
+        return self._report
+
+    @report.setter
+    def report(self, value):
+        self._report = value
+
+    @property
+    def profile_window(self):
+        return self._profile_window
+
+    @profile_window.setter
+    def profile_window(self, value):
+        self._profile_window = value
+
+    @property
+    def profiler(self):
+        if self._profiler is None:
+            prefix = self.pidfile
+            if prefix is None:
+                prefix = os.path.join(os.sep, 'tmp', type(self).__name__)
+            self._profiler = Profiler(prefix, window=self.profile_window)
+
+        return self._profiler
+
+    @property
+    def loop_stats(self):
+        return self._loop_stats
+
+    @property
+    def heartbeat_timeout(self):
+        return self._heartbeat_timeout
+
+    @heartbeat_timeout.setter
+    def heartbeat_timeout(self, value):
+        self._heartbeat_timeout = value
+
+    @property
+    def heartbeat(self):
+        if self._heartbeat is None and self.pidfile is not None:
+            self._heartbeat = Heartbeat('%s.heartbeat' % self.pidfile)
+
+        return self._heartbeat
+
+    @property
+    def counters(self):
+        if self._counters is None and self.pidfile is not None:
+            self._counters = Counters.attach('%s.counters' % self.pidfile)
+
+        return self._counters
+
+    def create_counters(self, names, slots):
+        """Create the shared counter registry alongside the PID file.
+
+        Call this in the master process before forking workers.  Each
+        worker should then write to its own
+        :meth:`daemoniser.counters.Counters.slot`.
+
+        **Args:**
+            names (list): Counter and gauge names.
+
+            slots (int): Number of worker slots.
+
+        **Returns:**
+            :class:`daemoniser.counters.Counters` object
+
+        """
+        path = None
+        if self.pidfile is not None:
+            path = '%s.counters' % self.pidfile
+        self._counters = Counters(names, slots, path=path)
+
+        return self._counters
+
+    @property
+    def status_page(self):
+        if self._status_page is None and self.pidfile is not None:
+            self._status_page = StatusPage('%s.status' % self.pidfile)
+
+        return self._status_page
+
+    def set_status(self, state=None, queue_depth=None, user=None):
+        """Publish daemon state to the :attr:`status_page`.
+
+        **Kwargs:**
+            state (str): One of :data:`daemoniser.statuspage.STATES`.
+
+            queue_depth (int): Number of outstanding work items.
+
+            user (list): Application defined floating point values.
+
+        """
+        if self.status_page is not None:
+            self.status_page.update(state=state,
+                                    queue_depth=queue_depth,
+                                    user=user)
+
+    @property
+    def shutdown_timeout(self):
+        return self._shutdown_timeout
+
+    @shutdown_timeout.setter
+    def shutdown_timeout(self, value):
+        self._shutdown_timeout = value
+
+    def add_shutdown_hook(self, fn, priority=0, timeout=None, name=None):
+        """Register *fn* to be called once :meth:`_start` returns.
+
+        Hooks are run in tiers of ascending *priority*.  Hooks within a
+        tier run concurrently.  See
+        :class:`daemoniser.shutdown.ShutdownHooks` for details.
+
+        **Args:**
+            fn (callable): Hook that takes no arguments.
+
+        **Kwargs:**
+            priority (int): Tier number.  Lower tiers run first.
+
+            timeout (float): Seconds allowed for this hook.
+
+            name (str): Name used when logging the hook's run time.
+
+        """
+        self._shutdown_hooks.add(fn,
+                                 priority=priority,
+                                 timeout=timeout,
+                                 name=name)
+
+    def _shutdown(self):
+        """Run the registered shutdown hooks within
+        :attr:`shutdown_timeout`.
+
+        """
+        self._shutdown_hooks.deadline = self.shutdown_timeout
+        self._shutdown_hooks.run()
+        if self._leader_lock is not None:
+            self._leader_lock.release()
+        self.set_status(state='stopped')
+
+    @property
+    def lockfile(self):
+        return self._lockfile
+
+    @lockfile.setter
+    def lockfile(self, value):
+        self._lockfile = value
+
+    @property
+    def leader_lock(self):
+        if self._leader_lock is None and self.lockfile is not None:
+            self._leader_lock = LeaderLock(self.lockfile)
+
+        return self._leader_lock
+
+    @property
+    def is_leader(self):
+        return (self.leader_lock is not None and
+                self.leader_lock.acquired.is_set())
+
+    @property
+    def checkpoint_interval(self):
+        return self._checkpoint_interval
+
+    @checkpoint_interval.setter
+    def checkpoint_interval(self, value):
+        self._checkpoint_interval = value
+
+    @property
+    def checkpoint_version(self):
+        return self._checkpoint_version
+
+    @checkpoint_version.setter
+    def checkpoint_version(self, value):
+        self._checkpoint_version = value
+
+    @property
+    def snapshot_file(self):
+        if self.pidfile is None:
+            return None
+
+        return '%s.snapshot' % self.pidfile
+
+    def _checkpoint(self):
+        """Define this method within your class generalisation to
+        return the state that should survive a restart.
+
+        Wrap large binary payloads in :class:`pickle.PickleBuffer` so
+        that they are restored without being copied (see
+        :mod:`daemoniser.checkpoint`).
+
+        **Returns:**
+            picklable state or ``None`` to skip checkpointing
+
+        """
+        return None
+
+    def _restore(self, state):
+        """Define this method within your class generalisation to
+        reinstate *state* as returned by :meth:`_checkpoint` in a
+        previous run.
+
+        Called before leader election and before :meth:`_start`, so the
+        daemon is warm by the time it signals readiness.
+
+        """
+        pass
+
+    def checkpoint(self):
+        """Save the state returned by :meth:`_checkpoint` alongside
+        the PID file.
+
+        **Returns:**
+            boolean::
+
+                ``True`` -- snapshot written
+                ``False`` -- nothing to checkpoint or the write failed
+
+        """
+        if self.snapshot_file is None:
+            return False
+
+        state = self._checkpoint()
+        if state is None:
+            return False
+
+        checkpoint_status = False
+        try:
+            checkpoint.save(self.snapshot_file,
+                            state,
+                            version=self.checkpoint_version)
+            checkpoint_status = True
+        except (checkpoint.CheckpointError,
+                BufferError,
+                IOError,
+                OSError) as error:
+            log.error('Checkpoint to "%s" failed: %s' %
+                      (self.snapshot_file, error))
+
+        return checkpoint_status
+
+    def _restore_checkpoint(self):
+        """Pass the last snapshot (if any) to :meth:`_restore`.
+        """
+        if self.snapshot_file is None:
+            return
+
+        try:
+            state = checkpoint.load(self.snapshot_file,
+                                    version=self.checkpoint_version)
+        except checkpoint.CheckpointError as error:
+            log.error('Checkpoint restore failed: %s' % error)
+            state = None
+
+        if state is not None:
+            began = time.monotonic()
+            self._restore(state)
+            log.info('%s -- restored checkpoint in %.3f sec' %
+                     (type(self).__name__, time.monotonic() - began))
+
+    def _prepare(self):
+        """Define this method within your class generalisation to load
+        any state that :meth:`_start` needs *before* leadership is
+        acquired.
+
+        Only called when :attr:`lockfile` is set.  A standby instance
+        will then be able to take over from a failed leader without
+        a cold start.
+
+        """
+        pass
+
+    def _elect(self):
+        """Wait until this instance holds the :attr:`lockfile` lock.
+
+        The ``SIGTERM`` handler installed for the standby by
+        :meth:`_install_handlers` is removed once leadership is held, so
+        :meth:`_start` sees the default action as usual.
+
+        **Returns:**
+            boolean::
+
+                ``True`` -- this instance is the leader
+                ``False`` -- :attr:`exit_event` was set while standing by
+
+        """
+        self._prepare()
+
+        lock = self.leader_lock
+        if not lock.acquire(blocking=False):
+            log.info('%s -- standing by for leadership (leader PID: %s)' %
+                     (type(self).__name__, lock.leader_pid()))
+            self.set_status(state='standby')
+            lock.acquire_in_background(callback=self.waiter.wakeup)
+            while not (lock.acquired.is_set() or self.exit_event.is_set()):
+                self.wait()
+
+        leader = lock.acquired.is_set() and not self.exit_event.is_set()
+        if leader and self._standby_sigterm:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            self._standby_sigterm = False
+
+        return leader
+
+    @property
+    def subreaper(self):
+        return self._subreaper
+
+    @subreaper.setter
+    def subreaper(self, value):
+        self._subreaper = value
+
+    @property
+    def reaper(self):
+        if self._reaper is None:
+            self._reaper = reaper.ChildReaper()
+
+        return self._reaper
+
+    @property
+    def listen_sockets(self):
+        return self._listen_sockets
+
+    def bind(self, address, backlog=128):
+        """Bind and listen on *address* before the daemon starts.
+
+        The socket is added to :attr:`listen_sockets`.  See
+        :func:`daemoniser.activation.bind` for the supported address
+        formats.
+
+        **Returns:**
+            the listening :class:`socket.socket`
+
+        **Raises:**
+            :mod:`daemoniser.DaemonError` if the PID file exists, as
+            the daemon may be running and serving *address*
+
+        """
+        if self.pid is not None:
+            raise DaemonError('PID file "%s" exists -- not binding %s' %
+                              (self.pidfile, address))
+
+        sock = activation.bind(address, backlog=backlog)
+        self._listen_sockets.append(sock)
+
+        return sock
+
+    def _inherit_sockets(self):
+        """Adopt listening sockets passed by a socket activating
+        supervisor into :attr:`listen_sockets`.
+
+        """
+        for fd in activation.listen_fds():
+            self._listen_sockets.append(activation.from_fd(fd))
+
+    def pet(self):
+        """Publish a heartbeat to signal that the daemon is making
+        progress.
+
+        :meth:`run_loop` calls this on every iteration when
+        :attr:`heartbeat_timeout` is set.  Long running :meth:`_start`
+        implementations that do not use :meth:`run_loop` should call
+        it periodically.
+
+        """
+        if self.heartbeat is not None:
+            self.heartbeat.beat()
+
     def _start(self):
         """Define this method within your class generalisation with logic
         that invokes your process to benefit from the daemonisation
@@ -190,10 +837,264 @@ class Daemon(object):
         """
         pass
 
+    def run_loop(self, fn, interval):
+        """Call *fn* every *interval* seconds until :attr:`exit_event`
+        is set.
+
+        The interval is measured from the start of each iteration.  An
+        iteration that takes longer than *interval* is counted as an
+        overrun and the next iteration starts immediately.  Iteration
+        latency is recorded into :attr:`loop_stats` and published to the
+        :attr:`status_page` (percentiles are refreshed once a second).
+
+        In :attr:`batch` (and :attr:`dry`) mode, *fn* is called once.
+
+        **Args:**
+            fn (callable): Unit of work that takes no arguments.
+
+            interval (float): Target loop period in seconds.
+
+        """
+        event = self.exit_event
+        stats = self.loop_stats
+        clock = time.monotonic
+        pet = None
+        if self.heartbeat_timeout is not None:
+            pet = self.pet
+        page = self.status_page
+        published = clock()
+        checkpointed = published
+        checkpoint_interval = self.checkpoint_interval
+        single_pass = self.batch or self.dry
+
+        self.notify_ready()
+
+        while not event.is_set():
+            began = clock()
+            if pet is not None:
+                pet()
+            fn()
+            finished = clock()
+            remaining = stats.record(finished - began, interval)
+            if page is not None:
+                page.touch(stats.iterations)
+                if finished - published >= 1.0:
+                    published = finished
+                    summary = stats.summary()
+                    page.publish_stats(summary['p50'],
+                                       summary['p99'],
+                                       summary['max'])
+            if (checkpoint_interval is not None and
+               finished - checkpointed >= checkpoint_interval):
+                checkpointed = finished
+                self.checkpoint()
+            if single_pass:
+                break
+            if remaining:
+                stats.idle += remaining
+                event.wait(remaining)
+
+    @property
+    def workqueue(self):
+        if self._workqueue is None and self.pidfile is not None:
+            self._workqueue = WorkQueue('%s.queue' % self.pidfile)
+            # Last tier, so that other hooks can still enqueue.
+            self.add_shutdown_hook(self._workqueue.close,
+                                   priority=sys.maxsize,
+                                   name='workqueue')
+
+        return self._workqueue
+
+    def consume(self, fn, batch_size=64, interval=1.0, consumer='default'):
+        """Feed :attr:`workqueue` items to *fn* until :attr:`exit_event`
+        is set.
+
+        Each :meth:`run_loop` iteration drains the queue in batches of
+        up to *batch_size* items.  A batch is acknowledged once *fn*
+        returns, so a batch that was in flight when the daemon stopped
+        is delivered again after a restart.  The number of outstanding
+        items is published to the :attr:`status_page`.
+
+        In :attr:`batch` mode, the queue is drained once and the method
+        returns.
+
+        **Args:**
+            fn (callable): Takes a list of items (bytes).
+
+        **Kwargs:**
+            batch_size (int): Maximum number of items per call to *fn*.
+
+            interval (float): Seconds between checks of an empty queue.
+
+            consumer (str): Consumer name that owns the queue offset.
+
+        """
+        queue = self.workqueue
+        event = self.exit_event
+
+        def drain():
+            while not event.is_set():
+                items = queue.get(batch_size, consumer)
+                if not items:
+                    break
+                fn(items)
+                queue.ack(consumer)
+            self.set_status(queue_depth=queue.depth(consumer))
+
+        self.run_loop(drain, interval)
+
+    def run_workers(self,
+                    target,
+                    max_workers=None,
+                    autoscaler=None,
+                    interval=5.0,
+                    names=None):
+        """Run *target* in a pool of forked workers until
+        :attr:`exit_event` is set.
+
+        The master process reaps and replaces exited workers every
+        *interval* seconds via :meth:`run_loop`.  Given an *autoscaler*,
+        the pool is also grown and shrunk between
+        :attr:`daemoniser.autoscale.Autoscaler.min_workers` and
+        :attr:`daemoniser.autoscale.Autoscaler.max_workers` according to
+        load.  Otherwise, *max_workers* workers are kept running.
+
+        Worker counters are created with :meth:`create_counters` so
+        that the status command reports totals across the pool.
+
+        **Args:**
+            target (callable): Worker entry point that takes a
+            :class:`daemoniser.pool.WorkerContext`.
+
+        **Kwargs:**
+            max_workers (int): Number of workers.  Defaults to the
+            *autoscaler* upper bound, which it may not contradict.
+
+            autoscaler (:class:`daemoniser.autoscale.Autoscaler`): Load
+            driven sizing policy.
+
+            interval (float): Seconds between master loop iterations.
+
+            names (list): Additional per-worker counter names.
+
+        **Returns:**
+            the :class:`daemoniser.pool.WorkerPool` (stopped)
+
+        **Raises:**
+            :mod:`daemoniser.DaemonError` if *max_workers* is missing
+            or differs from the *autoscaler* upper bound
+
+        """
+        if autoscaler is not None:
+            if max_workers not in (None, autoscaler.max_workers):
+                raise DaemonError('max_workers %d conflicts with the '
+                                  'autoscaler upper bound %d' %
+                                  (max_workers, autoscaler.max_workers))
+            max_workers = autoscaler.max_workers
+        elif max_workers is None:
+            raise DaemonError('max_workers is required without an '
+                              'autoscaler')
+
+        counters = self.create_counters(POOL_COUNTERS + tuple(names or ()),
+                                        max_workers)
+        pool = WorkerPool(target, max_workers, counters=counters)
+
+        if autoscaler is not None:
+            pool.resize(max(autoscaler.min_workers, 1))
+            autoscaler.sample(pool)
+
+            def tick():
+                autoscaler.scale(pool)
+        else:
+            pool.resize(max_workers)
+            tick = pool.reap
+
+        try:
+            self.run_loop(tick, interval)
+        finally:
+            pool.stop(timeout=self.shutdown_timeout)
+
+        return pool
+
     def _exit_handler(self, signal, frame):
         log_msg = '%s --' % type(self).__name__
         log.info('%s SIGTERM intercepted' % log_msg)
+        self._journal('sigterm')
         self.set_exit_event()
+        self.set_status(state='stopping')
+
+    def handle_signal(self, signum, handler):
+        """Install *handler* for *signum* from within :meth:`_start`.
+
+        Use this in place of :func:`signal.signal`, which raises
+        ``ValueError`` off the main thread.  Embedded daemons
+        (:meth:`start_background`) and :class:`daemoniser.host.Host`
+        tenants run :meth:`_start` on their own thread.  A tenant's
+        ``SIGTERM`` handler is routed through its :attr:`host`.  Any
+        other handler off the main thread is ignored, as
+        :attr:`exit_event` is set when the daemon is stopped.
+
+        **Returns:**
+            boolean::
+
+                ``True`` -- *handler* will be called on *signum*
+                ``False`` -- *handler* was ignored
+
+        """
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signum, handler)
+            return True
+
+        if self.host is not None:
+            return self.host.route_signal(self, signum, handler)
+
+        log.debug('%s not on the main thread -- signal %d handler ignored' %
+                  (type(self).__name__, signum))
+
+        return False
+
+    def _profile_handler(self, signal, frame):
+        log_msg = '%s --' % type(self).__name__
+        log.info('%s SIGUSR2 intercepted' % log_msg)
+        self.profiler.trigger()
+
+    def _install_handlers(self):
+        """Install the signal handlers that :class:`Daemon` manages
+        on behalf of the process.
+
+        * ``SIGUSR2`` triggers a :attr:`profiler` window
+        * ``SIGUSR1`` dumps the stacks of all threads via
+          :mod:`faulthandler` to ``<pidfile>.stacks``
+        * with :attr:`subreaper` set, the process becomes a child
+          subreaper and ``SIGCHLD`` reaps exited children
+        * with :attr:`lockfile` set and no ``SIGTERM`` handler in place,
+          ``SIGTERM`` sets :attr:`exit_event` so that a standby exits
+          cleanly (see :meth:`_elect`)
+
+        Signal handlers can only be installed from the main thread so
+        nothing is done when running embedded (see
+        :meth:`start_background`).
+
+        """
+        if threading.current_thread() is not threading.main_thread():
+            return
+
+        signal.signal(signal.SIGUSR2, self._profile_handler)
+
+        if self.subreaper:
+            reaper.set_child_subreaper()
+            self.reaper.install()
+
+        if (self.lockfile is not None and
+                signal.getsignal(signal.SIGTERM) == signal.SIG_DFL):
+            signal.signal(signal.SIGTERM, self._exit_handler)
+            self._standby_sigterm = True
+
+        if self.pidfile is not None and self._stacks is None:
+            self._stacks = open('%s.stacks' % self.pidfile, 'a')
+            faulthandler.register(signal.SIGUSR1,
+                                  file=self._stacks,
+                                  all_threads=True)
 
     def _validate(self):
         """Validator method called during object initialisation.
@@ -220,11 +1121,17 @@ class Daemon(object):
             # Set the current process PID.
             log.debug('PID file "%s" exists' % self.pidfile)
             try:
-                self.pid = int(file(self.pidfile, 'r').read().strip())
+                with open(self.pidfile, 'r') as pidfile:
+                    lines = pidfile.read().split()
+                self.pid = int(lines[0])
                 log.debug('Stored PID is: %d' % self.pid)
-            except ValueError as error:
+            except (IndexError, ValueError) as error:
                 raise DaemonError('Error reading PID file: %s' % error)
 
+            # A virtual PID file written by daemoniser.host.Host names
+            # the tenant after the host PID.
+            self.hosted = len(lines) > 1
+
     def start(self):
         """Wrapper around the server start process.
 
@@ -254,13 +1161,99 @@ class Daemon(object):
         """
         start_status = True
 
+        if self.dry:
+            return self._dry_run()
+
+        self._journal('start')
+        self._inherit_sockets()
+
         if self.inline:
-            self._start(self.exit_event)
+            self._run()
         else:
             start_status = self._start_daemon()
 
         return start_status
 
+    def _dry_run(self):
+        """Run the daemon inline for a single :meth:`run_loop` iteration
+        and record the time taken by each phase into :attr:`report`.
+
+        Nothing is forked and no PID file is written.  :meth:`_start`
+        implementations that do not use :meth:`run_loop` run until
+        :attr:`exit_event` is set.
+
+        The dry run shares the runtime files kept alongside the PID
+        file, so it is refused while the daemon is running.
+
+        **Returns:**
+            boolean::
+
+                ``True`` -- dry run complete
+                ``False`` -- the daemon is running
+
+        """
+        if self.pid is not None:
+            try:
+                os.kill(int(self.pid), 0)
+            except OSError:
+                pass
+            else:
+                log.warn('PID %s is running -- dry run would clobber its '
+                         'runtime files' % self.pid)
+                return False
+
+        report = self.report
+        report.add('validate', self.timings.get('validate'))
+
+        with report.phase('prepare', profile=True):
+            self._inherit_sockets()
+            self._install_handlers()
+            self._restore_checkpoint()
+
+        with report.phase('first iteration', profile=True):
+            self.set_status(state='running')
+            try:
+                self._start(self.exit_event)
+            finally:
+                self._shutdown()
+                self._remove_runtime_files()
+
+        return True
+
+    def start_background(self):
+        """Run :meth:`_start` in-process on a managed thread.
+
+        No daemonisation takes place and no PID file is written, which
+        makes starting and stopping a daemon a matter of milliseconds.
+        The runtime files kept alongside the PID file are removed when
+        the daemon finishes (see :mod:`daemoniser.embedded`).
+        As signal handlers can only be installed from the main thread,
+        :meth:`_start` implementations that call :func:`signal.signal`
+        directly are not suitable for embedded mode.  They should use
+        :meth:`handle_signal` or rely on :attr:`exit_event` alone.
+
+        The embedded daemon shares the runtime files kept alongside the
+        PID file, so it is refused while the daemon is running.  A
+        :class:`daemoniser.host.Host` tenant is exempt, as its virtual
+        PID file names the host itself.
+
+        **Returns:**
+            :class:`daemoniser.embedded.BackgroundDaemon` handle that
+            supports ``wait_ready``, ``stop`` and ``join``
+
+        **Raises:**
+            :mod:`daemoniser.DaemonError` if the PID file names a live
+            process.
+
+        """
+        if self.host is None and self.is_alive():
+            raise DaemonError('PID %s is running -- embedded daemon would '
+                              'clobber its runtime files' % self.pid)
+
+        log.debug('Starting %s in background' % type(self).__name__)
+
+        return BackgroundDaemon(self).start()
+
     def _start_daemon(self):
         """Start the daemon process.
 
@@ -303,7 +1296,7 @@ class Daemon(object):
             try:
                 log.debug('starting daemon')
                 self.daemonize()
-                self._start(self.exit_event)
+                self._run()
                 start_status = True
             except IOError as error:
                 err_msg = 'Cannot write to PID file: IOError "%s"' % error
@@ -311,6 +1304,30 @@ class Daemon(object):
 
         return start_status
 
+    def _run(self):
+        """Run :meth:`_start` within the environment that
+        :class:`Daemon` manages (signal handlers, checkpoint restore,
+        leader election, status page and shutdown hooks).
+
+        """
+        self._install_handlers()
+        self._shutdown_hooks.reset()
+        standby = False
+        try:
+            self._restore_checkpoint()
+            if self.lockfile is not None and not self._elect():
+                standby = True
+                return
+            self.set_status(state='running')
+            self._start(self.exit_event)
+            self.checkpoint()
+        finally:
+            self._shutdown()
+            if standby:
+                # Never led -- leave nothing behind for the leader's
+                # status checks.
+                self._remove_runtime_files()
+
     def daemonize(self):
         """Prepare the daemon environment.
 
@@ -362,24 +1379,29 @@ class Daemon(object):
                                                             error.strerror))
             sys.exit(1)
 
-        # Close all file descriptors except from non-console logging
-        # handlers.
-        maxfd = resource.getrlimit(resource.RLIMIT_NOFILE)[1]
-        if (maxfd == resource.RLIM_INFINITY):
-            maxfd = MAXFD
+        self._detach()
 
-        filenos = []
+    def _detach(self):
+        """Detach the current (already forked) process from its
+        inherited environment.
+
+        Closes inherited file descriptors, redirects the standard streams
+        to ``/dev/null``, writes the PID file and arranges for it to be
+        removed on exit.
+
+        """
+        # Close all file descriptors except from non-console logging
+        # handlers and inherited listening sockets.
+        filenos = [sock.fileno() for sock in self.listen_sockets]
         for handler in log.handlers:
-            if (hasattr(handler, 'stream') and
-               hasattr(handler.stream, 'fileno') and
-               handler.stream.fileno() > 2):
-                filenos.append(handler.stream.fileno())
-            for fd in range(0, maxfd):
-                try:
-                    if fd not in filenos:
-                        os.close(fd)
-                except OSError:
-                    pass
+            try:
+                fileno = handler.stream.fileno()
+            except (AttributeError, ValueError, OSError):
+                # In-memory stream (io.UnsupportedOperation) or none.
+                continue
+            if fileno > 2:
+                filenos.append(fileno)
+        self._close_fds(filenos)
 
         # Redirect stdin, stdout, stderr to null
         os.open(os.devnull, os.O_RDWR)
@@ -389,17 +1411,43 @@ class Daemon(object):
         # Write out to pidfile.
         child_pid = str(os.getpid())
         log.debug('PID of child process: %s' % child_pid)
-        file(self.pidfile, 'w+').write("%s\n" % child_pid)
+        with open(self.pidfile, 'w+') as pidfile:
+            pidfile.write("%s\n" % child_pid)
+        self._journal('daemonized')
 
         # Remove the PID file when the process terminates.
         atexit.register(self._delpid)
 
+    def _close_fds(self, keep):
+        """Close every file descriptor other than those in *keep*.
+
+        Descriptors are closed in ranges between the kept descriptors
+        with :func:`os.closerange` rather than one system call per
+        possible descriptor.
+
+        **Args:**
+            keep (list): File descriptors to leave open.
+
+        """
+        maxfd = resource.getrlimit(resource.RLIMIT_NOFILE)[1]
+        if (maxfd == resource.RLIM_INFINITY):
+            maxfd = MAXFD
+
+        low = 0
+        for fd in sorted(set(keep)):
+            os.closerange(low, fd)
+            low = fd + 1
+        os.closerange(low, maxfd)
+
     def stop(self):
         """Stop the daemon.
 
         Will run a series of checks around the existence of a PID file
         before attempting to terminate the daemon.
 
+        With :attr:`subreaper` set, every descendant of the daemon is
+        terminated in the same pass.
+
         **Returns:**
             boolean::
 
@@ -412,9 +1460,21 @@ class Daemon(object):
         if self.pid:
             # OK to terminate.
             log.debug('Stopping daemon process with PID: %s' % self.pid)
+            self._journal('stop', pid=int(self.pid))
+
+            signum = signal.SIGTERM
+            if self.hosted:
+                # Ask the host process to stop this tenant only.
+                log.debug('Requesting hosted daemon stop via "%s.stop"' %
+                          self.pidfile)
+                open('%s.stop' % self.pidfile, 'w').close()
+                signum = signal.SIGHUP
 
             try:
-                os.kill(int(self.pid), signal.SIGTERM)
+                if self.subreaper and not self.hosted:
+                    reaper.kill_tree(int(self.pid), signum)
+                else:
+                    os.kill(int(self.pid), signum)
             except OSError as error:
                 log.error('PID "%s" stop: "%s"' % (self.pid, error))
                 if error.errno == 3:
@@ -422,6 +1482,8 @@ class Daemon(object):
                     if self.pidfile is not None:
                         log.warn('Removing PID file "%s"' % self.pidfile)
                         remove_files(self.pidfile)
+                        if self.hosted:
+                            remove_files('%s.stop' % self.pidfile)
             else:
                 stop_status = True
                 self.pid = None
@@ -448,6 +1510,7 @@ class Daemon(object):
         """
         log_msg = '%s daemon --' % type(self).__name__
         log.info('%s attempting restart ...' % log_msg)
+        self._journal('restart')
         log.info('%s stopping ...' % log_msg)
         self.stop()
 
@@ -462,9 +1525,175 @@ class Daemon(object):
         """
         log.debug('Removing PID file at "%s"' % self.pidfile)
         os.remove(self.pidfile)
+        self._remove_runtime_files()
+        self._journal('exited')
+
+    def _remove_runtime_files(self):
+        """Remove the files that the running daemon keeps alongside
+        its PID file.
+
+        """
+        if self.heartbeat is not None:
+            self.heartbeat.remove()
+        if self._counters is not None:
+            self._counters.remove()
+        if self.status_page is not None:
+            self.status_page.remove()
+        if self._stacks is not None:
+            faulthandler.unregister(signal.SIGUSR1)
+            self._stacks.close()
+            if not os.path.getsize(self._stacks.name):
+                os.remove(self._stacks.name)
+            self._stacks = None
+
+    def is_hung(self):
+        """Check the daemon heartbeat against :attr:`heartbeat_timeout`.
+
+        A daemon that has not yet published its first heartbeat is not
+        considered hung.
+
+        **Returns:**
+            boolean::
+
+                ``True`` -- heartbeat is stale
+                ``False`` -- heartbeat is fresh or not being monitored
+
+        """
+        hung = False
+
+        if self.heartbeat_timeout is not None and self.heartbeat is not None:
+            age = self.heartbeat.age()
+            if age is not None and age > self.heartbeat_timeout:
+                log.warn('PID %s heartbeat is %.1f sec stale' %
+                         (self.pid, age))
+                hung = True
+
+        return hung
+
+    def watchdog(self, interval=1.0, restart=True, grace=1.0):
+        """Supervise the daemon heartbeat until :attr:`exit_event` is set.
+
+        Every *interval* seconds the PID file and heartbeat are checked.
+        A PID file that cannot be read is logged and checked again on
+        the next interval.
+        If the daemon is hung, its thread stacks are dumped to
+        ``<pidfile>.stacks`` (``SIGUSR1``), it is killed after *grace*
+        seconds and, if *restart* is set, a new daemon is started.
+
+        **Kwargs:**
+            interval (float): Seconds between heartbeat checks.
+
+            restart (boolean): Start a new daemon after killing a hung one.
+
+            grace (float): Seconds to allow for the stack dump.
+
+        """
+        if self.heartbeat_timeout is None:
+            raise DaemonError('Heartbeat timeout has not been defined')
+
+        signal.signal(signal.SIGTERM, self._exit_handler)
+
+        log_msg = '%s watchdog --' % type(self).__name__
+        log.info('%s supervising "%s"' % (log_msg, self.pidfile))
+
+        while not self.exit_event.wait(interval):
+            self.pid = None
+            try:
+                self._validate()
+            except (DaemonError, OSError) as error:
+                # A PID file caught mid-write -- check again next time.
+                log.warn('%s PID file "%s" check: %s' %
+                         (log_msg, self.pidfile, error))
+                continue
+            if self.pid is None or not self.is_hung():
+                continue
+
+            hung = self.pid
+            log.warn('%s PID %s hung -- dumping stacks' % (log_msg, hung))
+            try:
+                os.kill(hung, signal.SIGUSR1)
+                time.sleep(grace)
+                os.kill(hung, signal.SIGKILL)
+                self._journal('killed', pid=hung)
+            except OSError as error:
+                log.error('PID "%s" kill: "%s"' % (hung, error))
+
+            remove_files(self.pidfile)
+            self.heartbeat.remove()
+            self.pid = None
+
+            if restart:
+                log.info('%s restarting' % log_msg)
+                self._respawn()
+
+    def _respawn(self):
+        """Start a new daemon from a supervising process without
+        terminating the supervisor.
+
+        The intermediate child is claimed (see
+        :func:`daemoniser.reaper.claim`), so a
+        :class:`daemoniser.reaper.ChildReaper` leaves it to be waited on
+        here.
+
+        """
+        pid = reaper.fork()
+        if pid == 0:
+            self._exit_event = threading.Event()
+            child_pid = os.getpid()
+            status = 0
+            try:
+                self.start()
+                if os.getpid() != child_pid:
+                    # Only the daemon itself returns from start.
+                    self._delpid()
+            except SystemExit as error:
+                # Intermediate parents of the daemonize double fork.
+                status = error.code or 0
+            except BaseException:
+                log.exception('%s respawn failed' % type(self).__name__)
+                status = 1
+            finally:
+                # Never unwind into the supervisor's call stack.
+                os._exit(status)
+
+        try:
+            os.waitpid(pid, 0)
+        except ChildProcessError:
+            log.debug('Respawn PID %d already reaped' % pid)
+        finally:
+            reaper.release(pid)
+
+    def profile(self):
+        """Signal the running daemon to start a profiling window.
+
+        Sends ``SIGUSR2`` to the daemon process.  The reports are written
+        alongside the PID file.
+
+        **Returns:**
+            boolean::
+
+                ``True`` -- signal delivered
+                ``False`` -- daemon is not running
 
-    def status(self):
         """
+        profile_status = False
+
+        if self.pid is not None:
+            log.debug('Profiling daemon process with PID: %s' % self.pid)
+            try:
+                os.kill(int(self.pid), signal.SIGUSR2)
+                profile_status = True
+            except OSError as error:
+                log.error('PID "%s" profile: "%s"' % (self.pid, error))
+        else:
+            log.warn('Profiling process but unable to find PID')
+
+        return profile_status
+
+    def status(self):
+        """A daemon with a stale heartbeat (see :meth:`is_hung`) is
+        reported as inactive.
+
         **Returns:**
             boolean::
 
@@ -472,16 +1701,29 @@ class Daemon(object):
                 ``False`` -- PID is inactive
 
         """
-        process_status = False
+        return self.is_alive() and not self.is_hung()
+
+    def is_alive(self):
+        """Check that the process named by the PID file exists,
+        whether or not it is hung.
+
+        **Returns:**
+            boolean::
+
+                ``True`` -- PID is alive
+                ``False`` -- no PID or the process has gone
+
+        """
+        alive = False
 
         if self.pid is not None:
             try:
                 os.kill(int(self.pid), 0)
-                process_status = True
+                alive = True
             except OSError:
                 pass
 
-        return process_status
+        return alive
 
 
 class DaemonError(Exception):
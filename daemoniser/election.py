@@ -0,0 +1,182 @@
+"""The :mod:`daemoniser.election` module provides active/standby leader
+election between daemon instances on the same host via an exclusive
+:func:`fcntl.flock` on a shared lock file.
+
+The kernel releases the lock the moment the leader process dies
+(however it dies), so a standby that polls the lock takes over within
+a poll interval rather than waiting for a restart cycle.  Processes
+forked from the leader (pool workers, zygote children) close their
+copy of the lock file, so they never keep leadership alive.
+
+"""
+__all__ = [
+    "LeaderLock",
+]
+
+import os
+import fcntl
+import weakref
+import threading
+
+from logga.log import log
+
+_LOCKS = weakref.WeakSet()
+
+
+def _after_fork_in_child():
+    for lock in list(_LOCKS):
+        lock._forget()
+
+
+os.register_at_fork(after_in_child=_after_fork_in_child)
+
+
+class LeaderLock(object):
+    """Exclusive lock on a shared lock file.
+
+    .. attribute:: path
+
+        location of the lock file
+
+    .. attribute:: acquired
+
+        :class:`threading.Event` that is set once leadership is held
+
+    """
+    _path = None
+
+    def __init__(self, path):
+        """LeaderLock initialiser.
+
+        **Args:**
+            path (str): Location of the lock file shared by all instances.
+
+        """
+        self._path = path
+        self._fd = None
+        self._thread = None
+        self._stopping = threading.Event()
+        self.acquired = threading.Event()
+        _LOCKS.add(self)
+
+    @property
+    def path(self):
+        return self._path
+
+    def _open(self):
+        if self._fd is None:
+            self._fd = os.open(self.path,
+                               os.O_RDWR | os.O_CREAT | os.O_CLOEXEC,
+                               0o644)
+
+        return self._fd
+
+    def acquire(self, blocking=True):
+        """Attempt to become leader.
+
+        **Kwargs:**
+            blocking (boolean): Wait for the current leader to go away.
+
+        **Returns:**
+            boolean::
+
+                ``True`` -- this process is the leader
+                ``False`` -- another process holds the lock
+
+        """
+        fd = self._open()
+
+        flags = fcntl.LOCK_EX
+        if not blocking:
+            flags |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(fd, flags)
+        except (IOError, OSError) as error:
+            log.debug('Lock "%s" held elsewhere: %s' % (self.path, error))
+            return False
+
+        # Record the leader for the benefit of operators.
+        os.ftruncate(fd, 0)
+        os.pwrite(fd, ('%d\n' % os.getpid()).encode('utf-8'), 0)
+        log.info('Acquired leadership via "%s"' % self.path)
+        self.acquired.set()
+
+        return True
+
+    def acquire_in_background(self, callback=None, interval=0.1):
+        """Poll the lock every *interval* seconds in a daemonic helper
+        thread until leadership is acquired or :meth:`release` is called.
+
+        Leaves the calling thread free to respond to signals while
+        standing by.  The helper never blocks in :func:`fcntl.flock`, so
+        :meth:`release` can stop it before the lock file is closed.
+
+        **Kwargs:**
+            callback (callable): Called (without arguments) on the helper
+            thread once leadership is acquired.
+
+            interval (float): Seconds between attempts.
+
+        **Returns:**
+            the helper :class:`threading.Thread`
+
+        """
+        self._stopping.clear()
+
+        def standby():
+            while not self._stopping.is_set():
+                if self.acquire(blocking=False):
+                    if callback is not None:
+                        callback()
+                    break
+                self._stopping.wait(interval)
+
+        self._thread = threading.Thread(target=standby, name='leader-standby')
+        self._thread.daemon = True
+        self._thread.start()
+
+        return self._thread
+
+    def leader_pid(self):
+        """PID recorded by the current leader (``None`` if unknown).
+        """
+        try:
+            with open(self.path) as lockfile:
+                return int(lockfile.read().strip() or 0) or None
+        except (IOError, OSError, ValueError):
+            return None
+
+    def release(self):
+        """Give up leadership (if held), stop the standby helper thread
+        and close the lock file.
+
+        """
+        self._stopping.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self._thread = None
+
+        if self._fd is not None:
+            if self.acquired.is_set():
+                os.ftruncate(self._fd, 0)
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self.acquired.clear()
+
+    def _forget(self):
+        """Close the inherited lock file in a forked child without
+        unlocking it, as the lock is shared with the parent.
+
+        """
+        # The parent's threads are gone, so start from fresh events.
+        self._stopping = threading.Event()
+        self._thread = None
+        if self._fd is not None:
+            try:
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = None
+        self.acquired = threading.Event()
@@ -0,0 +1,115 @@
+"""The :mod:`daemoniser.embedded` module runs a :class:`daemoniser.Daemon`
+in-process on a managed thread.
+
+Embedded mode skips daemonisation altogether, which makes it a cheap
+way to run many daemons inside a single interpreter (for example,
+under test).
+
+No PID file is written, but a daemon with a *pidfile* still keeps its
+status page, heartbeat and counters alongside it while it runs.  They
+are removed once it finishes.  The checkpoint snapshot and the
+lifecycle journal are kept, as they carry state from one run to the
+next.  A daemon created with ``pidfile=None`` writes no files at all.
+
+"""
+__all__ = [
+    "BackgroundDaemon",
+]
+
+import threading
+
+from logga.log import log
+
+
+class BackgroundDaemon(object):
+    """Handle to a :class:`daemoniser.Daemon` running on a thread.
+
+    Created by :meth:`daemoniser.Daemon.start_background`.
+
+    .. attribute:: daemon
+
+        the :class:`daemoniser.Daemon` being run
+
+    .. attribute:: error
+
+        exception raised by :meth:`daemoniser.Daemon._start` (if any)
+
+    """
+
+    def __init__(self, daemon):
+        self.daemon = daemon
+        self.error = None
+        self._thread = threading.Thread(target=self._run,
+                                        name=type(daemon).__name__)
+        self._thread.daemon = True
+
+    def start(self):
+        self._thread.start()
+
+        return self
+
+    def _run(self):
+        try:
+            self.daemon._run()
+        except BaseException as error:
+            log.exception('%s background run failed' %
+                          type(self.daemon).__name__)
+            self.error = error
+        finally:
+            # Release anyone waiting on readiness.
+            self.daemon.ready_event.set()
+            # A host tenant is cleaned up by its host (with its virtual
+            # PID file).
+            if not self.daemon.hosted:
+                self.daemon._remove_runtime_files()
+
+    @property
+    def alive(self):
+        return self._thread.is_alive()
+
+    def wait_ready(self, timeout=None):
+        """Block until the daemon signals readiness (see
+        :meth:`daemoniser.Daemon.notify_ready`).
+
+        **Kwargs:**
+            timeout (float): Seconds to wait.
+
+        **Returns:**
+            boolean::
+
+                ``True`` -- daemon is ready and still running
+                ``False`` -- timed out or the daemon has finished
+
+        """
+        return self.daemon.ready_event.wait(timeout) and self.alive
+
+    def stop(self, timeout=None):
+        """Set the daemon's exit event and wait for it to finish.
+
+        **Kwargs:**
+            timeout (float): Seconds to wait.
+
+        **Returns:**
+            boolean::
+
+                ``True`` -- daemon has stopped
+                ``False`` -- daemon is still running after *timeout*
+
+        """
+        self.daemon.set_exit_event()
+
+        return self.join(timeout)
+
+    def join(self, timeout=None):
+        """Wait for the daemon to finish without asking it to stop.
+
+        **Returns:**
+            boolean::
+
+                ``True`` -- daemon has stopped
+                ``False`` -- daemon is still running after *timeout*
+
+        """
+        self._thread.join(timeout)
+
+        return not self.alive
@@ -0,0 +1,112 @@
+"""The :mod:`daemoniser.heartbeat` module provides a liveness signal
+that a daemon process can publish cheaply and that another process can
+check without cooperation from the daemon.
+
+"""
+__all__ = [
+    "Heartbeat",
+]
+
+import os
+import mmap
+import struct
+import time
+
+from logga.log import log
+
+HEARTBEAT = struct.Struct('=d')
+
+
+class Heartbeat(object):
+    """Memory mapped monotonic timestamp.
+
+    The heartbeat file holds a single :func:`time.monotonic` value.
+    The daemon side calls :meth:`beat` (a single store into the
+    mapping -- no system call) and any other process on the host can
+    call :meth:`age` to determine how long ago the daemon last made
+    progress.
+
+    .. attribute:: path
+
+        location of the heartbeat file
+
+    """
+    _path = None
+
+    def __init__(self, path):
+        """Heartbeat initialiser.
+
+        **Args:**
+            path (str): Location of the heartbeat file.
+
+        """
+        self._path = path
+        self._mmap = None
+
+    @property
+    def path(self):
+        return self._path
+
+    def open(self):
+        """Create the heartbeat file and map it into memory.
+        """
+        if self._mmap is None:
+            log.debug('Opening heartbeat file "%s"' % self.path)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                os.ftruncate(fd, HEARTBEAT.size)
+                self._mmap = mmap.mmap(fd, HEARTBEAT.size)
+            finally:
+                os.close(fd)
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def beat(self):
+        """Record that the process is making progress.
+        """
+        if self._mmap is None:
+            self.open()
+        HEARTBEAT.pack_into(self._mmap, 0, time.monotonic())
+
+    def last(self):
+        """Read the last heartbeat timestamp.
+
+        **Returns:**
+            :func:`time.monotonic` value of the last heartbeat or ``None``
+            if the heartbeat file does not exist or has not been written
+
+        """
+        try:
+            with open(self.path, 'rb') as heartbeat:
+                data = heartbeat.read(HEARTBEAT.size)
+        except (IOError, OSError):
+            return None
+
+        if len(data) < HEARTBEAT.size:
+            return None
+
+        return HEARTBEAT.unpack(data)[0] or None
+
+    def age(self):
+        """Seconds since the last heartbeat.
+
+        **Returns:**
+            elapsed seconds or ``None`` if no heartbeat has been recorded
+
+        """
+        last = self.last()
+        if last is None:
+            return None
+
+        return time.monotonic() - last
+
+    def remove(self):
+        """Unmap and delete the heartbeat file.
+        """
+        self.close()
+        if os.path.exists(self.path):
+            log.debug('Removing heartbeat file at "%s"' % self.path)
+            os.remove(self.path)
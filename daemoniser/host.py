@@ -0,0 +1,250 @@
+"""The :mod:`daemoniser.host` module runs several lightweight
+:class:`daemoniser.Daemon` subclasses (tenants) inside a single
+daemonised process.
+
+Each tenant runs embedded on its own thread (see
+:meth:`daemoniser.Daemon.start_background`) with its own exit event,
+so a host with dozens of mostly idle tenants pays for one interpreter
+and one :meth:`daemoniser.Daemon.daemonize` instead of dozens::
+
+    >>> host = Host('/var/tmp/host.pid')
+    >>> host.add(PollerDaemon('/var/tmp/poller.pid'))
+    >>> host.add(ReaperDaemon('/var/tmp/reaper.pid'))
+    >>> host.start()
+
+Every tenant gets a virtual PID file that holds the host PID followed
+by the tenant name.  Its heartbeat, status page and counters live
+alongside the virtual PID file as usual, so the ``status`` command of
+a tenant's own :class:`daemoniser.Service` script reports on that
+tenant alone.  The ``stop`` command leaves a ``<pidfile>.stop``
+request and sends ``SIGHUP`` to the host, which then stops that tenant
+alone.  ``SIGTERM`` to the host stops every tenant.
+
+Tenants run :meth:`daemoniser.Daemon._start` off the main thread, where
+:func:`signal.signal` raises ``ValueError``.  They should register
+their ``SIGTERM`` handler with :meth:`daemoniser.Daemon.handle_signal`
+instead, which routes it through the host.  A tenant that fails this
+way is logged and does not affect the others.
+
+"""
+__all__ = [
+    "Host",
+]
+
+import os
+import time
+import signal
+import collections
+
+from logga.log import log
+from daemoniser.daemon import (Daemon,
+                               DaemonError)
+
+
+class Host(Daemon):
+    """Daemon that hosts other daemons on threads.
+
+    The host exits once it has no running tenants.
+
+    .. attribute:: tenants
+
+        ordered dictionary of tenant name to :class:`daemoniser.Daemon`
+
+    .. attribute:: poll_interval
+
+        maximum number of seconds between checks for finished tenants
+        (stop requests are acted on immediately)
+
+    """
+    _poll_interval = 5.0
+
+    def __init__(self, pidfile, tenants=None, term_parent=True):
+        """Host initialiser.
+
+        **Args:**
+            pidfile (str): Path to the host's PID file.
+
+        **Kwargs:**
+            tenants (list): :class:`daemoniser.Daemon` objects to host.
+
+            term_parent (boolean): See :class:`daemoniser.Daemon`.
+
+        """
+        self._tenants = collections.OrderedDict()
+        self._handles = {}
+        self._routes = {}
+
+        super(Host, self).__init__(pidfile, term_parent=term_parent)
+
+        for tenant in tenants or []:
+            self.add(tenant)
+
+    @property
+    def tenants(self):
+        return self._tenants
+
+    @property
+    def poll_interval(self):
+        return self._poll_interval
+
+    @poll_interval.setter
+    def poll_interval(self, value):
+        self._poll_interval = value
+
+    def add(self, daemon, name=None):
+        """Register *daemon* as a tenant.
+
+        **Args:**
+            daemon (:class:`daemoniser.Daemon`): Tenant with its own
+            PID file.
+
+        **Kwargs:**
+            name (str): Tenant name.  Defaults to the class name of
+            *daemon*.
+
+        **Raises:**
+            :mod:`daemoniser.DaemonError` if *daemon* has no PID file or
+            the name is already taken
+
+        """
+        if name is None:
+            name = type(daemon).__name__
+
+        if daemon.pidfile is None:
+            raise DaemonError('Tenant "%s" PID file has not been defined' %
+                              name)
+        if name in self._tenants:
+            raise DaemonError('Tenant "%s" already registered' % name)
+
+        self._tenants[name] = daemon
+
+    def tenant(self, name):
+        """Look up a tenant by *name*.
+
+        **Raises:**
+            :mod:`daemoniser.DaemonError` if there is no such tenant
+
+        """
+        try:
+            return self._tenants[name]
+        except KeyError:
+            raise DaemonError('Unknown tenant "%s"' % name)
+
+    def route_signal(self, tenant, signum, handler):
+        """Call *handler* when the host receives *signum* on behalf of
+        *tenant* (see :meth:`daemoniser.Daemon.handle_signal`).
+
+        Only ``SIGTERM`` is routed.  ``SIGHUP`` is reserved for stop
+        requests and the other signals are process wide.
+
+        **Returns:**
+            boolean::
+
+                ``True`` -- *handler* is routed
+                ``False`` -- *signum* cannot be routed
+
+        """
+        if signum != signal.SIGTERM:
+            log.warn('Host cannot route signal %d for tenant %s' %
+                     (signum, type(tenant).__name__))
+            return False
+
+        self._routes[id(tenant)] = handler
+
+        return True
+
+    def _exit_handler(self, signum, frame):
+        for tenant in self._tenants.values():
+            handler = self._routes.get(id(tenant))
+            if handler is None:
+                continue
+            try:
+                handler(signum, frame)
+            except Exception:
+                log.exception('Tenant %s SIGTERM handler failed' %
+                              type(tenant).__name__)
+
+        super(Host, self)._exit_handler(signum, frame)
+
+    def _start(self, event):
+        signal.signal(signal.SIGTERM, self._exit_handler)
+        self.waiter.add_signal(signal.SIGHUP)
+
+        try:
+            for name in self._tenants:
+                self._launch(name)
+            self.notify_ready()
+
+            while self._handles and not event.is_set():
+                if self.heartbeat_timeout is not None:
+                    self.pet()
+                self.wait(self.poll_interval)
+                self._service()
+        finally:
+            self._stop_tenants()
+
+    def _launch(self, name):
+        """Write the virtual PID file of tenant *name* and start it on
+        its own thread.
+
+        """
+        tenant = self._tenants[name]
+        tenant.pid = None
+        tenant._validate()
+        if tenant.pid is not None:
+            log.warn('Tenant "%s" PID file "%s" exists -- not started' %
+                     (name, tenant.pidfile))
+            return
+
+        tenant.batch = tenant.batch or self.batch
+        tenant.dry = tenant.dry or self.dry
+        with open(tenant.pidfile, 'w') as pidfile:
+            pidfile.write('%d\n%s\n' % (os.getpid(), name))
+        tenant.pid = os.getpid()
+        tenant.hosted = True
+        tenant.host = self
+        tenant._journal('daemonized')
+
+        log.info('Host starting tenant "%s"' % name)
+        self._handles[name] = tenant.start_background()
+
+    def _service(self):
+        """Act on stop requests and clean up after finished tenants.
+        """
+        for name, handle in list(self._handles.items()):
+            tenant = handle.daemon
+            request = '%s.stop' % tenant.pidfile
+            if os.path.exists(request):
+                log.info('Host stopping tenant "%s" on request' % name)
+                os.remove(request)
+                handle.stop(self.shutdown_timeout)
+
+            if handle.join(0):
+                if isinstance(handle.error, ValueError):
+                    log.error('Tenant "%s" failed: %s (register signal '
+                              'handlers with handle_signal)' %
+                              (name, handle.error))
+                elif handle.error is not None:
+                    log.error('Tenant "%s" failed: %s' % (name, handle.error))
+                else:
+                    log.info('Tenant "%s" finished' % name)
+                del self._handles[name]
+                self._routes.pop(id(tenant), None)
+                tenant._delpid()
+
+    def _stop_tenants(self):
+        """Ask every running tenant to exit and wait for them within
+        :attr:`shutdown_timeout` seconds overall.
+
+        """
+        for handle in self._handles.values():
+            handle.daemon.set_exit_event()
+
+        expires = time.monotonic() + self.shutdown_timeout
+        for name, handle in list(self._handles.items()):
+            if not handle.join(max(0.0, expires - time.monotonic())):
+                log.warn('Tenant "%s" did not stop within %.1f sec' %
+                         (name, self.shutdown_timeout))
+                continue
+            del self._handles[name]
+            handle.daemon._delpid()
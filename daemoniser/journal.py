@@ -0,0 +1,226 @@
+"""The :mod:`daemoniser.journal` module records daemon lifecycle
+transitions in an append-only binary journal kept alongside the PID
+file, and summarises restart downtime and crash frequency from it.
+
+Every record is a fixed size, so the journal can be read back at
+memory speed however large it grows::
+
+    event  reserved  pid  boot time  monotonic  wall clock
+    H      H         I    Q          d          d
+
+*pid* is the daemon process the event is about (for ``stop`` requests
+and watchdog kills this is not the recording process).  *monotonic* is
+:func:`time.monotonic`, which is comparable between processes until the
+host reboots.  Records from different boots are compared by wall clock.
+
+"""
+__all__ = [
+    "Journal",
+    "EVENTS",
+]
+
+import os
+import mmap
+import time
+import struct
+
+from logga.log import log
+
+RECORD = struct.Struct('=HHIQdd')
+
+#: Lifecycle events in record code order.
+EVENTS = ('start',
+          'daemonized',
+          'ready',
+          'stop',
+          'sigterm',
+          'exited',
+          'restart',
+          'killed')
+
+_BOOT_TIME = []
+
+
+def boot_time():
+    """Host boot time in seconds since the epoch (``0`` if unknown).
+    """
+    if not _BOOT_TIME:
+        value = 0
+        try:
+            with open('/proc/stat') as stat:
+                for line in stat:
+                    if line.startswith('btime'):
+                        value = int(line.split()[1])
+                        break
+        except (IOError, OSError, IndexError, ValueError) as error:
+            log.debug('Unable to determine boot time: %s' % error)
+        _BOOT_TIME.append(value)
+
+    return _BOOT_TIME[0]
+
+
+def _percentile(ordered, percent):
+    if not ordered:
+        return 0.0
+    rank = int(round(percent / 100.0 * (len(ordered) - 1)))
+
+    return ordered[rank]
+
+
+class Journal(object):
+    """Append-only lifecycle journal.
+
+    .. attribute:: path
+
+        location of the journal file
+
+    """
+    _path = None
+
+    def __init__(self, path):
+        """Journal initialiser.
+
+        **Args:**
+            path (str): Location of the journal file.
+
+        """
+        self._path = path
+
+    @property
+    def path(self):
+        return self._path
+
+    def record(self, event, pid=None):
+        """Append a lifecycle *event* (one of :data:`EVENTS`).
+
+        The file is opened for each record, as lifecycle events are rare
+        and a daemon closes every inherited descriptor when it detaches.
+        Failures are logged rather than raised.
+
+        **Kwargs:**
+            pid (int): Daemon process the event is about.  Defaults to
+            the current process.
+
+        """
+        if pid is None:
+            pid = os.getpid()
+
+        data = RECORD.pack(EVENTS.index(event),
+                           0,
+                           pid,
+                           boot_time(),
+                           time.monotonic(),
+                           time.time())
+        try:
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+                         0o644)
+            try:
+                # A single small O_APPEND write is never interleaved.
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+        except OSError as error:
+            log.warn('Journal "%s" record "%s" failed: %s' %
+                     (self.path, event, error))
+
+    def records(self):
+        """Iterate over the journal.
+
+        **Returns:**
+            generator of ``(event, pid, boot, monotonic, wall)`` tuples
+
+        """
+        try:
+            with open(self.path, 'rb') as journal:
+                size = os.fstat(journal.fileno()).st_size
+                # Ignore a partially written final record.
+                size -= size % RECORD.size
+                if not size:
+                    return
+                view = mmap.mmap(journal.fileno(), 0, access=mmap.ACCESS_READ)
+        except (IOError, OSError) as error:
+            log.debug('No journal at "%s": %s' % (self.path, error))
+            return
+
+        try:
+            for (code, _, pid, boot, mono, wall) in RECORD.iter_unpack(
+                    memoryview(view)[:size]):
+                yield (EVENTS[code], pid, boot, mono, wall)
+        finally:
+            view.close()
+
+    def summary(self):
+        """Summarise the journal in a single pass.
+
+        A run starts when the daemon process is ``daemonized``.  A run
+        that has no ``sigterm`` or ``exited`` record before the next
+        run starts is counted as a crash.  Downtime is the time from
+        the end of one run (its last record, for a crash) to the next
+        run becoming ``ready`` (or being ``daemonized`` if it never
+        signals readiness).
+
+        **Returns:**
+            dictionary of ``records``, ``runs``, ``crashes``,
+            ``killed`` (by the watchdog), ``span`` (seconds),
+            ``crashes_per_day`` and downtime ``p50``, ``p90``, ``p99``
+            and ``max`` (seconds)
+
+        """
+        def elapsed(earlier, later):
+            if earlier[0] == later[0]:
+                return later[1] - earlier[1]
+            return later[2] - earlier[2]
+
+        count = runs = crashes = killed = 0
+        first = last = None
+        downtimes = []
+        run_pid = None
+        ended = None
+        latest = None
+        down_from = None
+
+        for (event, pid, boot, mono, wall) in self.records():
+            count += 1
+            stamp = (boot, mono, wall)
+            if first is None:
+                first = wall
+            last = wall
+
+            if event == 'daemonized':
+                if run_pid is not None:
+                    if ended is None:
+                        crashes += 1
+                        ended = latest
+                    down_from = ended
+                    downtimes.append(elapsed(down_from, stamp))
+                runs += 1
+                run_pid = pid
+                ended = None
+                latest = stamp
+            elif pid == run_pid:
+                latest = stamp
+                if event in ('sigterm', 'exited') and ended is None:
+                    ended = stamp
+                elif event == 'killed':
+                    killed += 1
+                elif event == 'ready' and down_from is not None:
+                    downtimes[-1] = elapsed(down_from, stamp)
+                    down_from = None
+
+        downtimes.sort()
+        span = (last - first) if count else 0.0
+        crashes_per_day = 0.0
+        if span > 0:
+            crashes_per_day = crashes * 86400.0 / span
+
+        return {'records': count,
+                'runs': runs,
+                'crashes': crashes,
+                'killed': killed,
+                'span': span,
+                'crashes_per_day': crashes_per_day,
+                'restarts': len(downtimes),
+                'p50': _percentile(downtimes, 50),
+                'p90': _percentile(downtimes, 90),
+                'p99': _percentile(downtimes, 99),
+                'max': downtimes[-1] if downtimes else 0.0}
@@ -0,0 +1,282 @@
+"""The :mod:`daemoniser.pool` module provides a pool of forked worker
+processes managed by the daemon's master process.
+
+Each worker owns one slot of a :class:`daemoniser.counters.Counters`
+registry.  The pool uses the slot to account for the time the worker
+spends busy, which is the load signal used by
+:class:`daemoniser.autoscale.Autoscaler`.  A task in progress is
+credited as it runs so that long tasks do not read as idle time.
+
+"""
+__all__ = [
+    "WorkerPool",
+    "WorkerContext",
+]
+
+import os
+import sys
+import time
+import errno
+import signal
+import threading
+import contextlib
+
+from logga.log import log
+from daemoniser.counters import Counters
+from daemoniser import reaper
+
+#: Counters that the pool maintains for every worker slot.  The
+#: ``busy_since_usec`` gauge holds the ``CLOCK_MONOTONIC`` start of the
+#: task in progress (zero when idle).
+POOL_COUNTERS = ('busy_usec', 'tasks', 'busy_since_usec')
+
+
+def _usec():
+    return int(time.monotonic() * 1000000)
+
+
+class WorkerContext(object):
+    """Handed to the worker *target* callable in each worker process.
+
+    .. attribute:: index
+
+        worker slot number
+
+    .. attribute:: event
+
+        :class:`threading.Event` that is set when the worker should exit
+
+    .. attribute:: counters
+
+        :class:`daemoniser.counters.CounterSlot` for this worker
+
+    """
+
+    def __init__(self, index, counters):
+        self.index = index
+        self.counters = counters
+        self.event = threading.Event()
+
+    @contextlib.contextmanager
+    def busy(self):
+        """Account for the enclosed block as one task of busy time.
+        """
+        began = _usec()
+        self.counters.set('busy_since_usec', began)
+        try:
+            yield
+        finally:
+            # Clear the gauge first: a concurrent reader may briefly miss
+            # the task, but never counts it twice.
+            self.counters.set('busy_since_usec', 0)
+            self.counters.incr('busy_usec', _usec() - began)
+            self.counters.incr('tasks')
+
+
+class WorkerPool(object):
+    """Pool of forked workers that can be grown and shrunk at runtime.
+
+    The *target* callable is run in each worker as
+    ``target(context)`` where *context* is a :class:`WorkerContext`.
+    It should return once ``context.event`` is set.
+
+    .. attribute:: size
+
+        number of live workers
+
+    .. attribute:: max_workers
+
+        upper bound on the number of workers (and counter slots)
+
+    .. attribute:: counters
+
+        :class:`daemoniser.counters.Counters` registry with a slot per
+        potential worker
+
+    """
+
+    def __init__(self, target, max_workers, counters=None, names=None):
+        """WorkerPool initialiser.
+
+        **Args:**
+            target (callable): Worker entry point.
+
+            max_workers (int): Upper bound on the number of workers.
+
+        **Kwargs:**
+            counters (:class:`daemoniser.counters.Counters`): Registry to
+            use.  It must include the :data:`POOL_COUNTERS` and at
+            least *max_workers* slots.
+
+            names (list): Additional counter names for an internally
+            created registry.
+
+        """
+        self._target = target
+        self._max_workers = max_workers
+        if counters is None:
+            counters = Counters(POOL_COUNTERS + tuple(names or ()),
+                                max_workers)
+        self._counters = counters
+        self._workers = {}
+        self._stopping = {}
+
+    @property
+    def size(self):
+        return len(self._workers)
+
+    @property
+    def max_workers(self):
+        return self._max_workers
+
+    @property
+    def counters(self):
+        return self._counters
+
+    def spawn(self, index):
+        """Fork a worker into slot *index*.
+
+        **Returns:**
+            the worker PID
+
+        """
+        self._idle(index)
+
+        # Hold SIGTERM until the worker has its own handler, rather
+        # than run the master's on a prompt resize.
+        mask = signal.pthread_sigmask(signal.SIG_BLOCK, [signal.SIGTERM])
+        pid = reaper.fork()
+        if pid > 0:
+            signal.pthread_sigmask(signal.SIG_SETMASK, mask)
+            log.debug('Worker %d started with PID %d' % (index, pid))
+            self._workers[index] = pid
+            return pid
+
+        status = 0
+        try:
+            context = WorkerContext(index, self.counters.slot(index))
+            signal.signal(signal.SIGTERM,
+                          lambda signum, frame: context.event.set())
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            signal.pthread_sigmask(signal.SIG_SETMASK, mask)
+            self._target(context)
+        except SystemExit as error:
+            status = error.code or 0
+        except BaseException:
+            log.exception('Worker %d failed' % index)
+            status = 1
+        finally:
+            # Never return into the master's code path.
+            sys.stdout.flush()
+            os._exit(status)
+
+    def resize(self, target):
+        """Grow or shrink the pool to *target* workers.
+
+        New workers take the lowest free slots.  Workers in the highest
+        slots are asked to exit first.
+
+        """
+        target = max(0, min(target, self.max_workers))
+
+        free = [index for index in range(self.max_workers)
+                if index not in self._workers and
+                index not in self._stopping.values()]
+        while self.size < target and free:
+            self.spawn(free.pop(0))
+
+        excess = max(0, self.size - target)
+        for index in sorted(self._workers, reverse=True)[:excess]:
+            pid = self._workers.pop(index)
+            log.debug('Stopping worker %d with PID %d' % (index, pid))
+            self._stopping[pid] = index
+            self._kill(pid, signal.SIGTERM)
+
+    def reap(self, respawn=True):
+        """Collect exited workers without blocking.
+
+        **Kwargs:**
+            respawn (boolean): Replace workers that exited unexpectedly.
+
+        **Returns:**
+            list of ``(slot, pid, status)`` tuples of collected workers
+
+        """
+        collected = []
+        for pid in list(self._workers.values()) + list(self._stopping):
+            try:
+                (reaped, status) = os.waitpid(pid, os.WNOHANG)
+            except OSError as error:
+                if error.errno != errno.ECHILD:
+                    raise
+                (reaped, status) = (pid, 0)
+            if not reaped:
+                continue
+            reaper.release(pid)
+
+            if pid in self._stopping:
+                index = self._stopping.pop(pid)
+                self._idle(index)
+                collected.append((index, pid, status))
+                continue
+
+            index = [i for i, p in self._workers.items() if p == pid][0]
+            del self._workers[index]
+            self._idle(index)
+            collected.append((index, pid, status))
+            log.warn('Worker %d (PID %d) exited unexpectedly: %d' %
+                     (index, pid, status))
+            if respawn:
+                self.spawn(index)
+
+        return collected
+
+    def stop(self, timeout=10.0):
+        """Ask every worker to exit and wait up to *timeout* seconds.
+
+        Workers still running after *timeout* are killed.
+
+        """
+        self.resize(0)
+        expires = time.monotonic() + timeout
+        while self._stopping and time.monotonic() < expires:
+            self.reap(respawn=False)
+            time.sleep(0.01)
+
+        for pid, index in list(self._stopping.items()):
+            log.warn('Worker %d (PID %d) did not stop -- killing' %
+                     (index, pid))
+            self._kill(pid, signal.SIGKILL)
+            os.waitpid(pid, 0)
+            reaper.release(pid)
+            self._idle(index)
+            del self._stopping[pid]
+
+    def _idle(self, index):
+        """Clear the task in progress of a worker that has gone from slot
+        *index*.  A task cut short is not credited as busy time.
+
+        """
+        self.counters.slot(index).set('busy_since_usec', 0)
+
+    @staticmethod
+    def _kill(pid, signum):
+        try:
+            os.kill(pid, signum)
+        except OSError as error:
+            if error.errno != errno.ESRCH:
+                raise
+
+    def busy_usec(self):
+        """Total busy time across all slots in microseconds, including
+        the time so far of tasks in progress.
+
+        """
+        now = _usec()
+        busy = self.counters.total('busy_usec')
+        for index in range(self.counters.slots):
+            since = self.counters.slot(index).get('busy_since_usec')
+            if since:
+                busy += max(0, now - since)
+
+        return busy
@@ -0,0 +1,260 @@
+"""The :mod:`daemoniser.profiler` module provides on-demand CPU and
+memory profiling of a running daemon process.
+
+Profiling is driven externally (typically via the ``SIGUSR2`` handler
+installed by :class:`daemoniser.Daemon`) so that a misbehaving process
+can be inspected in place without being stopped or restarted.
+
+"""
+__all__ = [
+    "Profiler",
+]
+
+import sys
+import time
+import threading
+import collections
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from logga.log import log
+
+
+class Profiler(object):
+    """Sampling CPU profiler and :mod:`tracemalloc` snapshot manager.
+
+    Each call to :meth:`trigger` samples the stacks of every thread in
+    the process for :attr:`window` seconds.  :mod:`tracemalloc` snapshots
+    taken at the start and end of the same window are compared, and
+    tracing is stopped again afterwards (unless it was already on), so
+    allocations only pay the tracing overhead during a window.  Results
+    are written to files named after :attr:`prefix` (usually the
+    daemon's PID file)::
+
+        <prefix>.<timestamp>.stacks
+        <prefix>.<timestamp>.mem
+
+    The ``.stacks`` file is in "collapsed stack" format (one
+    semicolon-delimited stack and sample count per line) which can be
+    fed directly into common flame graph tools.
+
+    .. attribute:: prefix
+
+        path prefix of the generated report files
+
+    .. attribute:: window
+
+        number of seconds to sample for
+
+    .. attribute:: interval
+
+        seconds between stack samples
+
+    .. attribute:: top
+
+        number of memory allocation differences to report
+
+    .. attribute:: active
+
+        boolean flag that is set while a profiling window is running
+
+    """
+    _prefix = None
+    _window = 30.0
+    _interval = 0.005
+    _top = 25
+
+    def __init__(self, prefix, window=None, interval=None, top=None):
+        """Profiler initialiser.
+
+        **Args:**
+            prefix (str): Path prefix of the generated report files.
+
+        **Kwargs:**
+            window (float): Seconds to sample for.
+
+            interval (float): Seconds between stack samples.
+
+            top (int): Number of memory allocation differences to report.
+
+        """
+        self._prefix = prefix
+        if window is not None:
+            self._window = window
+        if interval is not None:
+            self._interval = interval
+        if top is not None:
+            self._top = top
+
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def prefix(self):
+        return self._prefix
+
+    @property
+    def window(self):
+        return self._window
+
+    @window.setter
+    def window(self, value):
+        self._window = value
+
+    @property
+    def interval(self):
+        return self._interval
+
+    @interval.setter
+    def interval(self, value):
+        self._interval = value
+
+    @property
+    def top(self):
+        return self._top
+
+    @top.setter
+    def top(self, value):
+        self._top = value
+
+    @property
+    def active(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def trigger(self):
+        """Start a profiling window in a background thread.
+
+        Safe to call from a signal handler as the expensive work is
+        deferred to the profiling thread.  Calls made while a window
+        is already active are ignored.
+
+        **Returns:**
+            boolean::
+
+                ``True`` -- profiling window started
+                ``False`` -- profiling window already active
+
+        """
+        with self._lock:
+            if self.active:
+                log.info('Profiler window already active -- ignoring')
+                return False
+
+            self._thread = threading.Thread(target=self._run,
+                                            name='daemoniser-profiler')
+            self._thread.daemon = True
+            self._thread.start()
+
+        return True
+
+    def join(self, timeout=None):
+        """Wait for the current profiling window to complete.
+        """
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self):
+        stamp = time.strftime('%Y%m%d%H%M%S')
+
+        started = False
+        baseline = None
+        if tracemalloc is None:
+            log.warn('tracemalloc not supported -- skipping snapshot')
+        else:
+            if not tracemalloc.is_tracing():
+                log.info('Profiler starting tracemalloc')
+                tracemalloc.start()
+                started = True
+            baseline = tracemalloc.take_snapshot()
+
+        try:
+            self.sample('%s.%s.stacks' % (self.prefix, stamp))
+            if baseline is not None:
+                self.snapshot('%s.%s.mem' % (self.prefix, stamp), baseline)
+        finally:
+            if started:
+                log.info('Profiler stopping tracemalloc')
+                tracemalloc.stop()
+
+    def sample(self, path):
+        """Sample the stacks of all other threads for :attr:`window`
+        seconds and write the collapsed stack counts to *path*.
+
+        **Args:**
+            path (str): Report file name.
+
+        **Returns:**
+            number of samples taken
+
+        """
+        log.info('Profiler sampling for %.1f sec to "%s"' %
+                 (self.window, path))
+        own_ident = threading.current_thread().ident
+        counts = collections.Counter()
+        samples = 0
+
+        deadline = time.time() + self.window
+        while time.time() < deadline:
+            for ident, frame in sys._current_frames().items():
+                if ident == own_ident:
+                    continue
+                counts[self._collapse(frame)] += 1
+            samples += 1
+            time.sleep(self.interval)
+
+        with open(path, 'w') as report:
+            for stack, count in counts.most_common():
+                report.write('%s %d\n' % (stack, count))
+
+        log.info('Profiler wrote %d samples to "%s"' % (samples, path))
+
+        return samples
+
+    def snapshot(self, path, baseline):
+        """Take a :mod:`tracemalloc` snapshot and write the top
+        allocation differences against *baseline* to *path*.
+
+        **Args:**
+            path (str): Report file name.
+
+            baseline (:class:`tracemalloc.Snapshot`): Snapshot taken
+            earlier while tracing.
+
+        **Returns:**
+            boolean::
+
+                ``True`` -- report was written
+                ``False`` -- no report (not tracing)
+
+        """
+        if tracemalloc is None or not tracemalloc.is_tracing():
+            log.warn('tracemalloc is not tracing -- skipping snapshot')
+            return False
+
+        snapshot = tracemalloc.take_snapshot()
+        with open(path, 'w') as report:
+            current, peak = tracemalloc.get_traced_memory()
+            report.write('# traced current=%d peak=%d\n' % (current, peak))
+            for stat in snapshot.compare_to(baseline, 'lineno')[:self.top]:
+                report.write('%s\n' % stat)
+
+        log.info('Profiler wrote memory diff to "%s"' % path)
+
+        return True
+
+    @staticmethod
+    def _collapse(frame):
+        stack = []
+        while frame is not None:
+            code = frame.f_code
+            stack.append('%s:%s:%d' % (code.co_filename,
+                                       code.co_name,
+                                       frame.f_lineno))
+            frame = frame.f_back
+        stack.reverse()
+
+        return ';'.join(stack)
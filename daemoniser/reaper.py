@@ -0,0 +1,311 @@
+"""The :mod:`daemoniser.reaper` module lets a daemon adopt and reap the
+processes that its children leave behind.
+
+A Linux child subreaper (``PR_SET_CHILD_SUBREAPER``) inherits the
+orphaned descendants that would otherwise be reparented to ``init``.
+They then remain part of the daemon's process tree, so they can be
+found (:func:`descendants`) and torn down (:func:`kill_tree`) along
+with the daemon.
+
+"""
+__all__ = [
+    "ChildReaper",
+    "set_child_subreaper",
+    "claim",
+    "release",
+    "fork",
+    "children",
+    "descendants",
+    "kill_tree",
+]
+
+import os
+import errno
+import signal
+import ctypes
+import collections
+
+from logga.log import log
+
+PR_SET_CHILD_SUBREAPER = 36
+
+# Exited children are inspected before they are reaped.
+PEEK = os.WEXITED | os.WNOHANG | os.WNOWAIT
+
+# Children that are waited on by their owners rather than reaped.
+_CLAIMED = set()
+
+
+def set_child_subreaper():
+    """Mark the current process as a child subreaper.
+
+    **Returns:**
+        boolean::
+
+            ``True`` -- orphaned descendants will be reparented to us
+            ``False`` -- not supported on this platform
+
+    """
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        result = libc.prctl(PR_SET_CHILD_SUBREAPER, 1, 0, 0, 0)
+    except (OSError, AttributeError) as error:
+        log.warn('Child subreaper not supported: %s' % error)
+        return False
+
+    if result != 0:
+        log.warn('Child subreaper prctl failed: %s' %
+                 os.strerror(ctypes.get_errno()))
+        return False
+
+    log.debug('PID %d is now a child subreaper' % os.getpid())
+
+    return True
+
+
+def claim(pid):
+    """Leave child *pid* for its owner to wait on.
+
+    :class:`ChildReaper` reaps every other child.  Claim a
+    :mod:`subprocess` child with ``SIGCHLD`` blocked (see
+    :func:`signal.pthread_sigmask`) until :func:`claim` returns, or use
+    :func:`fork` in place of :func:`os.fork`.
+
+    """
+    _CLAIMED.add(pid)
+
+
+def release(pid):
+    """Forget a :func:`claim` once its owner has waited on *pid*.
+    """
+    _CLAIMED.discard(pid)
+
+
+def fork():
+    """:func:`os.fork` that claims the child (see :func:`claim`) in the
+    parent.
+
+    ``SIGCHLD`` is blocked until the child is claimed, so a
+    :class:`ChildReaper` cannot reap a child that exits at once.
+
+    **Returns:**
+        as :func:`os.fork`
+
+    """
+    mask = signal.pthread_sigmask(signal.SIG_BLOCK, [signal.SIGCHLD])
+    try:
+        pid = os.fork()
+        if pid > 0:
+            claim(pid)
+        else:
+            _CLAIMED.clear()
+    finally:
+        signal.pthread_sigmask(signal.SIG_SETMASK, mask)
+
+    return pid
+
+
+def _process_tree():
+    """Map of PID to child PIDs from a single scan of ``/proc``.
+    """
+    tree = collections.defaultdict(list)
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open('/proc/%s/stat' % entry) as stat:
+                # Field 4, counted after the parenthesised command name.
+                ppid = int(stat.read().rsplit(')', 1)[1].split()[1])
+        except (IOError, OSError, IndexError, ValueError):
+            # Process exited mid-scan.
+            continue
+        tree[ppid].append(int(entry))
+
+    return tree
+
+
+def children(pid):
+    """Direct children of *pid*, including those that have exited but
+    have not been reaped.
+
+    **Returns:**
+        list of PIDs
+
+    """
+    return list(_process_tree().get(pid, []))
+
+
+def descendants(pid):
+    """Every descendant of *pid* in a single scan of ``/proc``.
+
+    **Returns:**
+        list of PIDs, parents before their children
+
+    """
+    tree = _process_tree()
+
+    found = []
+    pending = [pid]
+    while pending:
+        for child in tree.get(pending.pop(0), []):
+            found.append(child)
+            pending.append(child)
+
+    return found
+
+
+def kill_tree(pid, signum=signal.SIGTERM):
+    """Send *signum* to *pid* and then to all of its descendants.
+
+    The tree is captured before any signal is sent so that processes
+    orphaned by the signal are not missed.  Descendants that have
+    already gone are skipped.
+
+    **Returns:**
+        list of PIDs that were signalled
+
+    **Raises:**
+        ``OSError`` if *pid* itself cannot be signalled
+
+    """
+    tree = descendants(pid)
+    os.kill(pid, signum)
+
+    signalled = [pid]
+    for target in tree:
+        try:
+            os.kill(target, signum)
+        except OSError as error:
+            if error.errno != errno.ESRCH:
+                raise
+            continue
+        signalled.append(target)
+
+    log.debug('Sent signal %d to process tree of PID %d: %s' %
+              (signum, pid, signalled))
+
+    return signalled
+
+
+class ChildReaper(object):
+    """Reaps exited children that belong to the daemon on ``SIGCHLD``.
+
+    The handler installed by :meth:`install` inspects each exited child
+    with :func:`os.waitid` and ``WNOWAIT`` before collecting it.  Every
+    child is reaped, including the orphans adopted by a child subreaper,
+    except those that their owners wait on (see :func:`claim`).
+    :class:`daemoniser.pool.WorkerPool` and
+    :meth:`daemoniser.Daemon.watchdog` claim their children, so they
+    still see the exit statuses.  Register a child with :meth:`watch`
+    to be handed its exit status.
+
+    .. attribute:: reaped
+
+        total number of children reaped
+
+    """
+
+    def __init__(self):
+        self._callbacks = {}
+        self.reaped = 0
+
+    def install(self):
+        """Reap children whenever ``SIGCHLD`` is delivered.  Must be
+        called from the main thread.
+
+        """
+        signal.signal(signal.SIGCHLD, self._handler)
+
+        # Collect anything that exited before the handler was in place.
+        self.reap()
+
+    def _handler(self, signum, frame):
+        self.reap()
+
+    def watch(self, pid, callback):
+        """Call ``callback(pid, returncode)`` when child *pid* exits.
+
+        *returncode* follows the :mod:`subprocess` convention: the exit
+        code, or the negated signal number if the child was killed.
+
+        If *pid* has already exited, *callback* is called straight away.
+
+        """
+        self._callbacks[pid] = callback
+        self._collect(pid)
+
+    def adopt(self, pid):
+        """Reap child *pid* when it exits without reporting its status.
+        """
+        self.watch(pid, None)
+
+    def reap(self):
+        """Collect every exited child that is not claimed without
+        blocking.
+
+        **Returns:**
+            list of ``(pid, returncode)`` tuples
+
+        """
+        collected = []
+        while True:
+            try:
+                info = os.waitid(os.P_ALL, 0, PEEK)
+            except ChildProcessError:
+                break
+            if info is None or not info.si_pid:
+                break
+
+            if self._owns(info.si_pid):
+                result = self._collect(info.si_pid)
+                if result is not None:
+                    collected.append(result)
+                    continue
+
+            # A claimed child is first in line -- check the others
+            # individually instead.
+            for pid in children(os.getpid()):
+                if pid != info.si_pid and self._owns(pid):
+                    result = self._collect(pid)
+                    if result is not None:
+                        collected.append(result)
+            break
+
+        return collected
+
+    def _owns(self, pid):
+        return pid in self._callbacks or pid not in _CLAIMED
+
+    def _collect(self, pid):
+        """Reap *pid* if it has exited.
+
+        **Returns:**
+            ``(pid, returncode)`` tuple, or ``None`` if *pid* is still
+            running or has been reaped elsewhere
+
+        """
+        try:
+            (reaped, status) = os.waitpid(pid, os.WNOHANG)
+        except ChildProcessError:
+            self._callbacks.pop(pid, None)
+            return None
+        if not reaped:
+            return None
+
+        returncode = os.waitstatus_to_exitcode(status)
+        self.reaped += 1
+
+        callback = self._callbacks.pop(pid, None)
+        if callback is None:
+            log.debug('Reaped PID %d: %d' % (pid, returncode))
+        else:
+            self._notify(callback, pid, returncode)
+
+        return (pid, returncode)
+
+    @staticmethod
+    def _notify(callback, pid, returncode):
+        try:
+            callback(pid, returncode)
+        except Exception:
+            log.exception('Exit callback for PID %d failed' % pid)
@@ -0,0 +1,184 @@
+"""The :mod:`daemoniser.report` module times the phases of a dry run
+(``--dry``) and optionally captures a CPU profile and an allocation
+summary, so that start up and per-iteration cost can be understood
+before a daemon is deployed.
+
+"""
+__all__ = [
+    "DryRunReport",
+    "process_start_time",
+]
+
+import io
+import os
+import time
+import pstats
+import cProfile
+import contextlib
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from logga.log import log
+
+
+def process_start_time():
+    """Wall clock time at which the current process started.
+
+    Derived from ``/proc`` so it has clock tick (typically 10 ms)
+    resolution.
+
+    **Returns:**
+        seconds since the epoch or ``None`` if ``/proc`` is unavailable
+
+    """
+    try:
+        with open('/proc/self/stat') as stat:
+            # Field 22, counted after the parenthesised command name.
+            fields = stat.read().rsplit(')', 1)[1].split()
+        start_ticks = int(fields[19])
+        with open('/proc/stat') as stat:
+            for line in stat:
+                if line.startswith('btime'):
+                    boot_time = int(line.split()[1])
+                    break
+            else:
+                return None
+    except (IOError, OSError, IndexError, ValueError) as error:
+        log.debug('Unable to determine process start time: %s' % error)
+        return None
+
+    return boot_time + start_ticks / float(os.sysconf('SC_CLK_TCK'))
+
+
+class DryRunReport(object):
+    """Per-phase timings of a dry run.
+
+    .. attribute:: profile
+
+        boolean flag to capture a :mod:`cProfile` profile and a
+        :mod:`tracemalloc` allocation summary of the profiled phases
+
+    .. attribute:: phases
+
+        list of ``(name, seconds)`` tuples in the order recorded
+
+    .. attribute:: top
+
+        number of functions and allocation sites to report
+
+    """
+    _profile = False
+    _top = 15
+
+    def __init__(self, profile=None, top=None):
+        """DryRunReport initialiser.
+
+        **Kwargs:**
+            profile (boolean): Capture a profile and allocation summary.
+
+            top (int): Number of functions and allocation sites to report.
+
+        """
+        if profile is not None:
+            self._profile = profile
+        if top is not None:
+            self._top = top
+
+        self.phases = []
+        self._profiler = None
+        self._snapshot = None
+        self._memory = None
+        self._tracing = False
+
+    @property
+    def profile(self):
+        return self._profile
+
+    @profile.setter
+    def profile(self, value):
+        self._profile = value
+
+    @property
+    def top(self):
+        return self._top
+
+    def add(self, name, seconds):
+        """Record a phase that was timed elsewhere.
+        """
+        if seconds is not None:
+            self.phases.append((name, seconds))
+
+    @contextlib.contextmanager
+    def phase(self, name, profile=False):
+        """Time the enclosed block as phase *name*.
+
+        **Kwargs:**
+            profile (boolean): Include the block in the profile and
+            allocation summary (when :attr:`profile` is set).
+
+        """
+        profiling = self.profile and profile
+        if profiling:
+            self._start_profile()
+
+        began = time.monotonic()
+        try:
+            yield
+        finally:
+            self.phases.append((name, time.monotonic() - began))
+            if profiling:
+                self._stop_profile()
+
+    def _start_profile(self):
+        if self._profiler is None:
+            self._profiler = cProfile.Profile()
+        if tracemalloc is not None and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._tracing = True
+        self._profiler.enable()
+
+    def _stop_profile(self):
+        self._profiler.disable()
+        if tracemalloc is not None and tracemalloc.is_tracing():
+            self._snapshot = tracemalloc.take_snapshot()
+            self._memory = tracemalloc.get_traced_memory()
+            # Tracing slows every allocation -- only keep it on if
+            # someone else started it.
+            if self._tracing:
+                tracemalloc.stop()
+                self._tracing = False
+
+    def render(self):
+        """Format the report.
+
+        **Returns:**
+            the report as a string
+
+        """
+        lines = ['Dry run report:', '  %-24s %12s' % ('phase', 'seconds')]
+        for name, seconds in self.phases:
+            lines.append('  %-24s %12.6f' % (name, seconds))
+        lines.append('  %-24s %12.6f' %
+                     ('total', sum(seconds for _, seconds in self.phases)))
+
+        if self._profiler is not None:
+            stream = io.StringIO()
+            stats = pstats.Stats(self._profiler, stream=stream)
+            stats.sort_stats('cumulative').print_stats(self.top)
+            lines.append('')
+            lines.append('Profile (top %d by cumulative time):' % self.top)
+            lines.extend('  %s' % line
+                         for line in stream.getvalue().strip().splitlines())
+
+        if self._snapshot is not None:
+            (current, peak) = self._memory
+            lines.append('')
+            lines.append('Allocations (current %d bytes, peak %d bytes):' %
+                         (current, peak))
+            for stat in self._snapshot.statistics('lineno')[:self.top]:
+                lines.append('  %s' % stat)
+
+        return '\n'.join(lines)
@@ -6,11 +6,14 @@ __all__ = [
     "Service",
 ]
 import os
+import time
 from optparse import OptionParser
 
 from logga.log import (log,
                        set_console,
                        set_log_level)
+from daemoniser.report import (DryRunReport,
+                               process_start_time)
 
 
 class Service(object):
@@ -44,6 +47,11 @@ class Service(object):
 
         only report, do not execute flag (single iteration)
 
+    .. attribute:: report
+
+        :class:`daemoniser.report.DryRunReport` of phase timings
+        that is printed after a dry run
+
     .. attribute:: batch
 
         single iteration execution flag
@@ -58,7 +66,8 @@ class Service(object):
 
     """
     _config = None
-    _usage = 'usage: %prog [options] start|stop|status'
+    _usage = ('usage: %prog [options] '
+              'start|stop|status|profile|watchdog|journal')
     _parser = OptionParser(usage=_usage)
     _options = None
     _args = []
@@ -67,7 +76,12 @@ class Service(object):
     _batch = False
     _pidfile = None
     _script_name = None
-    _supported_commands = ['start', 'stop', 'status']
+    _supported_commands = ['start',
+                           'stop',
+                           'status',
+                           'profile',
+                           'watchdog',
+                           'journal']
 
     @property
     def config(self):
@@ -123,6 +137,10 @@ class Service(object):
     def dry(self, value):
         self._dry = value
 
+    @property
+    def report(self):
+        return self._report
+
     @property
     def batch(self):
         return self._batch
@@ -166,6 +184,11 @@ class Service(object):
         """:class:`daemoniser.Service` initialisation.
 
         """
+        self._report = DryRunReport()
+        started = process_start_time()
+        if started is not None:
+            self._report.add('interpreter and imports', time.time() - started)
+
         if config is not None:
             self._config = config
 
@@ -178,6 +201,11 @@ class Service(object):
                                 dest='dry',
                                 action='store_true',
                                 help='dry run - report only, do not execute')
+        self._parser.add_option('-p', '--profile',
+                                dest='profile',
+                                action='store_true',
+                                help=('with --dry, add a profile and '
+                                      'allocation summary to the report'))
         self._parser.add_option('-b', '--batch',
                                 dest='batch',
                                 action='store_true',
@@ -187,6 +215,16 @@ class Service(object):
                                 default=self._config,
                                 help=('override default config "%s"' %
                                       self._config))
+        self._parser.add_option('-l', '--listen',
+                                dest='listen',
+                                action='append',
+                                default=[],
+                                help=('pre-bind listening socket '
+                                      '(host:port or path) - repeatable'))
+        self._parser.add_option('-t', '--tenant',
+                                dest='tenant',
+                                help=('with stop or status, address a single '
+                                      'tenant of a daemoniser.host.Host'))
 
     def check_args(self, script_name, command=None):
         """Verify that the daemon arguments are as expected.
@@ -208,6 +246,7 @@ class Service(object):
             on the command line (unless the :attr:`command` is predefined.
 
         """
+        began = time.monotonic()
         (options, args) = self.parser.parse_args()
 
         if options.dry is not None:
@@ -221,14 +260,20 @@ class Service(object):
                 self.parser.error('command "%s" not supported' % cmd)
 
             if (cmd != 'start' and
-               (options.dry or options.batch)):
+                    (options.dry or
+                     options.batch or
+                     options.listen or
+                     options.profile)):
                 self.parser.error('invalid option(s) with command "%s"' %
                                   cmd)
 
+        if options.tenant is not None and cmd not in ('stop', 'status'):
+            self.parser.error('--tenant is only valid with stop or status')
+
         if len(args):
             self.parser.error("unknown arguments")
 
-        if cmd == 'status':
+        if cmd in ('status', 'journal'):
             set_console()
 
         if options.verbose == 0:
@@ -244,11 +289,63 @@ class Service(object):
         if self.command == 'start':
             self.dry = (self.options.dry is not None)
             self.batch = (self.options.batch is not None)
+            self.report.profile = (self.options.profile is not None)
+
+        self.report.add('config', time.monotonic() - began)
+
+    @staticmethod
+    def _print_status_page(obj):
+        """Report the contents of *obj*'s status page (if any).
+        """
+        if obj.status_page is None:
+            return
+
+        page = obj.status_page.read()
+        if page is None or page['pid'] != obj.pid:
+            return
+
+        now = time.time()
+        print('  state: %s' % page['state'])
+        print('  uptime: %.1f sec' % (now - page['started']))
+        if page['last_activity']:
+            print('  last activity: %.1f sec ago' %
+                  (now - page['last_activity']))
+        print('  iterations: %d' % page['iterations'])
+        print('  queue depth: %d' % page['queue_depth'])
+        print('  latency p50/p99/max: %.6f/%.6f/%.6f sec' %
+              (page['p50'], page['p99'], page['max']))
+
+    @staticmethod
+    def _print_journal(obj, script_name):
+        """Summarise *obj*'s lifecycle journal.
+        """
+        if obj.journal is None:
+            print('%s has no journal' % script_name)
+            return
+
+        summary = obj.journal.summary()
+        print('%s journal: %d records, %d runs over %.1f days' %
+              (script_name,
+               summary['records'],
+               summary['runs'],
+               summary['span'] / 86400.0))
+        print('  crashes: %d (%.2f per day, %d killed by watchdog)' %
+              (summary['crashes'],
+               summary['crashes_per_day'],
+               summary['killed']))
+        print('  downtime over %d restarts p50/p90/p99/max: '
+              '%.3f/%.3f/%.3f/%.3f sec' %
+              (summary['restarts'],
+               summary['p50'],
+               summary['p90'],
+               summary['p99'],
+               summary['max']))
 
     def launch_command(self, obj, script_name, inline=False):
         """Run :attr:`command` based on *obj* context.
 
-        Supported command are start, stop and status.
+        Supported command are start, stop, status, profile, watchdog
+        and journal.
 
         **Args:**
             *obj*: the :class:`top.Daemon` based object instance
@@ -256,22 +353,47 @@ class Service(object):
 
             *script_name*: the calling script's name
 
+        With the ``--tenant`` option, stop and status address the named
+        tenant of *obj* (a :class:`daemoniser.host.Host`) rather than
+        *obj* itself.
+
         """
+        tenant = None
+        if self.options is not None:
+            tenant = getattr(self.options, 'tenant', None)
+        if tenant is not None:
+            obj = obj.tenant(tenant)
+            script_name = '%s/%s' % (script_name, tenant)
+
         if self.command == 'start':
             msg = 'Starting %s' % script_name
-            if self.dry or inline:
+            if self.dry:
+                obj.dry = True
+                obj.report = self.report
+                msg = '%s dry run' % msg
+            elif inline:
                 obj.inline = True
                 msg = '%s inline' % msg
             else:
                 msg = '%s as daemon' % msg
 
             if self.batch:
+                obj.batch = True
                 msg = '%s (batch mode)' % msg
 
+            # Leave the sockets of a running daemon alone -- start
+            # aborts on the existing PID file.
+            if self.options is not None and obj.pid is None:
+                for address in self.options.listen:
+                    obj.bind(address)
+                    msg = '%s (listening on %s)' % (msg, address)
+
             print('%s ...' % msg)
 
             if not obj.start():
                 print('Start aborted')
+            elif self.dry:
+                print(self.report.render())
         elif self.command == 'stop':
             print('Stopping %s ...' % script_name)
             if obj.stop():
@@ -281,7 +403,34 @@ class Service(object):
         elif self.command == 'status':
             if obj.status():
                 print('%s is running with PID %d' % (script_name, obj.pid))
+                self._print_status_page(obj)
+                if obj.counters is not None:
+                    for name, value in sorted(obj.counters.totals().items()):
+                        print('  %s: %d' % (name, value))
+                for name, hosted in getattr(obj, 'tenants', {}).items():
+                    state = 'idle'
+                    if hosted.status():
+                        state = 'running'
+                    elif hosted.is_alive():
+                        state = 'hung'
+                    print('  tenant %s: %s' % (name, state))
+            elif obj.is_alive():
+                print('%s is hung with PID %d (heartbeat %.1f sec stale)' %
+                      (script_name, obj.pid, obj.heartbeat.age()))
+                self._print_status_page(obj)
             else:
                 print('%s is idle' % script_name)
+        elif self.command == 'profile':
+            print('Profiling %s ...' % script_name)
+            if obj.profile():
+                print('OK -- reports will be written alongside "%s"' %
+                      obj.pidfile)
+            else:
+                print('Profile aborted')
+        elif self.command == 'watchdog':
+            print('Supervising %s ...' % script_name)
+            obj.watchdog()
+        elif self.command == 'journal':
+            self._print_journal(obj, script_name)
         else:
             print('Do not know command "%s"' % self.command)
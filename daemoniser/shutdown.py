@@ -0,0 +1,190 @@
+"""The :mod:`daemoniser.shutdown` module provides a registry of cleanup
+hooks that are run with bounded latency when a daemon stops.
+
+"""
+__all__ = [
+    "ShutdownHooks",
+]
+
+import time
+import threading
+import itertools
+
+from logga.log import log
+
+
+class ShutdownHooks(object):
+    """Priority tiered shutdown hook registry.
+
+    Hooks are grouped into tiers by *priority* and the tiers are run in
+    ascending priority order.  All hooks within a tier run concurrently
+    on their own threads.  Each hook is allowed its own *timeout* and
+    the whole run is bounded by :attr:`deadline`.  Hooks that overrun
+    are abandoned (their threads are daemonic) and reported.
+
+    .. attribute:: deadline
+
+        overall number of seconds allowed for all tiers
+
+    .. attribute:: timings
+
+        dictionary of ``(sequence, name)`` hook key to elapsed seconds
+        from the last :meth:`run` (``None`` for hooks that did not
+        complete).  *sequence* is the registration order, so hooks
+        that share a name are timed separately
+
+    """
+    _deadline = 30.0
+
+    def __init__(self, deadline=None):
+        """ShutdownHooks initialiser.
+
+        **Kwargs:**
+            deadline (float): Overall seconds allowed for all tiers.
+
+        """
+        if deadline is not None:
+            self._deadline = deadline
+
+        self._hooks = []
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._done = False
+        self.timings = {}
+
+    @property
+    def deadline(self):
+        return self._deadline
+
+    @deadline.setter
+    def deadline(self, value):
+        self._deadline = value
+
+    def add(self, fn, priority=0, timeout=None, name=None):
+        """Register *fn* to be called at shutdown.
+
+        **Args:**
+            fn (callable): Hook that takes no arguments.
+
+        **Kwargs:**
+            priority (int): Tier number.  Lower tiers run first.
+
+            timeout (float): Seconds allowed for this hook (bounded by
+            :attr:`deadline`).
+
+            name (str): Name used when logging.  Defaults to the
+            name of *fn*.
+
+        """
+        if name is None:
+            name = getattr(fn, '__name__', repr(fn))
+
+        with self._lock:
+            self._hooks.append((priority,
+                                next(self._sequence),
+                                name,
+                                fn,
+                                timeout))
+
+    def tiers(self):
+        """Registered hooks grouped by priority.
+
+        **Returns:**
+            list of ``(priority, [(sequence, name, fn, timeout), ...])``
+            tuples in run order
+
+        """
+        with self._lock:
+            hooks = sorted(self._hooks)
+
+        return [(priority, [h[1:] for h in group])
+                for priority, group in itertools.groupby(hooks,
+                                                         lambda h: h[0])]
+
+    def reset(self):
+        """Allow the hooks to :meth:`run` again, for example when a
+        daemon object is restarted.
+
+        """
+        with self._lock:
+            self._done = False
+            self.timings = {}
+
+    def run(self):
+        """Run all registered hooks.
+
+        Subsequent calls are ignored until :meth:`reset`.
+
+        **Returns:**
+            boolean::
+
+                ``True`` -- all hooks completed in time and without error
+                ``False`` -- otherwise
+
+        """
+        with self._lock:
+            if self._done:
+                return True
+            self._done = True
+
+        tiers = self.tiers()
+        if not tiers:
+            return True
+
+        began = time.monotonic()
+        expires = began + self.deadline
+        status = True
+
+        for priority, hooks in tiers:
+            log.debug('Running %d shutdown hook(s) at priority %d' %
+                      (len(hooks), priority))
+            if not self._run_tier(hooks, expires):
+                status = False
+
+        log.info('Shutdown hooks took %.3f sec' % (time.monotonic() - began))
+
+        return status
+
+    def _run_tier(self, hooks, expires):
+        status = True
+        errors = {}
+        threads = []
+
+        for sequence, name, fn, timeout in hooks:
+            key = (sequence, name)
+            thread = threading.Thread(target=self._call,
+                                      args=(key, fn, errors),
+                                      name='shutdown-%s' % name)
+            thread.daemon = True
+            self.timings[key] = None
+            thread.start()
+            threads.append((key, thread, time.monotonic(), timeout))
+
+        for key, thread, started, timeout in threads:
+            name = key[1]
+            limit = expires
+            if timeout is not None:
+                limit = min(limit, started + timeout)
+            thread.join(max(0.0, limit - time.monotonic()))
+
+            if thread.is_alive():
+                log.warn('Shutdown hook "%s" abandoned after %.3f sec' %
+                         (name, time.monotonic() - started))
+                status = False
+            elif key in errors:
+                log.error('Shutdown hook "%s" failed: %s' %
+                          (name, errors[key]))
+                status = False
+            elif self.timings.get(key) is not None:
+                log.info('Shutdown hook "%s" took %.3f sec' %
+                         (name, self.timings[key]))
+
+        return status
+
+    def _call(self, key, fn, errors):
+        began = time.monotonic()
+        try:
+            fn()
+        except Exception as error:
+            errors[key] = error
+        self.timings[key] = time.monotonic() - began
@@ -0,0 +1,196 @@
+"""The :mod:`daemoniser.stats` module provides low overhead latency
+recording for daemon work loops.
+
+"""
+__all__ = [
+    "Histogram",
+    "LoopStats",
+]
+
+
+class Histogram(object):
+    """Fixed-bucket, log-linear latency histogram.
+
+    Values are recorded as integer microseconds into buckets arranged in
+    the same manner as an HDR histogram: each power-of-two range is split
+    into ``2 ** precision`` linear sub-buckets.  Recording is a couple of
+    integer operations and a list increment so the cost per sample
+    stays flat regardless of the number of samples.  The relative error
+    of a reported value is bounded by ``1 / 2 ** precision``.
+
+    .. attribute:: precision
+
+        number of sub-bucket bits per power-of-two range
+
+    .. attribute:: highest
+
+        largest trackable value in microseconds.  Larger values are
+        clamped into the last bucket (:attr:`max` remains exact)
+
+    .. attribute:: count
+
+        number of recorded values
+
+    .. attribute:: max
+
+        largest recorded value in microseconds
+
+    """
+    _precision = 4
+    _highest = 1 << 36
+
+    def __init__(self, precision=None, highest=None):
+        """Histogram initialiser.
+
+        **Kwargs:**
+            precision (int): Number of sub-bucket bits.
+
+            highest (int): Largest trackable value in microseconds.
+
+        """
+        if precision is not None:
+            self._precision = precision
+        if highest is not None:
+            self._highest = highest
+
+        self._sub_buckets = 1 << self._precision
+        self._counts = [0] * (self._index(self._highest) + 1)
+        self._last = len(self._counts) - 1
+        self.count = 0
+        self.max = 0
+
+    @property
+    def precision(self):
+        return self._precision
+
+    @property
+    def highest(self):
+        return self._highest
+
+    def _index(self, value):
+        sub_buckets = self._sub_buckets
+        if value < sub_buckets << 1:
+            return value
+
+        shift = value.bit_length() - self._precision - 1
+
+        return (shift + 1) * sub_buckets + (value >> shift) - sub_buckets
+
+    def _lowest_value(self, index):
+        sub_buckets = self._sub_buckets
+        if index < sub_buckets << 1:
+            return index
+
+        shift = index // sub_buckets - 1
+
+        return (index % sub_buckets + sub_buckets) << shift
+
+    def record(self, value):
+        """Add *value* (integer microseconds) to the histogram.
+        """
+        if value < 0:
+            value = 0
+
+        index = self._index(value) if value < self._highest else self._last
+        self._counts[index] += 1
+        self.count += 1
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, percent):
+        """Value at *percent* (0 to 100) of the recorded distribution.
+
+        **Returns:**
+            upper bound of the bucket in microseconds that contains the
+            requested percentile (never larger than :attr:`max`), or
+            ``0`` if nothing has been recorded
+
+        """
+        if not self.count:
+            return 0
+
+        target = max(1, int(self.count * percent / 100.0 + 0.5))
+        seen = 0
+        for index, bucket in enumerate(self._counts):
+            seen += bucket
+            if seen >= target and index < self._last:
+                return min(self._lowest_value(index + 1) - 1, self.max)
+
+        return self.max
+
+    def reset(self):
+        """Clear all recorded values.
+        """
+        self._counts = [0] * len(self._counts)
+        self.count = 0
+        self.max = 0
+
+
+class LoopStats(object):
+    """Per-iteration accounting for :meth:`daemoniser.Daemon.run_loop`.
+
+    .. attribute:: histogram
+
+        :class:`Histogram` of iteration latencies
+
+    .. attribute:: iterations
+
+        number of completed iterations
+
+    .. attribute:: overruns
+
+        number of iterations that took longer than the loop interval
+
+    .. attribute:: idle
+
+        total seconds spent waiting between iterations
+
+    """
+
+    def __init__(self):
+        self.histogram = Histogram()
+        self.iterations = 0
+        self.overruns = 0
+        self.idle = 0.0
+
+    def record(self, elapsed, interval):
+        """Account for a single loop iteration.
+
+        **Args:**
+            elapsed (float): Seconds taken by the iteration.
+
+            interval (float): Target loop period in seconds.
+
+        **Returns:**
+            seconds remaining before the next iteration is due (``0.0``
+            on overrun)
+
+        """
+        self.histogram.record(int(elapsed * 1000000))
+        self.iterations += 1
+
+        remaining = interval - elapsed
+        if remaining <= 0:
+            self.overruns += 1
+            remaining = 0.0
+
+        return remaining
+
+    def summary(self):
+        """Current loop statistics.
+
+        **Returns:**
+            dictionary of iteration counts and latency percentiles
+            (in seconds)
+
+        """
+        histogram = self.histogram
+
+        return {
+            'iterations': self.iterations,
+            'overruns': self.overruns,
+            'idle': self.idle,
+            'p50': histogram.percentile(50) / 1000000.0,
+            'p99': histogram.percentile(99) / 1000000.0,
+            'max': histogram.max / 1000000.0,
+        }
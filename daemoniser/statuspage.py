@@ -0,0 +1,203 @@
+"""The :mod:`daemoniser.statuspage` module provides a fixed-layout,
+memory mapped status record that a daemon keeps up to date and that
+other processes can read without any cooperation from the daemon.
+
+"""
+__all__ = [
+    "StatusPage",
+    "STATES",
+]
+
+import os
+import mmap
+import struct
+import time
+
+from logga.log import log
+
+#: Lifecycle states published in the status page.
+STATES = ('unknown',
+          'starting',
+          'running',
+          'stopping',
+          'stopped',
+          'standby')
+
+USER_FIELDS = 8
+SEQ = struct.Struct('=Q')
+BODY = struct.Struct('=IIddQQddd%dd' % USER_FIELDS)
+ACTIVITY = struct.Struct('=dQ')
+ACTIVITY_OFFSET = SEQ.size + struct.calcsize('=IId')
+STATS = struct.Struct('=ddd')
+STATS_OFFSET = SEQ.size + struct.calcsize('=IIddQQ')
+SIZE = SEQ.size + BODY.size
+FIELDS = ('state',
+          'pid',
+          'started',
+          'last_activity',
+          'iterations',
+          'queue_depth',
+          'p50',
+          'p99',
+          'max')
+
+
+class StatusPage(object):
+    """Seqlock protected status record in a memory mapped file.
+
+    The daemon is the only writer.  Each write bumps the sequence
+    number to an odd value, updates the record and bumps the sequence
+    number again.  A reader copies the record and retries if the
+    sequence number was odd or changed in the meantime, so a reader
+    never blocks the writer and never sees a torn record.
+
+    The record holds the lifecycle state, PID, start time, last
+    activity time, iteration count, queue depth, :meth:`run_loop
+    <daemoniser.Daemon.run_loop>` latency percentiles and
+    ``USER_FIELDS`` free-form floating point values.
+
+    .. attribute:: path
+
+        location of the status page file
+
+    """
+    _path = None
+
+    def __init__(self, path):
+        """StatusPage initialiser.
+
+        **Args:**
+            path (str): Location of the status page file.
+
+        """
+        self._path = path
+        self._mmap = None
+        self._seq = 0
+        self._values = None
+
+    @property
+    def path(self):
+        return self._path
+
+    def open(self):
+        """Create the status page file and map it into memory.
+        """
+        if self._mmap is None:
+            log.debug('Opening status page "%s"' % self.path)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                os.ftruncate(fd, SIZE)
+                self._mmap = mmap.mmap(fd, SIZE)
+            finally:
+                os.close(fd)
+            self._values = [0, os.getpid(), time.time(), 0.0, 0, 0,
+                            0.0, 0.0, 0.0] + [0.0] * USER_FIELDS
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def remove(self):
+        """Unmap and delete the status page file.
+        """
+        self.close()
+        if os.path.exists(self.path):
+            log.debug('Removing status page at "%s"' % self.path)
+            os.remove(self.path)
+
+    def _begin(self):
+        if self._mmap is None:
+            self.open()
+        self._seq += 1
+        SEQ.pack_into(self._mmap, 0, self._seq)
+
+    def _end(self):
+        self._seq += 1
+        SEQ.pack_into(self._mmap, 0, self._seq)
+
+    def update(self, state=None, queue_depth=None, user=None):
+        """Publish the whole record.
+
+        **Kwargs:**
+            state (str): One of :data:`STATES`.
+
+            queue_depth (int): Number of outstanding work items.
+
+            user (list): Up to ``USER_FIELDS`` floating point values.
+
+        """
+        self._begin()
+        values = self._values
+        if state is not None:
+            values[0] = STATES.index(state)
+        if queue_depth is not None:
+            values[5] = queue_depth
+        if user is not None:
+            values[9:9 + len(user)] = user[:USER_FIELDS]
+        BODY.pack_into(self._mmap, SEQ.size, *values)
+        self._end()
+
+    def touch(self, iterations):
+        """Publish the last activity time and iteration count.
+
+        This is the cheap, per-iteration update.
+
+        """
+        self._begin()
+        now = time.time()
+        self._values[3] = now
+        self._values[4] = iterations
+        ACTIVITY.pack_into(self._mmap, ACTIVITY_OFFSET, now, iterations)
+        self._end()
+
+    def publish_stats(self, p50, p99, maximum):
+        """Publish loop latency percentiles (seconds).
+        """
+        self._begin()
+        self._values[6:9] = [p50, p99, maximum]
+        STATS.pack_into(self._mmap, STATS_OFFSET, p50, p99, maximum)
+        self._end()
+
+    def read(self, retries=100):
+        """Take a consistent copy of the record.
+
+        **Kwargs:**
+            retries (int): Attempts before giving up on a busy writer.
+
+        **Returns:**
+            dictionary of status fields (with ``state`` as a name from
+            :data:`STATES` and ``user`` as a list) or ``None`` if the
+            page does not exist or could not be read consistently
+
+        """
+        try:
+            with open(self.path, 'rb') as page:
+                view = mmap.mmap(page.fileno(), SIZE, access=mmap.ACCESS_READ)
+        except (IOError, OSError, ValueError) as error:
+            log.debug('Unable to read status page "%s": %s' %
+                      (self.path, error))
+            return None
+
+        try:
+            for _ in range(retries):
+                before = SEQ.unpack_from(view, 0)[0]
+                if before & 1:
+                    continue
+                values = BODY.unpack_from(view, SEQ.size)
+                if SEQ.unpack_from(view, 0)[0] == before:
+                    break
+            else:
+                log.warn('Status page "%s" busy -- giving up' % self.path)
+                return None
+        finally:
+            view.close()
+
+        status = dict(zip(FIELDS, values))
+        if values[0] >= len(STATES):
+            status['state'] = STATES[0]
+        else:
+            status['state'] = STATES[values[0]]
+        status['user'] = list(values[len(FIELDS):])
+
+        return status
@@ -0,0 +1,295 @@
+"""The :mod:`daemoniser.testing` module is a :mod:`pytest` plugin with
+fixtures that make :class:`daemoniser.Daemon` lifecycle tests fast and
+safe to run in parallel.
+
+The plugin needs :mod:`pytest`, which is installed with the
+``testing`` extra (``pip install python-daemoniser[testing]``).
+Enable it from your ``conftest.py``::
+
+    pytest_plugins = ['daemoniser.testing']
+
+Then, for example::
+
+    def test_lifecycle(pidfile, fast_daemonize, daemon_reaper):
+        daemon = MyDaemon(pidfile)
+        assert daemon.start()
+        assert wait_for_pid(daemon) is not None
+        assert daemon.stop()
+        assert wait_for(lambda: not os.path.exists(pidfile))
+
+Each test gets its own PID file directory so tests do not collide
+under ``pytest-xdist``.  Any process or background daemon that is still
+running when a test finishes is torn down by :func:`daemon_reaper`.
+
+"""
+__all__ = [
+    "wait_for",
+    "wait_for_pid",
+    "fast_start_daemon",
+    "Reaper",
+    "pidfile_dir",
+    "pidfile",
+    "daemon_reaper",
+    "fast_daemonize",
+]
+
+import os
+import sys
+import time
+import errno
+import signal
+
+import pytest
+
+from logga.log import log
+from daemoniser.daemon import (Daemon,
+                               DaemonError)
+from daemoniser.embedded import BackgroundDaemon
+
+
+def wait_for(predicate, timeout=5.0, interval=0.005):
+    """Poll *predicate* until it returns a true value.
+
+    **Args:**
+        predicate (callable): Condition to wait for.
+
+    **Kwargs:**
+        timeout (float): Seconds to wait.
+
+        interval (float): Seconds between polls.
+
+    **Returns:**
+        the last value returned by *predicate*
+
+    """
+    expires = time.monotonic() + timeout
+    result = predicate()
+    while not result and time.monotonic() < expires:
+        time.sleep(interval)
+        result = predicate()
+
+    return result
+
+
+def _read_pid(daemon):
+    daemon.pid = None
+    try:
+        daemon._validate()
+    except DaemonError:
+        # PID file caught mid-write.
+        daemon.pid = None
+
+    return daemon.pid
+
+
+def wait_for_pid(daemon, timeout=5.0):
+    """Wait for *daemon* to come up and return its PID.
+
+    The daemon is up once its status page shows the PID file's process
+    as ``running`` (or ``standby``), or its journal has a ``ready``
+    record for that process.  A PID file on its own only means the
+    daemon has forked, so it is returned on timeout as a fallback for
+    daemons that keep neither.
+
+    **Kwargs:**
+        timeout (float): Seconds to wait.
+
+    **Returns:**
+        the daemon PID or ``None`` if no PID file was written
+
+    """
+    def ready():
+        pid = _read_pid(daemon)
+        if pid is None:
+            return None
+
+        page = daemon.status_page
+        status = page.read() if page is not None else None
+        if (status is not None and
+                status['pid'] == pid and
+                status['state'] in ('running', 'standby')):
+            return pid
+
+        journal = daemon.journal
+        if journal is not None:
+            for (event, journal_pid, _, _, _) in journal.records():
+                if event == 'ready' and journal_pid == pid:
+                    return pid
+
+        return None
+
+    pid = wait_for(ready, timeout=timeout)
+    if pid is None:
+        pid = _read_pid(daemon)
+        if pid is not None:
+            log.warn('PID %d from "%s" did not report ready' %
+                     (pid, daemon.pidfile))
+
+    return pid
+
+
+def fast_start_daemon(daemon, reaper=None):
+    """Stand-in for :meth:`daemoniser.Daemon._start_daemon` that forks
+    once and skips the file descriptor sweep.
+
+    The calling process always returns (it is never terminated), so
+    this is safe to call from within a test.
+
+    **Args:**
+        daemon (:class:`daemoniser.Daemon`): Daemon to start.
+
+    **Kwargs:**
+        reaper (:class:`Reaper`): Tracks the forked PID for cleanup.
+
+    **Returns:**
+        boolean::
+
+            ``True`` -- daemon process forked
+            ``False`` -- daemon may already be running
+
+    """
+    if daemon.pid is not None:
+        log.warn('PID file "%s" exists.  Daemon may be running?' %
+                 daemon.pidfile)
+        return False
+
+    pid = os.fork()
+    if pid > 0:
+        if reaper is not None:
+            reaper.track(pid)
+        return True
+
+    status = 0
+    try:
+        os.setsid()
+        with open(daemon.pidfile, 'w') as pidfile:
+            pidfile.write('%d\n' % os.getpid())
+        try:
+            daemon._run()
+        finally:
+            daemon._delpid()
+    except SystemExit as error:
+        status = error.code or 0
+    except BaseException:
+        log.exception('%s failed' % type(daemon).__name__)
+        status = 1
+    finally:
+        # Never return into the test runner.
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(status)
+
+
+class Reaper(object):
+    """Tracks processes and background daemons started by a test and
+    tears down any that are left running.
+
+    """
+
+    def __init__(self, grace=2.0):
+        self.grace = grace
+        self._pids = []
+        self._handles = []
+
+    def track(self, target):
+        """Track a PID or a :class:`daemoniser.embedded.BackgroundDaemon`.
+
+        **Returns:**
+            *target*
+
+        """
+        if isinstance(target, BackgroundDaemon):
+            self._handles.append(target)
+        else:
+            self._pids.append(target)
+
+        return target
+
+    def track_daemon(self, daemon):
+        """Track the process recorded in *daemon*'s PID file.
+        """
+        pid = _read_pid(daemon)
+        if pid is not None:
+            self.track(pid)
+
+    def reap(self):
+        """Stop everything that is still running.
+        """
+        for handle in self._handles:
+            if not handle.stop(self.grace):
+                log.warn('%s did not stop within %.1f sec' %
+                         (type(handle.daemon).__name__, self.grace))
+        del self._handles[:]
+
+        for pid in self._pids:
+            self._kill(pid, signal.SIGTERM)
+        expires = time.monotonic() + self.grace
+        for pid in self._pids:
+            if not wait_for(lambda: not self._alive(pid),
+                            timeout=max(0.0, expires - time.monotonic())):
+                log.warn('PID %d ignored SIGTERM -- killing' % pid)
+                self._kill(pid, signal.SIGKILL)
+                wait_for(lambda: not self._alive(pid), timeout=self.grace)
+        del self._pids[:]
+
+    @staticmethod
+    def _kill(pid, signum):
+        try:
+            os.kill(pid, signum)
+        except OSError as error:
+            if error.errno != errno.ESRCH:
+                raise
+
+    @staticmethod
+    def _alive(pid):
+        try:
+            (reaped, _) = os.waitpid(pid, os.WNOHANG)
+            if reaped:
+                return False
+        except OSError as error:
+            if error.errno != errno.ECHILD:
+                raise
+        try:
+            os.kill(pid, 0)
+        except OSError:
+            return False
+
+        return True
+
+
+@pytest.fixture
+def pidfile_dir(tmp_path):
+    """Per-test directory for PID files and their companions.
+    """
+    return str(tmp_path)
+
+
+@pytest.fixture
+def pidfile(pidfile_dir):
+    """Per-test PID file path (not created).
+    """
+    return os.path.join(pidfile_dir, 'daemon.pid')
+
+
+@pytest.fixture
+def daemon_reaper():
+    """:class:`Reaper` that is reaped when the test finishes.
+    """
+    reaper = Reaper()
+    yield reaper
+    reaper.reap()
+
+
+@pytest.fixture
+def fast_daemonize(monkeypatch, daemon_reaper):
+    """Make :meth:`daemoniser.Daemon.start` use :func:`fast_start_daemon`.
+
+    Forked daemons are tracked by :func:`daemon_reaper`.
+
+    """
+    def start_daemon(daemon):
+        return fast_start_daemon(daemon, reaper=daemon_reaper)
+
+    monkeypatch.setattr(Daemon, '_start_daemon', start_daemon)
+
+    return daemon_reaper
@@ -1 +1,20 @@
-from test_service import TestService
+from daemoniser.tests.test_service import TestService
+from daemoniser.tests.test_profiler import TestProfiler
+from daemoniser.tests.test_stats import TestStats
+from daemoniser.tests.test_counters import TestCounters
+from daemoniser.tests.test_statuspage import TestStatusPage
+from daemoniser.tests.test_shutdown import TestShutdownHooks
+from daemoniser.tests.test_activation import TestActivation
+from daemoniser.tests.test_zygote import TestZygote
+from daemoniser.tests.test_embedded import TestEmbedded
+from daemoniser.tests.test_waiter import TestWaiter
+from daemoniser.tests.test_election import TestElection
+from daemoniser.tests.test_checkpoint import TestCheckpoint
+from daemoniser.tests.test_report import TestReport
+from daemoniser.tests.test_autoscale import TestAutoscaler
+from daemoniser.tests.test_pool import TestWorkerPool
+from daemoniser.tests.test_host import TestHost
+from daemoniser.tests.test_reaper import TestReaper
+from daemoniser.tests.test_workqueue import TestWorkQueue
+from daemoniser.tests.test_journal import TestJournal
+from daemoniser.tests.test_watchdog import TestWatchdog
@@ -0,0 +1,120 @@
+# pylint: disable=R0904,C0103
+""":mod:`daemoniser.activation` tests.
+
+"""
+import os
+import socket
+import tempfile
+import shutil
+import unittest
+
+from daemoniser import activation
+from daemoniser.daemon import (Daemon,
+                               DaemonError)
+
+
+class TestActivation(unittest.TestCase):
+    """:mod:`daemoniser.activation` test cases.
+    """
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._environ = dict(os.environ)
+
+    def test_listen_fds(self):
+        """LISTEN_FDS for this process.
+        """
+        os.environ['LISTEN_PID'] = str(os.getpid())
+        os.environ['LISTEN_FDS'] = '2'
+
+        received = activation.listen_fds()
+        msg = 'Inherited descriptors should start at LISTEN_FDS_START'
+        self.assertListEqual(received, [3, 4], msg)
+
+        msg = 'Socket activation environment should be unset'
+        self.assertNotIn('LISTEN_FDS', os.environ, msg)
+
+    def test_listen_fds_other_pid(self):
+        """LISTEN_FDS meant for another process.
+        """
+        os.environ['LISTEN_PID'] = str(os.getpid() + 1)
+        os.environ['LISTEN_FDS'] = '2'
+
+        msg = 'Descriptors for another PID should be ignored'
+        self.assertListEqual(activation.listen_fds(), [], msg)
+
+    def test_listen_fds_invalid(self):
+        """Malformed LISTEN_FDS.
+        """
+        os.environ['LISTEN_PID'] = str(os.getpid())
+        os.environ['LISTEN_FDS'] = 'two'
+
+        msg = 'Malformed environment should give no descriptors'
+        self.assertListEqual(activation.listen_fds(), [], msg)
+
+    def test_bind_tcp(self):
+        """Bind a "host:port" address.
+        """
+        sock = activation.bind('127.0.0.1:0')
+        try:
+            msg = 'Listening socket should be inheritable'
+            self.assertTrue(sock.get_inheritable(), msg)
+
+            client = socket.create_connection(sock.getsockname(), timeout=1)
+            client.close()
+        finally:
+            sock.close()
+
+    def test_bind_stale_socket(self):
+        """Bind over a socket that nothing is listening on.
+        """
+        path = os.path.join(self._dir, 'stale.sock')
+        stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stale.bind(path)
+        stale.close()
+
+        sock = activation.bind(path)
+        sock.close()
+
+        msg = 'Stale socket should be replaced'
+        self.assertTrue(os.path.exists(path), msg)
+
+    def test_bind_live_socket(self):
+        """Bind refuses a socket that is being listened on.
+        """
+        path = os.path.join(self._dir, 'live.sock')
+        live = activation.bind(path)
+        try:
+            msg = 'Live socket should not be replaced'
+            with self.assertRaises(OSError, msg=msg):
+                activation.bind(path)
+        finally:
+            live.close()
+
+    def test_bind_regular_file(self):
+        """Bind refuses to remove a regular file.
+        """
+        path = os.path.join(self._dir, 'data')
+        with open(path, 'w') as data:
+            data.write('keep')
+
+        msg = 'Regular file should not be removed'
+        with self.assertRaises(OSError, msg=msg):
+            activation.bind(path)
+        self.assertTrue(os.path.isfile(path), msg)
+
+    def test_daemon_bind_pidfile_exists(self):
+        """Daemon does not bind when its PID file exists.
+        """
+        pidfile = os.path.join(self._dir, 'running.pid')
+        with open(pidfile, 'w') as pid_fh:
+            pid_fh.write('%d\n' % os.getpid())
+        daemon = Daemon(pidfile)
+
+        msg = 'Bind with an existing PID file should raise DaemonError'
+        with self.assertRaises(DaemonError, msg=msg):
+            daemon.bind(os.path.join(self._dir, 'running.sock'))
+
+    def tearDown(self):
+        os.environ.clear()
+        os.environ.update(self._environ)
+        shutil.rmtree(self._dir)
@@ -0,0 +1,73 @@
+# pylint: disable=R0904,C0103
+""":mod:`daemoniser.autoscale` tests.
+
+"""
+import unittest
+
+from daemoniser.autoscale import Autoscaler
+
+
+class TestAutoscaler(unittest.TestCase):
+    """:mod:`daemoniser.autoscale` test cases.
+    """
+    def setUp(self):
+        self._scaler = Autoscaler(1, 4, cooldown=0.0)
+
+    def test_scale_up_busy(self):
+        """Autoscaler scale up on busy ratio.
+        """
+        (target, _) = self._scaler.decide(2, {'busy': 0.95})
+
+        msg = 'Busy pool should grow by one worker'
+        self.assertEqual(target, 3, msg)
+
+    def test_scale_up_queue(self):
+        """Autoscaler scale up on queue depth.
+        """
+        (target, _) = self._scaler.decide(2, {'busy': 0.5, 'queue': 5.0})
+
+        msg = 'Backlogged pool should grow by one worker'
+        self.assertEqual(target, 3, msg)
+
+    def test_host_saturated(self):
+        """Autoscaler does not grow a saturated host.
+        """
+        (target, _) = self._scaler.decide(2, {'busy': 0.95, 'load': 3.0})
+
+        msg = 'Pool should not grow when host load is high'
+        self.assertEqual(target, 2, msg)
+
+    def test_scale_down(self):
+        """Autoscaler scale down when idle.
+        """
+        (target, _) = self._scaler.decide(3, {'busy': 0.1, 'queue': 0.0})
+
+        msg = 'Idle pool should shrink by one worker'
+        self.assertEqual(target, 2, msg)
+
+    def test_hysteresis(self):
+        """Autoscaler holds steady between thresholds.
+        """
+        (target, reason) = self._scaler.decide(3, {'busy': 0.5})
+
+        msg = 'Pool should hold steady between thresholds'
+        self.assertEqual((target, reason), (3, 'steady'), msg)
+
+    def test_bounds(self):
+        """Autoscaler never exceeds bounds.
+        """
+        received = [self._scaler.decide(4, {'busy': 0.95})[0],
+                    self._scaler.decide(1, {'busy': 0.0})[0]]
+
+        msg = 'Pool should stay within min/max workers'
+        self.assertListEqual(received, [4, 1], msg)
+
+    def test_cooldown(self):
+        """Autoscaler cooldown between changes.
+        """
+        self._scaler.cooldown = 60.0
+        self._scaler.decide(2, {'busy': 0.95})
+        (target, reason) = self._scaler.decide(3, {'busy': 0.95})
+
+        msg = 'Pool should not change again during cooldown'
+        self.assertEqual((target, reason), (3, 'cooldown'), msg)
@@ -0,0 +1,105 @@
+# pylint: disable=R0904,C0103
+""":mod:`daemoniser.checkpoint` tests.
+
+"""
+import os
+import pickle
+import tempfile
+import shutil
+import unittest
+
+from daemoniser import checkpoint
+
+
+class TestCheckpoint(unittest.TestCase):
+    """:mod:`daemoniser.checkpoint` test cases.
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls._dir = tempfile.mkdtemp()
+
+    def test_round_trip(self):
+        """Save and load a snapshot with an out-of-band buffer.
+        """
+        path = os.path.join(self._dir, 'round_trip.snapshot')
+        payload = bytearray(b'x' * 100000)
+        state = {'index': {'a': 1}, 'blob': pickle.PickleBuffer(payload)}
+        checkpoint.save(path, state, version=3)
+
+        received = checkpoint.load(path, version=3)
+        msg = 'Restored checkpoint error'
+        self.assertEqual(received['index'], {'a': 1}, msg)
+        self.assertEqual(bytes(received['blob']), bytes(payload), msg)
+
+    def test_version_mismatch(self):
+        """Snapshot with a different state version is ignored.
+        """
+        path = os.path.join(self._dir, 'version.snapshot')
+        checkpoint.save(path, [1, 2, 3], version=1)
+
+        msg = 'Mismatched checkpoint version should return None'
+        self.assertIsNone(checkpoint.load(path, version=2), msg)
+
+    def test_missing(self):
+        """Missing snapshot.
+        """
+        path = os.path.join(self._dir, 'missing.snapshot')
+        msg = 'Missing checkpoint should return None'
+        self.assertIsNone(checkpoint.load(path), msg)
+
+    def test_corrupt(self):
+        """Corrupt snapshot.
+        """
+        path = os.path.join(self._dir, 'corrupt.snapshot')
+        with open(path, 'wb') as snapshot:
+            snapshot.write(b'garbage')
+        os.chmod(path, 0o600)
+
+        self.assertRaises(checkpoint.CheckpointError, checkpoint.load, path)
+
+    def test_private(self):
+        """Snapshot is private and leaves no temporary file behind.
+        """
+        directory = os.path.join(self._dir, 'private')
+        os.mkdir(directory)
+        path = os.path.join(directory, 'private.snapshot')
+        umask = os.umask(0)
+        try:
+            checkpoint.save(path, {'a': 1})
+        finally:
+            os.umask(umask)
+
+        msg = 'Snapshot should be mode 0600'
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o600, msg)
+
+        msg = 'Only the snapshot should remain'
+        self.assertListEqual(os.listdir(directory), ['private.snapshot'], msg)
+
+    def test_save_failure_cleanup(self):
+        """Failed save removes its temporary file.
+        """
+        directory = os.path.join(self._dir, 'failure')
+        os.mkdir(directory)
+        path = os.path.join(directory, 'failure.snapshot')
+        # A file cannot be renamed over a directory.
+        os.mkdir(path)
+
+        with self.assertRaises(OSError):
+            checkpoint.save(path, {'a': 1})
+
+        msg = 'Failed save should not leave files behind'
+        self.assertListEqual(os.listdir(directory), ['failure.snapshot'], msg)
+
+    def test_insecure_mode(self):
+        """Snapshot writable by others is refused.
+        """
+        path = os.path.join(self._dir, 'insecure.snapshot')
+        checkpoint.save(path, {'a': 1})
+        os.chmod(path, 0o666)
+
+        self.assertRaises(checkpoint.CheckpointError, checkpoint.load, path)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls._dir)
+        del cls._dir
@@ -0,0 +1,66 @@
+# pylint: disable=R0904,C0103
+""":mod:`daemoniser.counters` tests.
+
+"""
+import os
+import tempfile
+import shutil
+import unittest
+
+from daemoniser.counters import Counters
+
+
+class TestCounters(unittest.TestCase):
+    """:mod:`daemoniser.counters` test cases.
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls._dir = tempfile.mkdtemp()
+
+    def test_totals_across_fork(self):
+        """Sum counter slots written by a forked worker.
+        """
+        counters = Counters(['requests', 'errors'], 2)
+        counters.slot(0).incr('requests', 3)
+
+        pid = os.fork()
+        if pid == 0:
+            slot = counters.slot(1)
+            slot.incr('requests', 4)
+            slot.incr('errors')
+            os._exit(0)
+        os.waitpid(pid, 0)
+
+        received = counters.totals()
+        expected = {'requests': 7, 'errors': 1}
+        msg = 'Counter totals error'
+        self.assertDictEqual(received, expected, msg)
+
+    def test_attach(self):
+        """Attach to a file backed counter registry.
+        """
+        path = os.path.join(self._dir, 'attach.counters')
+        counters = Counters(['bytes'], 3, path=path)
+        counters.slot(2).set('bytes', 1024)
+
+        attached = Counters.attach(path)
+        msg = 'Attached counter totals error'
+        self.assertEqual(attached.totals(), {'bytes': 1024}, msg)
+
+    def test_attach_missing(self):
+        """Attach to a missing counter registry.
+        """
+        path = os.path.join(self._dir, 'missing.counters')
+        msg = 'Missing registry should return None'
+        self.assertIsNone(Counters.attach(path), msg)
+
+    def test_slot_out_of_range(self):
+        """Counter slot outside the registry.
+        """
+        counters = Counters(['requests'], 1)
+        self.assertRaises(IndexError, counters.slot, 1)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls._dir)
+        del cls._dir
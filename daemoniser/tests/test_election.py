@@ -0,0 +1,173 @@
+# pylint: disable=R0904,C0103
+""":mod:`daemoniser.election` tests.
+
+"""
+import os
+import time
+import signal
+import tempfile
+import shutil
+import unittest
+
+from daemoniser.daemon import Daemon
+from daemoniser.election import LeaderLock
+
+
+class Standby(Daemon):
+    def _start(self, event):
+        event.wait(30)
+
+
+class TestElection(unittest.TestCase):
+    """:mod:`daemoniser.election` test cases.
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls._dir = tempfile.mkdtemp()
+
+    def test_failover(self):
+        """Standby takes over when the leader process exits.
+        """
+        path = os.path.join(self._dir, 'failover.lock')
+        (read_fd, write_fd) = os.pipe()
+
+        pid = os.fork()
+        if pid == 0:
+            os.close(write_fd)
+            LeaderLock(path).acquire()
+            # Hold leadership until the parent closes the pipe.
+            os.read(read_fd, 1)
+            os._exit(0)
+        os.close(read_fd)
+
+        standby = LeaderLock(path)
+        expires = time.time() + 5
+        while standby.leader_pid() != pid and time.time() < expires:
+            time.sleep(0.01)
+
+        msg = 'Standby should not acquire a held lock'
+        self.assertFalse(standby.acquire(blocking=False), msg)
+
+        thread = standby.acquire_in_background()
+        os.close(write_fd)
+        os.waitpid(pid, 0)
+        thread.join(5)
+
+        msg = 'Standby did not take over from the leader'
+        self.assertTrue(standby.acquired.is_set(), msg)
+        self.assertEqual(standby.leader_pid(), os.getpid(), msg)
+        standby.release()
+
+    def _hold(self, path):
+        """Fork a leader for *path* that holds the lock until the
+        returned pipe descriptor is closed.
+
+        """
+        (read_fd, write_fd) = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(write_fd)
+            LeaderLock(path).acquire()
+            os.read(read_fd, 1)
+            os._exit(0)
+        os.close(read_fd)
+
+        expires = time.time() + 5
+        while LeaderLock(path).leader_pid() != pid and time.time() < expires:
+            time.sleep(0.01)
+
+        return (pid, write_fd)
+
+    def test_release_standby(self):
+        """Released standby leaves a reused descriptor alone.
+        """
+        path = os.path.join(self._dir, 'release.lock')
+        (pid, write_fd) = self._hold(path)
+
+        standby = LeaderLock(path)
+        thread = standby.acquire_in_background(interval=0.01)
+        time.sleep(0.05)
+        standby.release()
+
+        msg = 'Release should stop the standby thread'
+        self.assertFalse(thread.is_alive(), msg)
+
+        other = os.path.join(self._dir, 'other')
+        with open(other, 'w') as handle:
+            handle.write('keep')
+            handle.flush()
+            os.close(write_fd)
+            os.waitpid(pid, 0)
+            time.sleep(0.05)
+
+        msg = 'Stopped standby should not write to a reused descriptor'
+        with open(other) as handle:
+            self.assertEqual(handle.read(), 'keep', msg)
+        self.assertFalse(standby.acquired.is_set(), msg)
+
+    def test_fork_drops_leadership(self):
+        """Forked children do not keep leadership alive.
+        """
+        path = os.path.join(self._dir, 'fork.lock')
+        (read_fd, write_fd) = os.pipe()
+
+        pid = os.fork()
+        if pid == 0:
+            os.close(write_fd)
+            lock = LeaderLock(path)
+            lock.acquire()
+            if os.fork() == 0:
+                # Outlive the leader.
+                os.read(read_fd, 1)
+            os._exit(0)
+        os.close(read_fd)
+        os.waitpid(pid, 0)
+
+        successor = LeaderLock(path)
+        received = successor.acquire(blocking=False)
+        successor.release()
+        os.close(write_fd)
+
+        msg = 'Lock should be free once the leader exits'
+        self.assertTrue(received, msg)
+
+    def test_stop_standby(self):
+        """Standby stopped by SIGTERM exits cleanly.
+        """
+        lockfile = os.path.join(self._dir, 'standby.lock')
+        pidfile = os.path.join(self._dir, 'standby.pid')
+        leader = LeaderLock(lockfile)
+        leader.acquire()
+
+        pid = os.fork()
+        if pid == 0:
+            status = 0
+            try:
+                daemon = Standby(pidfile)
+                daemon.lockfile = lockfile
+                daemon.inline = True
+                daemon.start()
+            except BaseException:
+                status = 1
+            finally:
+                os._exit(status)
+
+        status_file = '%s.status' % pidfile
+        expires = time.time() + 5
+        while not os.path.exists(status_file) and time.time() < expires:
+            time.sleep(0.01)
+        os.kill(pid, signal.SIGTERM)
+        (_, status) = os.waitpid(pid, 0)
+        leader.release()
+
+        msg = 'Standby should exit normally on SIGTERM'
+        self.assertEqual(os.waitstatus_to_exitcode(status), 0, msg)
+
+        msg = 'Standby should remove its runtime files'
+        self.assertFalse(os.path.exists(status_file), msg)
+        self.assertFalse(os.path.exists('%s.stacks' % pidfile), msg)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls._dir)
+        del cls._dir
@@ -0,0 +1,70 @@
+# pylint: disable=R0904,C0103
+""":mod:`daemoniser.embedded` tests.
+
+"""
+import os
+import tempfile
+import shutil
+import unittest
+
+from daemoniser.daemon import Daemon
+
+
+class Looper(Daemon):
+    def _start(self, event):
+        self.heartbeat_timeout = 60
+        self.run_loop(lambda: None, 0.01)
+
+
+class Failing(Daemon):
+    def _start(self, event):
+        raise RuntimeError('boom')
+
+
+class TestEmbedded(unittest.TestCase):
+    """:mod:`daemoniser.embedded` test cases.
+    """
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+
+    def test_start_stop(self):
+        """Embedded daemon starts, reports ready and stops.
+        """
+        pidfile = os.path.join(self._dir, 'looper.pid')
+        handle = Looper(pidfile).start_background()
+
+        msg = 'Embedded daemon should become ready'
+        self.assertTrue(handle.wait_ready(5.0), msg)
+
+        msg = 'Embedded daemon should keep a status page while running'
+        self.assertTrue(os.path.exists('%s.status' % pidfile), msg)
+
+        msg = 'Embedded daemon should not write a PID file'
+        self.assertFalse(os.path.exists(pidfile), msg)
+
+        msg = 'Embedded daemon should stop'
+        self.assertTrue(handle.stop(5.0), msg)
+        self.assertIsNone(handle.error, msg)
+
+        msg = 'Only the journal should remain once stopped'
+        self.assertListEqual(os.listdir(self._dir),
+                             ['looper.pid.journal'],
+                             msg)
+
+    def test_error(self):
+        """Embedded daemon failure is captured on the handle.
+        """
+        handle = Failing(os.path.join(self._dir, 'failing.pid'))
+        handle = handle.start_background()
+
+        msg = 'Failed daemon should finish'
+        self.assertTrue(handle.join(5.0), msg)
+
+        msg = 'Failed daemon should not report ready and alive'
+        self.assertFalse(handle.wait_ready(0), msg)
+
+        msg = 'Failure should be available on the handle'
+        self.assertIsInstance(handle.error, RuntimeError, msg)
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
@@ -0,0 +1,140 @@
+# pylint: disable=R0904,C0103
+""":mod:`daemoniser.host` tests.
+
+"""
+import os
+import time
+import signal
+import tempfile
+import shutil
+import threading
+import unittest
+
+from daemoniser.daemon import (Daemon,
+                               DaemonError)
+from daemoniser.host import Host
+
+
+class Tenant(Daemon):
+    def _start(self, event):
+        self.run_loop(lambda: None, 0.01)
+
+
+class SignalTenant(Daemon):
+    terminated = False
+
+    def _start(self, event):
+        self.handle_signal(signal.SIGTERM, self._terminate)
+        self.run_loop(lambda: None, 0.01)
+
+    def _terminate(self, signum, frame):
+        self.terminated = True
+        self._exit_handler(signum, frame)
+
+
+class RawSignalTenant(Daemon):
+    def _start(self, event):
+        signal.signal(signal.SIGTERM, self._exit_handler)
+
+
+class TestHost(unittest.TestCase):
+    """:mod:`daemoniser.host` test cases.
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls._dir = tempfile.mkdtemp()
+
+    def _pidfile(self, name):
+        return os.path.join(self._dir, '%s.pid' % name)
+
+    def test_add_duplicate(self):
+        """Host rejects duplicate tenant names.
+        """
+        host = Host(self._pidfile('dup-host'))
+        host.add(Tenant(self._pidfile('dup')))
+
+        msg = 'Duplicate tenant should raise DaemonError'
+        with self.assertRaises(DaemonError, msg=msg):
+            host.add(Tenant(self._pidfile('dup-2')))
+
+    def test_stop_single_tenant(self):
+        """Host stops a single tenant on request.
+        """
+        host = Host(self._pidfile('host'))
+        host.add(Tenant(self._pidfile('first')), name='first')
+        host.add(Tenant(self._pidfile('second')), name='second')
+        host.inline = True
+        host.poll_interval = 0.05
+
+        received = {}
+
+        def control():
+            for tenant in host.tenants.values():
+                tenant.ready_event.wait(5.0)
+            first = Tenant(self._pidfile('first'))
+            received['hosted'] = (first.hosted, first.pid)
+            received['stop'] = first.stop()
+            expires = time.time() + 5
+            while (os.path.exists(self._pidfile('first')) and
+                   time.time() < expires):
+                time.sleep(0.01)
+            received['first'] = os.path.exists(self._pidfile('first'))
+            received['second'] = Tenant(self._pidfile('second')).status()
+            host.set_exit_event()
+
+        thread = threading.Thread(target=control)
+        thread.start()
+        # Signal handlers can only be installed on the main thread.
+        host.start()
+        thread.join(5.0)
+
+        msg = 'Tenant PID file should name the host process'
+        self.assertEqual(received['hosted'], (True, os.getpid()), msg)
+
+        msg = 'Hosted tenant stop request error'
+        self.assertTrue(received['stop'], msg)
+
+        msg = 'Stopped tenant PID file should be removed'
+        self.assertFalse(received['first'], msg)
+
+        msg = 'Other tenants should keep running'
+        self.assertTrue(received['second'], msg)
+
+        msg = 'Host should remove every tenant PID file on exit'
+        self.assertFalse(os.path.exists(self._pidfile('second')), msg)
+
+    def test_tenant_signal_routing(self):
+        """Host routes SIGTERM to tenant handlers.
+        """
+        host = Host(self._pidfile('signal-host'))
+        tenant = SignalTenant(self._pidfile('signal'))
+        host.add(tenant)
+        host.add(RawSignalTenant(self._pidfile('raw')))
+        host.inline = True
+        host.poll_interval = 0.05
+
+        def control():
+            tenant.ready_event.wait(5.0)
+            os.kill(os.getpid(), signal.SIGTERM)
+
+        previous = signal.getsignal(signal.SIGTERM)
+        thread = threading.Thread(target=control)
+        thread.start()
+        try:
+            host.start()
+        finally:
+            thread.join(5.0)
+            signal.signal(signal.SIGTERM, previous)
+
+        msg = 'Tenant SIGTERM handler should be called via the host'
+        self.assertTrue(tenant.terminated, msg)
+
+        msg = 'Routed SIGTERM should set the tenant exit event'
+        self.assertTrue(tenant.exit_event.is_set(), msg)
+
+        msg = 'Host should remove the PID file of a failed tenant'
+        self.assertFalse(os.path.exists(self._pidfile('raw')), msg)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls._dir)
@@ -0,0 +1,95 @@
+# pylint: disable=R0904,C0103
+""":mod:`daemoniser.journal` tests.
+
+"""
+import os
+import tempfile
+import shutil
+import unittest
+
+from daemoniser.daemon import Daemon
+from daemoniser.journal import (Journal,
+                                RECORD,
+                                EVENTS)
+
+
+class TestJournal(unittest.TestCase):
+    """:mod:`daemoniser.journal` test cases.
+    """
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._path = os.path.join(self._dir, 'test.pid.journal')
+
+    def _write(self, records):
+        with open(self._path, 'ab') as journal:
+            for (event, pid, mono) in records:
+                journal.write(RECORD.pack(EVENTS.index(event),
+                                          0,
+                                          pid,
+                                          1,
+                                          mono,
+                                          1000.0 + mono))
+
+    def test_record(self):
+        """Journal record round trip.
+        """
+        journal = Journal(self._path)
+        journal.record('start')
+        journal.record('stop', pid=42)
+        received = [(e, p) for (e, p, _, _, _) in journal.records()]
+
+        msg = 'Journal records should be read back in order'
+        self.assertListEqual(received,
+                             [('start', os.getpid()), ('stop', 42)],
+                             msg)
+
+    def test_summary(self):
+        """Journal downtime and crash summary.
+        """
+        self._write([('daemonized', 10, 0.0),
+                     ('ready', 10, 0.5),
+                     ('sigterm', 10, 100.0),
+                     ('exited', 10, 101.0),
+                     ('daemonized', 11, 102.0),
+                     ('ready', 11, 103.0),
+                     # Crash -- no sigterm or exited.
+                     ('daemonized', 12, 200.0),
+                     ('ready', 12, 200.5)])
+        received = Journal(self._path).summary()
+
+        msg = 'Journal summary run and crash count error'
+        self.assertEqual((received['runs'], received['crashes']), (3, 1), msg)
+
+        msg = 'Journal summary downtime error'
+        self.assertEqual((received['restarts'], received['p50'],
+                          received['max']),
+                         (2, 3.0, 97.5),
+                         msg)
+
+    def test_torn_record(self):
+        """Journal ignores a partially written record.
+        """
+        self._write([('daemonized', 10, 0.0)])
+        with open(self._path, 'ab') as journal:
+            journal.write(b'\0' * 5)
+
+        msg = 'Partial final record should be ignored'
+        self.assertEqual(len(list(Journal(self._path).records())), 1, msg)
+
+    def test_daemon_journal(self):
+        """Daemon journal follows its PID file.
+        """
+        daemon = Daemon(os.path.join(self._dir, 'test.pid'))
+
+        msg = 'Daemon journal should be reused between accesses'
+        self.assertIs(daemon.journal, daemon.journal, msg)
+        self.assertEqual(daemon.journal.path, self._path, msg)
+
+        msg = 'New PID file should move the journal'
+        daemon.pidfile = os.path.join(self._dir, 'other.pid')
+        self.assertEqual(daemon.journal.path,
+                         os.path.join(self._dir, 'other.pid.journal'),
+                         msg)
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
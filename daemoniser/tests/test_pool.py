@@ -0,0 +1,138 @@
+# pylint: disable=R0904,C0103
+""":mod:`daemoniser.pool` tests.
+
+"""
+import os
+import time
+import signal
+import tempfile
+import shutil
+import unittest
+
+from daemoniser.daemon import (Daemon,
+                               DaemonError)
+from daemoniser.pool import WorkerPool
+from daemoniser.autoscale import Autoscaler
+
+
+def idle(context):
+    context.event.wait()
+
+
+def working(context):
+    with context.busy():
+        context.event.wait()
+
+
+def busy_first(context):
+    # Only the first worker in the slot gets stuck in a task.
+    context.counters.incr('starts')
+    if context.counters.get('starts') == 1:
+        with context.busy():
+            context.event.wait()
+    else:
+        context.event.wait()
+
+
+def wait_for(predicate, timeout=5.0):
+    expires = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < expires:
+        time.sleep(0.01)
+
+    return predicate()
+
+
+class TestWorkerPool(unittest.TestCase):
+    """:mod:`daemoniser.pool` test cases.
+    """
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._pool = None
+
+    def test_resize(self):
+        """Pool grows and shrinks within its upper bound.
+        """
+        self._pool = WorkerPool(idle, 3)
+
+        self._pool.resize(5)
+        msg = 'Pool should grow no further than max_workers'
+        self.assertEqual(self._pool.size, 3, msg)
+
+        self._pool.resize(1)
+        msg = 'Pool should shrink to the target size'
+        self.assertEqual(self._pool.size, 1, msg)
+
+        msg = 'Stopped workers should be collected'
+        self.assertTrue(wait_for(lambda: (self._pool.reap() or True) and
+                                 not self._pool._stopping), msg)
+
+        self._pool.stop(timeout=5.0)
+        msg = 'Stopped pool should have no workers'
+        self.assertEqual(self._pool.size, 0, msg)
+
+    def test_reap_respawn(self):
+        """Unexpected worker exit is replaced in the same slot.
+        """
+        self._pool = WorkerPool(busy_first, 1, names=['starts'])
+        self._pool.resize(1)
+        slot = self._pool.counters.slot(0)
+        wait_for(lambda: slot.get('busy_since_usec'))
+        pid = self._pool._workers[0]
+
+        os.kill(pid, signal.SIGKILL)
+        collected = []
+        wait_for(lambda: collected.extend(self._pool.reap()) or collected)
+
+        msg = 'Killed worker should be collected'
+        self.assertEqual([(i, p) for i, p, _ in collected], [(0, pid)], msg)
+
+        msg = 'Killed worker should be replaced'
+        self.assertEqual(self._pool.size, 1, msg)
+        self.assertNotEqual(self._pool._workers[0], pid, msg)
+
+        wait_for(lambda: slot.get('starts') == 2)
+        received = self._pool.busy_usec()
+        time.sleep(0.05)
+
+        msg = 'Task of a killed worker should not stay busy'
+        self.assertEqual(received, 0, msg)
+        self.assertEqual(self._pool.busy_usec(), received, msg)
+
+    def test_busy_in_progress(self):
+        """Task in progress is credited as busy time.
+        """
+        self._pool = WorkerPool(working, 1)
+        self._pool.resize(1)
+        slot = self._pool.counters.slot(0)
+        wait_for(lambda: slot.get('busy_since_usec'))
+        time.sleep(0.1)
+
+        msg = 'Unfinished task should count as busy'
+        self.assertGreaterEqual(self._pool.busy_usec(), 100000, msg)
+        self.assertEqual(self._pool.counters.total('busy_usec'), 0, msg)
+
+        self._pool.stop(timeout=5.0)
+        msg = 'Finished task should be credited once'
+        self.assertEqual(self._pool.counters.total('tasks'), 1, msg)
+        self.assertEqual(self._pool.busy_usec(),
+                         self._pool.counters.total('busy_usec'),
+                         msg)
+
+    def test_run_workers_max(self):
+        """run_workers takes the upper bound from the autoscaler.
+        """
+        daemon = Daemon(os.path.join(self._dir, 'pool.pid'))
+        autoscaler = Autoscaler(1, 4)
+
+        msg = 'Conflicting max_workers should be refused'
+        with self.assertRaises(DaemonError, msg=msg):
+            daemon.run_workers(idle, 2, autoscaler=autoscaler)
+
+        msg = 'max_workers is required without an autoscaler'
+        with self.assertRaises(DaemonError, msg=msg):
+            daemon.run_workers(idle)
+
+    def tearDown(self):
+        if self._pool is not None:
+            self._pool.stop(timeout=5.0)
+        shutil.rmtree(self._dir)
@@ -0,0 +1,76 @@
+# pylint: disable=R0904,C0103
+""":mod:`daemoniser.profiler` tests.
+
+"""
+import os
+import tempfile
+import shutil
+import threading
+import unittest
+import tracemalloc
+
+from daemoniser.profiler import Profiler
+
+
+class TestProfiler(unittest.TestCase):
+    """:mod:`daemoniser.profiler` test cases.
+    """
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._prefix = os.path.join(self._dir, 'profile')
+
+    def _reports(self, suffix):
+        return [name for name in os.listdir(self._dir)
+                if name.endswith(suffix)]
+
+    def test_window(self):
+        """A single trigger writes both reports and stops tracing.
+        """
+        stop = threading.Event()
+        worker = threading.Thread(target=stop.wait, args=(5.0,))
+        worker.start()
+
+        profiler = Profiler(self._prefix, window=0.05, interval=0.005)
+        msg = 'Trigger should start a window'
+        self.assertTrue(profiler.trigger(), msg)
+
+        msg = 'Second trigger during a window should be ignored'
+        self.assertFalse(profiler.trigger(), msg)
+
+        profiler.join(5.0)
+        stop.set()
+        worker.join()
+
+        msg = 'Window should have finished'
+        self.assertFalse(profiler.active, msg)
+
+        msg = 'First trigger should write a stack report'
+        self.assertEqual(len(self._reports('.stacks')), 1, msg)
+
+        msg = 'First trigger should write a memory report'
+        self.assertEqual(len(self._reports('.mem')), 1, msg)
+
+        msg = 'tracemalloc should be stopped after the window'
+        self.assertFalse(tracemalloc.is_tracing(), msg)
+
+        with open(os.path.join(self._dir, self._reports('.stacks')[0])) as fh:
+            received = fh.read()
+        msg = 'Stack report should include the waiting thread'
+        self.assertIn('wait', received, msg)
+
+    def test_existing_tracing(self):
+        """Tracing started elsewhere is left running.
+        """
+        tracemalloc.start()
+        try:
+            profiler = Profiler(self._prefix, window=0.01)
+            profiler.trigger()
+            profiler.join(5.0)
+
+            msg = 'tracemalloc started elsewhere should keep running'
+            self.assertTrue(tracemalloc.is_tracing(), msg)
+        finally:
+            tracemalloc.stop()
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
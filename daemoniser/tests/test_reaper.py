@@ -0,0 +1,172 @@
+# pylint: disable=R0904,C0103
+""":mod:`daemoniser.reaper` tests.
+
+"""
+import os
+import time
+import json
+import signal
+import subprocess
+import unittest
+
+from daemoniser import reaper as reaper_module
+from daemoniser.reaper import (ChildReaper,
+                               descendants)
+
+
+class TestReaper(unittest.TestCase):
+    """:mod:`daemoniser.reaper` test cases.
+    """
+    def _reap_until(self, reaper, pid):
+        expires = time.time() + 5
+        while time.time() < expires:
+            for reaped, _ in reaper.reap():
+                if reaped == pid:
+                    return
+            time.sleep(0.01)
+
+    def test_exit_callback(self):
+        """ChildReaper exit status callback.
+        """
+        received = []
+        reaper = ChildReaper()
+
+        pid = os.fork()
+        if pid == 0:
+            time.sleep(0.05)
+            os._exit(3)
+        reaper.watch(pid, lambda *args: received.append(args))
+        self._reap_until(reaper, pid)
+
+        msg = 'Exit callback should receive PID and return code'
+        self.assertListEqual(received, [(pid, 3)], msg)
+
+    def test_watch_after_exit(self):
+        """ChildReaper callback for a child that exited before watch.
+        """
+        received = []
+        reaper = ChildReaper()
+
+        pid = reaper_module.fork()
+        if pid == 0:
+            os._exit(4)
+        os.waitid(os.P_PID, pid, os.WEXITED | os.WNOWAIT)
+        reaper.reap()
+        reaper.watch(pid, lambda *args: received.append(args))
+        reaper_module.release(pid)
+
+        msg = 'Late watch should still receive the exit status'
+        self.assertListEqual(received, [(pid, 4)], msg)
+
+    def test_claimed_child_left(self):
+        """ChildReaper leaves claimed children to their owners.
+        """
+        reaper = ChildReaper()
+
+        mask = signal.pthread_sigmask(signal.SIG_BLOCK, [signal.SIGCHLD])
+        try:
+            process = subprocess.Popen(['false'])
+            reaper_module.claim(process.pid)
+        finally:
+            signal.pthread_sigmask(signal.SIG_SETMASK, mask)
+        os.waitid(os.P_PID, process.pid, os.WEXITED | os.WNOWAIT)
+        reaper.reap()
+
+        msg = 'subprocess should still see the exit status'
+        self.assertEqual(process.wait(), 1, msg)
+        reaper_module.release(process.pid)
+
+        msg = 'Claimed child should not be reaped'
+        self.assertEqual(reaper.reaped, 0, msg)
+
+    def test_unclaimed_child_reaped(self):
+        """ChildReaper reaps children that nobody claimed.
+        """
+        reaper = ChildReaper()
+
+        pid = os.fork()
+        if pid == 0:
+            os._exit(5)
+        self._reap_until(reaper, pid)
+
+        msg = 'Unclaimed child should be reaped'
+        self.assertEqual(reaper.reaped, 1, msg)
+
+    def test_orphans_reaped(self):
+        """Subreaper reaps orphans past a claimed child.
+        """
+        (read_fd, write_fd) = os.pipe()
+        helper = os.fork()
+        if helper == 0:
+            os.close(read_fd)
+            status = 1
+            try:
+                self._orphans(write_fd)
+                status = 0
+            finally:
+                os._exit(status)
+        os.close(write_fd)
+        with os.fdopen(read_fd) as results:
+            received = json.loads(results.read() or '{}')
+        os.waitpid(helper, 0)
+
+        msg = 'Same-session and setsid orphans should both be reaped'
+        self.assertListEqual(received.get('collected'), [7, 8], msg)
+
+        msg = 'Claimed child should be left for its owner'
+        self.assertTrue(received.get('claimed'), msg)
+
+    @staticmethod
+    def _orphans(write_fd):
+        """Run in a subreaper helper: leave a claimed zombie first in
+        line, orphan a grandchild in our session (as ``sh -c 'cmd &'``
+        does) and another in a new session, then reap.
+
+        """
+        reaper_module.set_child_subreaper()
+        reaper = ChildReaper()
+
+        claimed = reaper_module.fork()
+        if claimed == 0:
+            os._exit(0)
+        os.waitid(os.P_PID, claimed, os.WEXITED | os.WNOWAIT)
+
+        for (code, new_session) in ((7, False), (8, True)):
+            middle = os.fork()
+            if middle == 0:
+                if os.fork() == 0:
+                    if new_session:
+                        os.setsid()
+                    time.sleep(0.05)
+                    os._exit(code)
+                os._exit(0)
+            os.waitpid(middle, 0)
+
+        collected = []
+        expires = time.time() + 5
+        while len(collected) < 2 and time.time() < expires:
+            collected.extend(code for _, code in reaper.reap())
+            time.sleep(0.01)
+
+        (reaped, _) = os.waitpid(claimed, os.WNOHANG)
+        with os.fdopen(write_fd, 'w') as results:
+            results.write(json.dumps({'collected': sorted(collected),
+                                      'claimed': reaped == claimed}))
+
+    def test_descendants(self):
+        """Process tree scan finds children.
+        """
+        (read_fd, write_fd) = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(write_fd)
+            os.read(read_fd, 1)
+            os._exit(0)
+        os.close(read_fd)
+
+        received = descendants(os.getpid())
+        os.close(write_fd)
+        os.waitpid(pid, 0)
+
+        msg = 'Forked child should be a descendant'
+        self.assertIn(pid, received, msg)
@@ -0,0 +1,135 @@
+# pylint: disable=R0904,C0103
+""":mod:`daemoniser.report` tests.
+
+"""
+import os
+import time
+import tempfile
+import shutil
+import unittest
+import tracemalloc
+
+from daemoniser.daemon import (Daemon,
+                               DaemonError)
+from daemoniser.report import (DryRunReport,
+                               process_start_time)
+
+
+class Once(Daemon):
+    iterations = 0
+
+    def _start(self, event):
+        self.iterations += 1
+
+
+class TestReport(unittest.TestCase):
+    """:mod:`daemoniser.report` test cases.
+    """
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+
+    def test_process_start_time(self):
+        """Current process start time.
+        """
+        received = process_start_time()
+
+        msg = 'Process should have started in the past'
+        self.assertIsNotNone(received, msg)
+        self.assertLessEqual(received, time.time() + 1, msg)
+
+        msg = 'Process start time should be recent'
+        self.assertGreater(received, time.time() - 86400, msg)
+
+    def test_phases(self):
+        """Phases are recorded in order and totalled.
+        """
+        report = DryRunReport()
+        report.add('validate', 0.5)
+        report.add('skipped', None)
+        with report.phase('work'):
+            time.sleep(0.01)
+
+        msg = 'Phases should be recorded in order (None skipped)'
+        self.assertListEqual([name for name, _ in report.phases],
+                             ['validate', 'work'], msg)
+
+        msg = 'Timed phase should cover the enclosed block'
+        self.assertGreaterEqual(report.phases[1][1], 0.01, msg)
+
+        received = report.render()
+        msg = 'Report should include the total'
+        self.assertIn('total', received, msg)
+        self.assertNotIn('Profile', received, msg)
+
+    def test_profile(self):
+        """Profiled phases add a profile to the report.
+        """
+        report = DryRunReport(profile=True, top=3)
+        with report.phase('work', profile=True):
+            sorted(range(1000))
+
+        received = report.render()
+        msg = 'Profiled report should include the profile'
+        self.assertIn('Profile (top 3', received, msg)
+
+        msg = 'Profiled report should include the allocation summary'
+        self.assertIn('Allocations', received, msg)
+
+        msg = 'Allocation tracing should stop with the phase'
+        self.assertFalse(tracemalloc.is_tracing(), msg)
+
+    def test_dry_run(self):
+        """Dry run of a stopped daemon.
+        """
+        daemon = Once(os.path.join(self._dir, 'dry.pid'))
+        daemon.dry = True
+
+        msg = 'Dry run should run a single iteration'
+        self.assertTrue(daemon.start(), msg)
+        self.assertEqual(daemon.iterations, 1, msg)
+
+        msg = 'Dry run should leave no runtime files'
+        self.assertListEqual(os.listdir(self._dir), [], msg)
+
+    def test_dry_run_live_daemon(self):
+        """Dry run is refused while the daemon is running.
+        """
+        pidfile = os.path.join(self._dir, 'live.pid')
+        with open(pidfile, 'w') as pid_fh:
+            pid_fh.write('%d\n' % os.getpid())
+        status_file = '%s.status' % pidfile
+        with open(status_file, 'w') as status:
+            status.write('live')
+        daemon = Once(pidfile)
+        daemon.dry = True
+
+        msg = 'Dry run of a live daemon should be refused'
+        self.assertFalse(daemon.start(), msg)
+        self.assertEqual(daemon.iterations, 0, msg)
+
+        msg = 'Live daemon runtime files should be left alone'
+        with open(status_file) as status:
+            self.assertEqual(status.read(), 'live', msg)
+
+    def test_background_live_daemon(self):
+        """Embedded start is refused while the daemon is running.
+        """
+        pidfile = os.path.join(self._dir, 'live.pid')
+        with open(pidfile, 'w') as pid_fh:
+            pid_fh.write('%d\n' % os.getpid())
+        status_file = '%s.status' % pidfile
+        with open(status_file, 'w') as status:
+            status.write('live')
+        daemon = Once(pidfile)
+
+        msg = 'Embedded start of a live daemon should be refused'
+        with self.assertRaises(DaemonError, msg=msg):
+            daemon.start_background()
+        self.assertEqual(daemon.iterations, 0, msg)
+
+        msg = 'Live daemon runtime files should be left alone'
+        with open(status_file) as status:
+            self.assertEqual(status.read(), 'live', msg)
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
@@ -2,12 +2,12 @@
 """:class:`daemoniser.Service` tests.
 
 """
-import unittest2
+import unittest
 
 import daemoniser
 
 
-class TestService(unittest2.TestCase):
+class TestService(unittest.TestCase):
     """:class:`daemoniser.Service` test cases.
     """
     @classmethod
@@ -0,0 +1,92 @@
+# pylint: disable=R0904,C0103
+""":mod:`daemoniser.shutdown` tests.
+
+"""
+import time
+import threading
+import unittest
+
+from daemoniser.shutdown import ShutdownHooks
+
+
+class TestShutdownHooks(unittest.TestCase):
+    """:mod:`daemoniser.shutdown` test cases.
+    """
+    def test_tier_order(self):
+        """Tiers run in ascending priority order.
+        """
+        received = []
+        hooks = ShutdownHooks()
+        hooks.add(lambda: received.append('last'), priority=10)
+        hooks.add(lambda: received.append('first'), priority=-1)
+        hooks.add(lambda: received.append('middle'))
+
+        msg = 'Shutdown hooks run error'
+        self.assertTrue(hooks.run(), msg)
+
+        msg = 'Tiers should run lowest priority first'
+        self.assertListEqual(received, ['first', 'middle', 'last'], msg)
+
+    def test_budget_overrun(self):
+        """Hook that overruns its timeout is abandoned.
+        """
+        release = threading.Event()
+        hooks = ShutdownHooks(deadline=5.0)
+        hooks.add(lambda: release.wait(5.0), timeout=0.05, name='slow')
+        hooks.add(lambda: None, priority=1, name='next')
+
+        began = time.monotonic()
+        received = hooks.run()
+        elapsed = time.monotonic() - began
+        release.set()
+
+        msg = 'Overrunning hook should fail the run'
+        self.assertFalse(received, msg)
+
+        msg = 'Overrunning hook should be abandoned after its timeout'
+        self.assertLess(elapsed, 1.0, msg)
+
+        msg = 'Abandoned hook timing should be None'
+        self.assertIsNone(hooks.timings[(0, 'slow')], msg)
+
+        msg = 'Later tiers should still run'
+        self.assertIsNotNone(hooks.timings[(1, 'next')], msg)
+
+    def test_error_isolation(self):
+        """Failing hook does not stop the others.
+        """
+        received = []
+
+        def fail():
+            raise RuntimeError('boom')
+
+        hooks = ShutdownHooks()
+        hooks.add(fail, name='hook')
+        hooks.add(lambda: received.append('same tier'), name='hook')
+        hooks.add(lambda: received.append('next tier'), priority=1)
+
+        msg = 'Failing hook should fail the run'
+        self.assertFalse(hooks.run(), msg)
+
+        msg = 'Other hooks should run despite the failure'
+        self.assertListEqual(sorted(received), ['next tier', 'same tier'], msg)
+
+        msg = 'Hooks that share a name should be timed separately'
+        self.assertEqual(len(hooks.timings), 3, msg)
+
+    def test_reset(self):
+        """Hooks run once until reset.
+        """
+        received = []
+        hooks = ShutdownHooks()
+        hooks.add(lambda: received.append(True))
+        hooks.run()
+        hooks.run()
+
+        msg = 'Hooks should only run once per reset'
+        self.assertEqual(len(received), 1, msg)
+
+        hooks.reset()
+        hooks.run()
+        msg = 'Hooks should run again after reset'
+        self.assertEqual(len(received), 2, msg)
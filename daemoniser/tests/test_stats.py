@@ -0,0 +1,61 @@
+# pylint: disable=R0904,C0103
+""":mod:`daemoniser.stats` tests.
+
+"""
+import unittest
+
+from daemoniser.stats import (Histogram,
+                              LoopStats)
+
+
+class TestStats(unittest.TestCase):
+    """:mod:`daemoniser.stats` test cases.
+    """
+    def test_histogram_percentiles(self):
+        """Histogram percentiles within precision bounds.
+        """
+        histogram = Histogram()
+        for value in range(1, 10001):
+            histogram.record(value)
+
+        msg = 'Histogram count error'
+        self.assertEqual(histogram.count, 10000, msg)
+
+        msg = 'Histogram max error'
+        self.assertEqual(histogram.max, 10000, msg)
+
+        for percent, expected in ((50, 5000), (99, 9900)):
+            received = histogram.percentile(percent)
+            msg = 'p%d of %d outside bounds' % (percent, received)
+            self.assertTrue(abs(received - expected) <= expected / 16, msg)
+
+    def test_histogram_empty(self):
+        """Empty Histogram percentile.
+        """
+        msg = 'Empty histogram percentile should be 0'
+        self.assertEqual(Histogram().percentile(99), 0, msg)
+
+    def test_histogram_clamp(self):
+        """Histogram values beyond the trackable range.
+        """
+        histogram = Histogram(highest=1000)
+        histogram.record(5000)
+
+        msg = 'Clamped value percentile should report the exact max'
+        self.assertEqual(histogram.percentile(100), 5000, msg)
+
+    def test_loop_stats_overrun(self):
+        """LoopStats overrun accounting.
+        """
+        stats = LoopStats()
+        remaining = stats.record(0.25, 1.0)
+        stats.record(2.0, 1.0)
+
+        msg = 'Remaining interval error'
+        self.assertAlmostEqual(remaining, 0.75, msg=msg)
+
+        summary = stats.summary()
+        msg = 'LoopStats summary error'
+        self.assertEqual(summary['iterations'], 2, msg)
+        self.assertEqual(summary['overruns'], 1, msg)
+        self.assertAlmostEqual(summary['max'], 2.0, msg=msg)
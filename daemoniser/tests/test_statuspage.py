@@ -0,0 +1,47 @@
+# pylint: disable=R0904,C0103
+""":mod:`daemoniser.statuspage` tests.
+
+"""
+import os
+import tempfile
+import shutil
+import unittest
+
+from daemoniser.statuspage import StatusPage
+
+
+class TestStatusPage(unittest.TestCase):
+    """:mod:`daemoniser.statuspage` test cases.
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls._dir = tempfile.mkdtemp()
+
+    def test_update_and_read(self):
+        """Write and read back a status page.
+        """
+        page = StatusPage(os.path.join(self._dir, 'update.status'))
+        page.update(state='running', queue_depth=5, user=[1.5])
+        page.touch(42)
+        page.publish_stats(0.001, 0.01, 0.1)
+
+        received = StatusPage(page.path).read()
+        msg = 'Status page content error'
+        self.assertEqual(received['state'], 'running', msg)
+        self.assertEqual(received['pid'], os.getpid(), msg)
+        self.assertEqual(received['iterations'], 42, msg)
+        self.assertEqual(received['queue_depth'], 5, msg)
+        self.assertAlmostEqual(received['p99'], 0.01, msg=msg)
+        self.assertEqual(received['user'][0], 1.5, msg)
+
+    def test_read_missing(self):
+        """Read a status page that does not exist.
+        """
+        page = StatusPage(os.path.join(self._dir, 'missing.status'))
+        msg = 'Missing status page should return None'
+        self.assertIsNone(page.read(), msg)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls._dir)
+        del cls._dir
@@ -0,0 +1,108 @@
+# pylint: disable=C0103
+""":mod:`daemoniser.testing` tests.
+
+These use the plugin's :mod:`pytest` fixtures (enabled from the
+top-level ``conftest.py``), so they need the ``testing`` extra and are
+run by :mod:`pytest` alone.
+
+"""
+import os
+import time
+import signal
+
+from daemoniser.daemon import Daemon
+from daemoniser.testing import (wait_for,
+                                wait_for_pid,
+                                Reaper)
+
+
+class Looper(Daemon):
+    def _start(self, event):
+        signal.signal(signal.SIGTERM, self._exit_handler)
+        self.run_loop(lambda: None, 0.01)
+
+
+class Idler(Daemon):
+    def _start(self, event):
+        self.run_loop(lambda: None, 0.01)
+
+
+def test_wait_for():
+    """wait_for returns the last predicate value.
+    """
+    calls = []
+
+    def predicate():
+        calls.append(True)
+        return len(calls) if len(calls) == 3 else 0
+
+    assert wait_for(predicate, timeout=5.0, interval=0) == 3
+    assert wait_for(lambda: None, timeout=0.01) is None
+
+
+def test_lifecycle(pidfile, fast_daemonize):
+    """Fast daemonised start and stop.
+    """
+    daemon = Looper(pidfile)
+    assert daemon.start()
+
+    pid = wait_for_pid(daemon)
+    assert pid is not None and pid != os.getpid()
+
+    assert Looper(pidfile).stop()
+    assert wait_for(lambda: not os.path.exists(pidfile))
+
+
+class SlowStarter(Looper):
+    def _install_handlers(self):
+        time.sleep(0.2)
+        super(SlowStarter, self)._install_handlers()
+
+
+def test_wait_for_ready(pidfile, fast_daemonize):
+    """wait_for_pid waits past the PID file for the daemon to run.
+    """
+    daemon = SlowStarter(pidfile)
+    assert daemon.start()
+
+    pid = wait_for_pid(daemon)
+    assert pid is not None
+
+    status = daemon.status_page.read()
+    assert status['pid'] == pid and status['state'] == 'running'
+
+    assert SlowStarter(pidfile).stop()
+
+
+def test_reaper_background(pidfile_dir, daemon_reaper):
+    """daemon_reaper stops a background daemon left running.
+    """
+    handle = Idler(os.path.join(pidfile_dir, 'background.pid'))
+    handle = daemon_reaper.track(handle.start_background())
+    assert handle.wait_ready(5.0)
+
+    daemon_reaper.reap()
+    assert not handle.alive
+
+
+def test_reaper_process():
+    """Reaper kills a process that ignores SIGTERM.
+    """
+    (read_fd, write_fd) = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        os.close(write_fd)
+        signal.pause()
+        os._exit(0)
+    os.close(write_fd)
+    # Wait until SIGTERM is ignored.
+    os.read(read_fd, 1)
+    os.close(read_fd)
+
+    reaper = Reaper(grace=0.1)
+    reaper.track(pid)
+    reaper.reap()
+
+    assert not Reaper._alive(pid)
@@ -0,0 +1,75 @@
+# pylint: disable=R0904,C0103
+""":mod:`daemoniser.waiter` tests.
+
+"""
+import os
+import threading
+import unittest
+
+from daemoniser.waiter import Waiter
+
+
+class TestWaiter(unittest.TestCase):
+    """:mod:`daemoniser.waiter` test cases.
+    """
+    def setUp(self):
+        self._event = threading.Event()
+        self._waiter = Waiter(exit_event=self._event)
+
+    def test_timeout(self):
+        """Waiter timeout with nothing ready.
+        """
+        msg = 'Waiter should return no events on timeout'
+        self.assertListEqual(self._waiter.wait(0.01), [], msg)
+
+    def test_timer(self):
+        """Waiter timer expiry.
+        """
+        token = self._waiter.call_later(0.01, 'tick')
+        received = self._waiter.wait(1.0)
+
+        msg = 'Waiter timer event error'
+        self.assertEqual([(e.kind, e.source, e.data) for e in received],
+                         [('timer', token, 'tick')],
+                         msg)
+
+    def test_cancelled_timer(self):
+        """Waiter cancelled timer.
+        """
+        self._waiter.cancel(self._waiter.call_later(0.0, 'tick'))
+
+        msg = 'Cancelled timer should not be reported'
+        self.assertListEqual(self._waiter.wait(0.01), [], msg)
+
+    def test_fd(self):
+        """Waiter file descriptor readiness.
+        """
+        (read_fd, write_fd) = os.pipe()
+        self._waiter.register(read_fd, 'pipe')
+        os.write(write_fd, b'x')
+        received = self._waiter.wait(1.0)
+        os.close(read_fd)
+        os.close(write_fd)
+
+        msg = 'Waiter fd event error'
+        self.assertEqual([(e.kind, e.data) for e in received],
+                         [('fd', 'pipe')],
+                         msg)
+
+    def test_exit_event(self):
+        """Waiter wakes on exit event from another thread.
+        """
+        def stop():
+            self._event.set()
+            self._waiter.wakeup()
+
+        threading.Timer(0.01, stop).start()
+        received = self._waiter.wait(5.0)
+
+        msg = 'Waiter exit event error'
+        self.assertEqual([e.kind for e in received], ['exit'], msg)
+
+    def tearDown(self):
+        self._waiter.close()
+        self._waiter = None
+        del self._waiter
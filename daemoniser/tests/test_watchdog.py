@@ -0,0 +1,176 @@
+# pylint: disable=R0904,C0103
+""":class:`daemoniser.Daemon` heartbeat and watchdog tests.
+
+"""
+import os
+import time
+import signal
+import tempfile
+import shutil
+import threading
+import unittest
+
+from daemoniser.daemon import Daemon
+
+
+class Marker(Daemon):
+    """Daemon that records its PID in a marker file and exits.
+    """
+    def _start(self, event):
+        with open('%s.marker' % self.pidfile, 'w') as marker:
+            marker.write('%d\n' % os.getpid())
+
+
+class TestWatchdog(unittest.TestCase):
+    """Heartbeat and watchdog test cases.
+    """
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+
+    def _hung_child(self, pidfile):
+        """Fork a child that ignores SIGUSR1 and never beats, and name
+        it in *pidfile*.
+
+        """
+        (read_fd, write_fd) = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            signal.signal(signal.SIGUSR1, signal.SIG_IGN)
+            os.close(write_fd)
+            time.sleep(30)
+            os._exit(0)
+        os.close(write_fd)
+        # Wait until SIGUSR1 is ignored.
+        os.read(read_fd, 1)
+        os.close(read_fd)
+
+        with open(pidfile, 'w') as pid_fh:
+            pid_fh.write('%d\n' % pid)
+
+        return pid
+
+    def test_stale_heartbeat(self):
+        """Stale heartbeat marks a live daemon as hung.
+        """
+        pidfile = os.path.join(self._dir, 'stale.pid')
+        with open(pidfile, 'w') as pid_fh:
+            pid_fh.write('%d\n' % os.getpid())
+        daemon = Marker(pidfile)
+        daemon.heartbeat_timeout = 0.05
+        daemon.pet()
+
+        msg = 'Fresh heartbeat should report the daemon as running'
+        self.assertFalse(daemon.is_hung(), msg)
+        self.assertTrue(daemon.status(), msg)
+
+        time.sleep(0.1)
+        msg = 'Stale heartbeat should report the daemon as hung'
+        self.assertTrue(daemon.is_hung(), msg)
+        self.assertFalse(daemon.status(), msg)
+
+        msg = 'Hung daemon is still alive'
+        self.assertTrue(daemon.is_alive(), msg)
+        daemon.heartbeat.remove()
+
+    def test_no_heartbeat(self):
+        """Daemon that has not beaten yet is not hung.
+        """
+        pidfile = os.path.join(self._dir, 'fresh.pid')
+        daemon = Marker(pidfile)
+        daemon.heartbeat_timeout = 0.05
+
+        msg = 'Missing heartbeat should not count as hung'
+        self.assertFalse(daemon.is_hung(), msg)
+
+    def test_respawn(self):
+        """Watchdog kills a hung daemon and starts a new one.
+        """
+        pidfile = os.path.join(self._dir, 'respawn.pid')
+        hung = self._hung_child(pidfile)
+
+        daemon = Marker(pidfile)
+        daemon.heartbeat_timeout = 0.05
+        daemon.pet()
+        daemon.heartbeat.close()
+        time.sleep(0.1)
+
+        marker = '%s.marker' % pidfile
+
+        def control():
+            expires = time.time() + 5
+            while not os.path.exists(marker) and time.time() < expires:
+                time.sleep(0.01)
+            daemon.set_exit_event()
+
+        previous = signal.getsignal(signal.SIGTERM)
+        thread = threading.Thread(target=control)
+        thread.start()
+        try:
+            # Signal handlers can only be installed on the main thread.
+            daemon.watchdog(interval=0.02, grace=0.01)
+        finally:
+            thread.join(5.0)
+            signal.signal(signal.SIGTERM, previous)
+        (_, status) = os.waitpid(hung, 0)
+
+        msg = 'Hung daemon should be killed'
+        self.assertEqual(os.waitstatus_to_exitcode(status),
+                         -signal.SIGKILL,
+                         msg)
+
+        msg = 'Journal should record the PID of the killed daemon'
+        killed = [pid for (event, pid, _, _, _) in daemon.journal.records()
+                  if event == 'killed']
+        self.assertListEqual(killed, [hung], msg)
+
+        msg = 'Watchdog should start a new daemon'
+        self.assertTrue(os.path.exists(marker), msg)
+        with open(marker) as marker_fh:
+            self.assertNotEqual(int(marker_fh.read()), hung, msg)
+
+    def test_unreadable_pidfile(self):
+        """Watchdog survives a PID file it cannot read.
+        """
+        pidfile = os.path.join(self._dir, 'unreadable.pid')
+        daemon = Marker(pidfile)
+        hung = self._hung_child(pidfile)
+        with open(pidfile, 'w') as pid_fh:
+            pid_fh.write('')
+
+        daemon.heartbeat_timeout = 0.05
+        daemon.pet()
+        daemon.heartbeat.close()
+        time.sleep(0.1)
+
+        marker = '%s.marker' % pidfile
+
+        def control():
+            time.sleep(0.1)
+            with open(pidfile, 'w') as pid_fh:
+                pid_fh.write('%d\n' % hung)
+            expires = time.time() + 5
+            while not os.path.exists(marker) and time.time() < expires:
+                time.sleep(0.01)
+            daemon.set_exit_event()
+
+        previous = signal.getsignal(signal.SIGTERM)
+        thread = threading.Thread(target=control)
+        thread.start()
+        try:
+            daemon.watchdog(interval=0.02, grace=0.01)
+        finally:
+            thread.join(5.0)
+            signal.signal(signal.SIGTERM, previous)
+        (_, status) = os.waitpid(hung, 0)
+
+        msg = 'Watchdog should outlive the empty PID file and kill'
+        self.assertEqual(os.waitstatus_to_exitcode(status),
+                         -signal.SIGKILL,
+                         msg)
+
+        msg = 'Watchdog should start a new daemon'
+        self.assertTrue(os.path.exists(marker), msg)
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
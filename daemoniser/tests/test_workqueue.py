@@ -0,0 +1,179 @@
+# pylint: disable=R0904,C0103
+""":mod:`daemoniser.workqueue` tests.
+
+"""
+import os
+import time
+import tempfile
+import shutil
+import unittest
+
+from daemoniser.workqueue import (WorkQueue,
+                                  WorkQueueError)
+
+
+class TestWorkQueue(unittest.TestCase):
+    """:mod:`daemoniser.workqueue` test cases.
+    """
+    def setUp(self):
+        self._dir = tempfile.mkdtemp()
+        self._path = os.path.join(self._dir, 'test.queue')
+
+    def test_put_get(self):
+        """WorkQueue bulk enqueue and dequeue.
+        """
+        queue = WorkQueue(self._path)
+        queue.put_many([b'a', b'bb', b'ccc'])
+        received = queue.get(2) + queue.get(2) + queue.get(2)
+        queue.close()
+
+        msg = 'Items should be returned in order'
+        self.assertListEqual(received, [b'a', b'bb', b'ccc'], msg)
+
+    def test_resume_after_reopen(self):
+        """WorkQueue resumes from the last acknowledged item.
+        """
+        queue = WorkQueue(self._path)
+        queue.put_many([b'1', b'2', b'3'])
+        queue.get(1)
+        queue.ack()
+        # Read but not acknowledged -- should be delivered again.
+        queue.get(1)
+        queue.close()
+
+        queue = WorkQueue(self._path)
+        received = (queue.depth(), queue.get(10))
+        queue.put(b'4')
+        received += (queue.get(10),)
+        queue.close()
+
+        msg = 'Reopened queue should redeliver unacknowledged items'
+        self.assertEqual(received, (2, [b'2', b'3'], [b'4']), msg)
+
+    def test_segment_roll_and_trim(self):
+        """WorkQueue rolls over segments and trims consumed ones.
+        """
+        queue = WorkQueue(self._path, segment_size=64)
+        items = [('%02d' % i).encode('utf-8') * 8 for i in range(10)]
+        queue.put_many(items)
+        segments = len([n for n in os.listdir(self._path)
+                        if n.endswith('.seg')])
+        received = queue.get(100)
+        queue.ack()
+        remaining = len([n for n in os.listdir(self._path)
+                         if n.endswith('.seg')])
+        queue.close()
+
+        queue = WorkQueue(self._path, segment_size=64)
+        queue.put(b'next')
+        received.extend(queue.get(100))
+        queue.close()
+
+        msg = 'Items should survive segment roll over'
+        self.assertListEqual(received, items + [b'next'], msg)
+
+        msg = 'Consumed segments should be removed'
+        self.assertEqual((segments, remaining), (5, 0), msg)
+
+    def test_empty_item(self):
+        """WorkQueue keeps empty items and everything after them.
+        """
+        items = [b'a', b'', b'c', b'd']
+        queue = WorkQueue(self._path)
+        queue.put_many(items)
+        received = queue.get(10)
+        queue.close()
+
+        msg = 'Empty item should not end the log'
+        self.assertListEqual(received, items, msg)
+
+        queue = WorkQueue(self._path)
+        received = (queue.depth(), queue.get(10))
+        queue.put(b'e')
+        received += (queue.get(10),)
+        queue.close()
+
+        msg = 'Reopened queue should keep items after an empty one'
+        self.assertEqual(received, (4, items, [b'e']), msg)
+
+    def test_torn_tail(self):
+        """WorkQueue discards a torn write at the tail.
+        """
+        queue = WorkQueue(self._path, segment_size=4096)
+        queue.put_many([b'first', b'second'])
+        queue.close()
+
+        segment = os.path.join(self._path, sorted(os.listdir(self._path))[0])
+        with open(segment, 'r+b') as handle:
+            # Corrupt the payload of the second record.
+            handle.seek(24 + 16)
+            handle.write(b'X')
+
+        queue = WorkQueue(self._path)
+        received = queue.get(10)
+        queue.put(b'third')
+        received += queue.get(10)
+        queue.close()
+
+        msg = 'Torn record should be discarded and overwritten'
+        self.assertListEqual(received, [b'first', b'third'], msg)
+
+    def test_oversized_item(self):
+        """WorkQueue rejects items larger than a segment.
+        """
+        queue = WorkQueue(self._path, segment_size=64)
+
+        msg = 'Oversized item should raise WorkQueueError'
+        with self.assertRaises(WorkQueueError, msg=msg):
+            queue.put(b'x' * 64)
+        queue.close()
+
+    def test_other_writer(self):
+        """WorkQueue reader sees items appended by another instance.
+        """
+        reader = WorkQueue(self._path, segment_size=64)
+        msg = 'Empty queue should return no items'
+        self.assertListEqual(reader.get(10), [], msg)
+
+        writer = WorkQueue(self._path, segment_size=64)
+        writer.put_many([b'a', b'b', b'c' * 40, b'd'])
+        received = reader.get(10)
+        writer.close()
+
+        msg = 'Reader should pick up items across a segment roll'
+        self.assertListEqual(received, [b'a', b'b', b'c' * 40, b'd'], msg)
+
+        msg = 'Reader depth should follow the other writer'
+        self.assertEqual(reader.depth(), 4, msg)
+        reader.close()
+
+    def test_idle_sync(self):
+        """WorkQueue flushes the last group of a burst when idle.
+        """
+        queue = WorkQueue(self._path, commit_interval=0.05)
+        queue.put(b'first')
+        queue.put(b'second')
+
+        msg = 'Second put within the interval should be deferred'
+        self.assertTrue(queue._dirty, msg)
+
+        time.sleep(0.2)
+        msg = 'Timer should flush the deferred writes'
+        self.assertFalse(queue._dirty, msg)
+        queue.close()
+
+    def test_consumer_name(self):
+        """WorkQueue rejects consumer names that are not plain words.
+        """
+        queue = WorkQueue(self._path)
+
+        msg = 'Path-like consumer name should raise WorkQueueError'
+        with self.assertRaises(WorkQueueError, msg=msg):
+            queue.get(consumer='../escape')
+        with self.assertRaises(WorkQueueError, msg=msg):
+            queue.ack(consumer='')
+        queue.get(consumer='worker_1-a')
+        queue.close()
+
+    def tearDown(self):
+        shutil.rmtree(self._dir)
@@ -0,0 +1,158 @@
+# pylint: disable=R0904,C0103
+""":mod:`daemoniser.zygote` tests.
+
+"""
+import os
+import time
+import signal
+import socket
+import tempfile
+import threading
+import shutil
+import unittest
+
+from daemoniser.daemon import (Daemon,
+                               DaemonError)
+from daemoniser.zygote import (Zygote,
+                               launch)
+
+TARGET = 'daemoniser.tests.test_zygote:Sleeper'
+
+
+class Sleeper(Daemon):
+    def _start(self, event):
+        self.handle_signal(signal.SIGTERM, self._exit_handler)
+        event.wait(30)
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+
+    return True
+
+
+class TestZygote(unittest.TestCase):
+    """:mod:`daemoniser.zygote` test cases.
+    """
+    @classmethod
+    def setUpClass(cls):
+        cls._dir = tempfile.mkdtemp()
+        cls._socket = os.path.join(cls._dir, 'zygote.sock')
+
+        cls._zygote_pid = os.fork()
+        if cls._zygote_pid == 0:
+            status = 0
+            try:
+                zygote = Zygote(os.path.join(cls._dir, 'zygote.pid'),
+                                cls._socket,
+                                preload=['json'])
+                zygote.inline = True
+                zygote.start()
+            except BaseException:
+                status = 1
+            finally:
+                os._exit(status)
+
+        expires = time.time() + 5
+        while not os.path.exists(cls._socket) and time.time() < expires:
+            time.sleep(0.01)
+
+    def _pidfile(self, name):
+        return os.path.join(self._dir, '%s.pid' % name)
+
+    def _wait_for(self, predicate):
+        expires = time.time() + 5
+        while not predicate() and time.time() < expires:
+            time.sleep(0.01)
+
+        return predicate()
+
+    def test_socket_mode(self):
+        """Launch socket is private to the zygote user.
+        """
+        msg = 'Zygote socket should be mode 0600'
+        self.assertEqual(os.stat(self._socket).st_mode & 0o777, 0o600, msg)
+
+    def test_live_socket_kept(self):
+        """Second zygote on a live socket path.
+        """
+        pid = os.fork()
+        if pid == 0:
+            status = 1
+            try:
+                zygote = Zygote(self._pidfile('second'), self._socket)
+                zygote._start(threading.Event())
+            except OSError:
+                status = 0
+            finally:
+                os._exit(status)
+
+        (_, status) = os.waitpid(pid, 0)
+        msg = 'Second zygote should fail to bind the live socket'
+        self.assertEqual(os.WEXITSTATUS(status), 0, msg)
+
+        msg = 'Live zygote socket should be left in place'
+        self.assertTrue(os.path.exists(self._socket), msg)
+
+        msg = 'Live zygote should still accept launch requests'
+        with self.assertRaises(DaemonError, msg=msg):
+            launch(self._socket,
+                   'daemoniser.tests.test_zygote:Missing',
+                   self._pidfile('second'))
+
+    def test_peer_uid(self):
+        """SO_PEERCRED peer user ID.
+        """
+        (left, right) = socket.socketpair(socket.AF_UNIX)
+        try:
+            msg = 'Peer UID should be our own'
+            self.assertEqual(Zygote.peer_uid(left), os.geteuid(), msg)
+        finally:
+            left.close()
+            right.close()
+
+    def test_launch(self):
+        """Launch a daemon through the zygote.
+        """
+        pidfile = self._pidfile('launch')
+        pid = launch(self._socket, TARGET, pidfile)
+
+        msg = 'Launched daemon should write its PID file'
+        self.assertTrue(self._wait_for(lambda: os.path.exists(pidfile) and
+                                       os.path.getsize(pidfile)), msg)
+
+        msg = 'Launched daemon should be running'
+        self.assertTrue(_alive(pid), msg)
+
+        msg = 'PID file should hold the launched PID'
+        with open(pidfile) as pid_fh:
+            self.assertEqual(int(pid_fh.read().split()[0]), pid, msg)
+
+        msg = 'Second launch with the same PID file should fail'
+        with self.assertRaises(DaemonError, msg=msg):
+            launch(self._socket, TARGET, pidfile)
+
+        msg = 'Launched daemon stop error'
+        self.assertTrue(Sleeper(pidfile).stop(), msg)
+
+        msg = 'Stopped daemon should remove its PID file'
+        self.assertTrue(self._wait_for(lambda: not os.path.exists(pidfile)),
+                        msg)
+
+    def test_launch_unknown_target(self):
+        """Launch request for a target that cannot be imported.
+        """
+        msg = 'Unknown target should raise DaemonError'
+        with self.assertRaises(DaemonError, msg=msg):
+            launch(self._socket,
+                   'daemoniser.tests.test_zygote:Missing',
+                   self._pidfile('unknown'))
+
+    @classmethod
+    def tearDownClass(cls):
+        os.kill(cls._zygote_pid, signal.SIGTERM)
+        os.waitpid(cls._zygote_pid, 0)
+        shutil.rmtree(cls._dir)
@@ -0,0 +1,209 @@
+"""The :mod:`daemoniser.waiter` module provides a single blocking wait
+that returns as soon as anything a daemon cares about happens: a file
+descriptor becomes ready, a signal arrives, a timer expires or the
+daemon is asked to exit.
+
+"""
+__all__ = [
+    "Waiter",
+    "WaitEvent",
+]
+
+import os
+import heapq
+import signal
+import itertools
+import selectors
+import collections
+import time
+
+from logga.log import log
+
+#: A single reason for :meth:`Waiter.wait` to return.  *kind* is one of
+#: ``"exit"``, ``"signal"``, ``"fd"`` or ``"timer"``.  *source* is the
+#: signal number, file object or timer token and *data* is the value
+#: supplied on registration.
+WaitEvent = collections.namedtuple('WaitEvent', ['kind', 'source', 'data'])
+
+_WAKEUP = object()
+
+
+class Waiter(object):
+    """Selector based wait on an exit event, signals, file descriptors
+    and timers.
+
+    Signals and :meth:`wakeup` calls are delivered through a non-blocking
+    self-pipe (Python's :func:`signal.set_wakeup_fd`) that is registered
+    with the selector alongside user file descriptors, so nothing needs
+    to be polled.
+
+    .. attribute:: exit_event
+
+        :class:`threading.Event` that causes :meth:`wait` to report an
+        ``"exit"`` event once set
+
+    """
+
+    def __init__(self, exit_event=None):
+        """Waiter initialiser.
+
+        **Kwargs:**
+            exit_event (:class:`threading.Event`): Exit semaphore.  Whoever
+            sets it should also call :meth:`wakeup`.
+
+        """
+        self.exit_event = exit_event
+
+        self._selector = selectors.DefaultSelector()
+        (self._read_fd, self._write_fd) = os.pipe()
+        os.set_blocking(self._read_fd, False)
+        os.set_blocking(self._write_fd, False)
+        self._selector.register(self._read_fd, selectors.EVENT_READ, _WAKEUP)
+
+        self._signals = set()
+        self._previous_wakeup_fd = None
+        self._timers = []
+        self._sequence = itertools.count()
+        self._cancelled = set()
+
+    def wakeup(self):
+        """Make a blocked (or the next) :meth:`wait` return immediately.
+
+        Safe to call from signal handlers and other threads.
+
+        """
+        try:
+            os.write(self._write_fd, b'\0')
+        except (BlockingIOError, OSError):
+            # Pipe is full -- a wakeup is already pending.
+            pass
+
+    def add_signal(self, signum):
+        """Report *signum* from :meth:`wait`.
+
+        An existing Python-level handler for *signum* is left in place
+        and still runs.  Otherwise, a no-op handler is installed so the
+        signal no longer takes its default action.  Must be called from
+        the main thread.
+
+        """
+        if self._previous_wakeup_fd is None:
+            self._previous_wakeup_fd = signal.set_wakeup_fd(self._write_fd)
+
+        current = signal.getsignal(signum)
+        if current in (signal.SIG_DFL, signal.SIG_IGN, None):
+            signal.signal(signum, self._noop_handler)
+
+        self._signals.add(signum)
+
+    @staticmethod
+    def _noop_handler(signum, frame):
+        pass
+
+    def register(self, fileobj, data=None, events=selectors.EVENT_READ):
+        """Report readiness of *fileobj* from :meth:`wait`.
+
+        **Args:**
+            fileobj: File descriptor or object with a ``fileno`` method.
+
+        **Kwargs:**
+            data: Value returned with the event.
+
+            events (int): :mod:`selectors` event mask.
+
+        """
+        self._selector.register(fileobj, events, data)
+
+    def unregister(self, fileobj):
+        self._selector.unregister(fileobj)
+
+    def call_later(self, delay, data=None):
+        """Report a ``"timer"`` event after *delay* seconds.
+
+        **Returns:**
+            timer token that can be passed to :meth:`cancel`
+
+        """
+        token = next(self._sequence)
+        heapq.heappush(self._timers, (time.monotonic() + delay, token, data))
+
+        return token
+
+    def cancel(self, token):
+        self._cancelled.add(token)
+
+    def wait(self, timeout=None):
+        """Block until at least one event is ready or *timeout* expires.
+
+        **Kwargs:**
+            timeout (float): Seconds to wait.  ``None`` waits forever.
+
+        **Returns:**
+            list of :data:`WaitEvent` tuples (empty on timeout)
+
+        """
+        ready = self._expired_timers()
+        if self.exit_event is not None and self.exit_event.is_set():
+            ready.append(WaitEvent('exit', None, None))
+        if ready:
+            timeout = 0
+
+        if self._timers:
+            until_timer = max(0.0, self._timers[0][0] - time.monotonic())
+            if timeout is None or until_timer < timeout:
+                timeout = until_timer
+
+        for key, mask in self._selector.select(timeout):
+            if key.data is _WAKEUP:
+                ready.extend(self._drain())
+            else:
+                ready.append(WaitEvent('fd', key.fileobj, key.data))
+
+        if timeout != 0:
+            ready.extend(self._expired_timers())
+            if (self.exit_event is not None and
+               self.exit_event.is_set() and
+               not any(event.kind == 'exit' for event in ready)):
+                ready.append(WaitEvent('exit', None, None))
+
+        return ready
+
+    def _drain(self):
+        events = []
+        try:
+            while True:
+                data = os.read(self._read_fd, 512)
+                if not data:
+                    break
+                for signum in bytearray(data):
+                    if signum in self._signals:
+                        events.append(WaitEvent('signal', signum, None))
+        except (BlockingIOError, InterruptedError):
+            pass
+
+        return events
+
+    def _expired_timers(self):
+        events = []
+        now = time.monotonic()
+        while self._timers and self._timers[0][0] <= now:
+            (_, token, data) = heapq.heappop(self._timers)
+            if token in self._cancelled:
+                self._cancelled.discard(token)
+                continue
+            events.append(WaitEvent('timer', token, data))
+
+        return events
+
+    def close(self):
+        """Release the self-pipe and selector.
+        """
+        if self._previous_wakeup_fd is not None:
+            try:
+                signal.set_wakeup_fd(self._previous_wakeup_fd)
+            except ValueError as error:
+                log.debug('Unable to restore wakeup fd: %s' % error)
+            self._previous_wakeup_fd = None
+        self._selector.close()
+        os.close(self._read_fd)
+        os.close(self._write_fd)
@@ -0,0 +1,556 @@
+"""The :mod:`daemoniser.workqueue` module provides a durable, single host
+work queue so that a daemon can resume exactly where it left off after
+a stop or restart.
+
+The queue is an append-only log of fixed size, memory-mapped segment
+files in a directory.  Each record carries its length, a CRC32 of the
+payload and a sequence number, so a torn write at the tail is detected
+and discarded when the queue is reopened.  Each named consumer has its
+own committed offset, stored in a small file alongside the segments.
+Segments that every consumer has moved past are deleted.
+
+Writes land in the page cache straight away (and so survive the process
+being killed).  They are flushed to disk in groups: at most once every
+:attr:`WorkQueue.commit_interval` seconds (a timer flushes the last
+group of a burst) and on :meth:`WorkQueue.sync` or
+:meth:`WorkQueue.close`.  A machine crash loses at most the last
+interval of writes.
+
+A queue supports a single writing process at a time.  Readers validate
+records in the shared mapping as they go, so :meth:`WorkQueue.get` also
+sees items appended by another process or :class:`WorkQueue` instance::
+
+    >>> queue = WorkQueue('/var/tmp/jobs.queue')
+    >>> queue.put_many([b'job-1', b'job-2'])
+    >>> for item in queue.get(max_items=64):
+    ...     process(item)
+    >>> queue.ack()
+
+"""
+__all__ = [
+    "WorkQueue",
+    "WorkQueueError",
+]
+
+import os
+import re
+import mmap
+import time
+import zlib
+import struct
+import threading
+
+from logga.log import log
+
+#: Record header: payload length plus one (so that zero fill never reads
+#: as a record), payload CRC32 and sequence number.
+RECORD = struct.Struct('=IIQ')
+
+#: Committed consumer position: byte offset and sequence number.
+OFFSET = struct.Struct('=QQ')
+
+#: Length marker that sends readers on to the next segment.
+ROLL = 0xFFFFFFFF
+
+ALIGN = 8
+
+CONSUMER = re.compile(r'^[A-Za-z0-9_-]+$')
+
+
+class WorkQueueError(Exception):
+    """Raised when an item cannot be enqueued or a consumer name is
+    invalid.
+
+    .. attribute:: msg
+
+        An explanation of the error.
+    """
+
+    def __init__(self, value):
+        self.msg = value
+
+    def __str__(self):
+        return repr(self.msg)
+
+
+def _align(size):
+    return (size + ALIGN - 1) // ALIGN * ALIGN
+
+
+def _check_consumer(consumer):
+    """Consumer names become offset file names, so only
+    ``[A-Za-z0-9_-]`` is allowed.
+
+    """
+    if not isinstance(consumer, str) or not CONSUMER.match(consumer):
+        raise WorkQueueError('Invalid consumer name %r' % (consumer,))
+
+
+class WorkQueue(object):
+    """Append-only, memory-mapped segment log with consumer offsets.
+
+    .. attribute:: path
+
+        directory that holds the segments and consumer offsets
+
+    .. attribute:: segment_size
+
+        size of each segment file in bytes (taken from existing
+        segments when the queue is reopened)
+
+    .. attribute:: commit_interval
+
+        maximum number of seconds between flushes to disk.  ``0``
+        flushes on every :meth:`put_many` and :meth:`ack`
+
+    """
+    _segment_size = 64 * 1024 * 1024
+    _commit_interval = 0.05
+
+    def __init__(self, path, segment_size=None, commit_interval=None):
+        """WorkQueue initialiser.
+
+        Opens (creating, if required) the queue at *path* and recovers
+        the write position from the last segment.
+
+        **Args:**
+            path (str): Queue directory.
+
+        **Kwargs:**
+            segment_size (int): Bytes per segment for a new queue.
+
+            commit_interval (float): Seconds between group commits.
+
+        """
+        self._path = path
+        if segment_size is not None:
+            self._segment_size = _align(segment_size)
+        if commit_interval is not None:
+            self._commit_interval = commit_interval
+
+        self._lock = threading.Lock()
+        self._segments = {}
+        self._dirty = set()
+        self._offsets = {}
+        self._offset_fds = {}
+        self._dirty_offsets = set()
+        self._reads = {}
+        self._last_sync = time.monotonic()
+        self._timer = None
+
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+        for name in os.listdir(path):
+            if name.endswith('.offset'):
+                self._load_offset(name[:-len('.offset')])
+
+        indexes = self._segment_indexes()
+        if indexes:
+            first = self._segment_path(indexes[0])
+            self._segment_size = os.path.getsize(first)
+        self._recover(indexes)
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def segment_size(self):
+        return self._segment_size
+
+    @property
+    def commit_interval(self):
+        return self._commit_interval
+
+    @commit_interval.setter
+    def commit_interval(self, value):
+        self._commit_interval = value
+
+    def _segment_indexes(self):
+        return sorted(int(name[:-len('.seg')])
+                      for name in os.listdir(self.path)
+                      if name.endswith('.seg'))
+
+    def _segment_path(self, index):
+        return os.path.join(self.path, '%020d.seg' % index)
+
+    def _segment(self, index, create=False):
+        """Memory map of segment *index* (``None`` if it does not exist
+        and *create* is not set).
+
+        """
+        segment = self._segments.get(index)
+        if segment is None:
+            flags = os.O_RDWR
+            if create:
+                flags |= os.O_CREAT
+            try:
+                fd = os.open(self._segment_path(index), flags, 0o644)
+            except OSError:
+                return None
+            try:
+                if create:
+                    os.ftruncate(fd, self.segment_size)
+                segment = mmap.mmap(fd, self.segment_size)
+            finally:
+                os.close(fd)
+            self._segments[index] = segment
+
+        return segment
+
+    def _recover(self, indexes):
+        """Find the write position and next sequence number by scanning
+        back from the last segment.
+
+        """
+        # With every segment trimmed, resume after the furthest consumer.
+        self._head = max([offset for offset, _ in self._offsets.values()] or
+                         [0])
+        self._next_seq = max([seq for _, seq in self._offsets.values()] or
+                             [0])
+        if indexes:
+            self._head = indexes[0] * self.segment_size
+
+        for index in reversed(indexes):
+            base = index * self.segment_size
+            (head, next_seq, count) = self._scan(index, base)
+            if count or index == indexes[0]:
+                self._head = head
+                if count:
+                    self._next_seq = next_seq
+                break
+
+        # Anything past the head is a torn or never durable write.
+        # Clear it so that it cannot be mistaken for a record later.
+        index = self._head // self.segment_size
+        segment = self._segment(index)
+        if segment is not None:
+            self._clear(index, segment, self._head % self.segment_size)
+            for stale in indexes:
+                if stale > index:
+                    self._drop_segment(stale)
+
+        for name in self._offsets:
+            self._reads[name] = list(self._offsets[name])
+
+        log.debug('Work queue "%s" opened at offset %d (next sequence %d)' %
+                  (self.path, self._head, self._next_seq))
+
+    def _clear(self, index, segment, position, chunk=1024 * 1024):
+        """Zero *segment* from *position* onwards.
+
+        Chunks that are already zero are left alone so that the holes
+        of a sparse segment file are not allocated.
+
+        """
+        zeros = bytes(chunk)
+        while position < self.segment_size:
+            end = min(position + chunk, self.segment_size)
+            if segment[position:end] != zeros[:end - position]:
+                segment[position:end] = zeros[:end - position]
+                self._dirty.add(index)
+            position = end
+
+    def _scan(self, index, base):
+        """Walk the valid records of segment *index*.
+
+        **Returns:**
+            tuple of the offset after the last record, the next sequence
+            number and the number of records
+
+        """
+        segment = self._segment(index)
+        position = 0
+        next_seq = None
+        count = 0
+        while position + RECORD.size <= self.segment_size:
+            (stored, crc, seq) = RECORD.unpack_from(segment, position)
+            if stored == ROLL:
+                return ((index + 1) * self.segment_size, next_seq, count)
+            start = position + RECORD.size
+            length = stored - 1
+            if (not stored or
+               start + length > self.segment_size or
+               (next_seq is not None and seq != next_seq) or
+               zlib.crc32(segment[start:start + length]) != crc):
+                break
+            next_seq = seq + 1
+            count += 1
+            position = _align(start + length)
+
+        return (base + position, next_seq, count)
+
+    def put(self, item):
+        """Append a single *item* (bytes).
+
+        **Returns:**
+            sequence number of the item
+
+        """
+        return self.put_many([item])
+
+    def put_many(self, items):
+        """Append *items* (an iterable of bytes) as one group.
+
+        **Returns:**
+            sequence number of the last item
+
+        **Raises:**
+            :class:`WorkQueueError` if an item does not fit in a segment
+
+        """
+        with self._lock:
+            for item in items:
+                length = len(item)
+                need = _align(RECORD.size + length)
+                if need > self.segment_size:
+                    raise WorkQueueError('Item of %d bytes exceeds segment '
+                                         'size %d' %
+                                         (length, self.segment_size))
+
+                index = self._head // self.segment_size
+                position = self._head % self.segment_size
+                if position + need > self.segment_size:
+                    if position + RECORD.size <= self.segment_size:
+                        RECORD.pack_into(self._segment(index, create=True),
+                                         position,
+                                         ROLL,
+                                         0,
+                                         0)
+                        self._dirty.add(index)
+                    index += 1
+                    position = 0
+
+                segment = self._segment(index, create=True)
+                start = position + RECORD.size
+                segment[start:start + length] = item
+                # Header last, so that a torn write fails its CRC check.
+                RECORD.pack_into(segment,
+                                 position,
+                                 length + 1,
+                                 zlib.crc32(item),
+                                 self._next_seq)
+                self._dirty.add(index)
+                self._head = index * self.segment_size + position + need
+                self._next_seq += 1
+
+            self._maybe_sync()
+
+            return self._next_seq - 1
+
+    def get(self, max_items=1, consumer='default'):
+        """Read up to *max_items* from *consumer*'s read position.
+
+        Items are redelivered after a restart (or :meth:`rewind`) until
+        they are acknowledged with :meth:`ack`.
+
+        Records are read up to the first one that is not (yet) valid
+        rather than up to this instance's own write position, so items
+        appended by another writer are picked up.
+
+        **Returns:**
+            list of items (empty when the queue is drained)
+
+        **Raises:**
+            :class:`WorkQueueError` if *consumer* is not a valid name
+
+        """
+        _check_consumer(consumer)
+
+        with self._lock:
+            read = self._reads.get(consumer)
+            if read is None:
+                read = self._reads[consumer] = self._start_position()
+
+            items = []
+            while len(items) < max_items:
+                index = read[0] // self.segment_size
+                position = read[0] % self.segment_size
+                segment = self._segment(index)
+                if segment is None:
+                    indexes = self._segment_indexes()
+                    if indexes and indexes[0] > index:
+                        # Trimmed while this consumer was behind.
+                        read[:] = self._start_position()
+                        continue
+                    break
+                if position + RECORD.size > self.segment_size:
+                    read[0] = (index + 1) * self.segment_size
+                    continue
+                (stored, crc, seq) = RECORD.unpack_from(segment, position)
+                if stored == ROLL:
+                    read[0] = (index + 1) * self.segment_size
+                    continue
+                start = position + RECORD.size
+                length = stored - 1
+                if (not stored or
+                   start + length > self.segment_size or
+                   seq < read[1] or
+                   zlib.crc32(segment[start:start + length]) != crc):
+                    break
+                items.append(bytes(segment[start:start + length]))
+                read[0] += _align(RECORD.size + length)
+                read[1] = seq + 1
+
+            if read[0] > self._head:
+                # Appended by another writer.
+                self._head = read[0]
+                self._next_seq = read[1]
+
+            if self._dirty or self._dirty_offsets:
+                self._maybe_sync()
+
+            return items
+
+    def _start_position(self):
+        """Position of a new consumer: the oldest retained record.
+        """
+        indexes = self._segment_indexes()
+        if not indexes:
+            return [self._head, self._next_seq]
+
+        index = indexes[0]
+        (stored, _, seq) = RECORD.unpack_from(self._segment(index), 0)
+        if not stored or stored == ROLL:
+            seq = self._next_seq
+
+        return [index * self.segment_size, seq]
+
+    def ack(self, consumer='default'):
+        """Commit *consumer*'s read position, so that items returned by
+        :meth:`get` are not delivered again.
+
+        **Raises:**
+            :class:`WorkQueueError` if *consumer* is not a valid name
+
+        """
+        _check_consumer(consumer)
+
+        with self._lock:
+            read = self._reads.get(consumer)
+            if read is None:
+                return
+            self._offsets[consumer] = tuple(read)
+            fd = self._offset_fd(consumer)
+            os.pwrite(fd, OFFSET.pack(*read), 0)
+            self._dirty_offsets.add(consumer)
+            self._trim()
+            self._maybe_sync()
+
+    def rewind(self, consumer='default'):
+        """Move *consumer*'s read position back to its last :meth:`ack`.
+        """
+        _check_consumer(consumer)
+
+        with self._lock:
+            committed = self._offsets.get(consumer)
+            if committed is None:
+                self._reads.pop(consumer, None)
+            else:
+                self._reads[consumer] = list(committed)
+
+    def depth(self, consumer='default'):
+        """Number of items not yet acknowledged by *consumer*.
+        """
+        _check_consumer(consumer)
+
+        with self._lock:
+            committed = self._offsets.get(consumer)
+            if committed is None:
+                committed = self._start_position()
+
+            return self._next_seq - committed[1]
+
+    def _offset_path(self, consumer):
+        return os.path.join(self.path, '%s.offset' % consumer)
+
+    def _offset_fd(self, consumer):
+        fd = self._offset_fds.get(consumer)
+        if fd is None:
+            fd = os.open(self._offset_path(consumer),
+                         os.O_RDWR | os.O_CREAT,
+                         0o644)
+            self._offset_fds[consumer] = fd
+
+        return fd
+
+    def _load_offset(self, consumer):
+        with open(self._offset_path(consumer), 'rb') as offset:
+            data = offset.read(OFFSET.size)
+        if len(data) == OFFSET.size:
+            self._offsets[consumer] = OFFSET.unpack(data)
+
+    def _trim(self):
+        """Delete segments that every consumer has moved past.
+        """
+        if not self._offsets:
+            return
+
+        oldest = min(offset for offset, _ in self._offsets.values())
+        for index in self._segment_indexes():
+            if ((index + 1) * self.segment_size > oldest or
+               (index + 1) * self.segment_size > self._head):
+                break
+            self._drop_segment(index)
+
+    def _drop_segment(self, index):
+        log.debug('Work queue "%s" removing segment %d' % (self.path, index))
+        segment = self._segments.pop(index, None)
+        if segment is not None:
+            segment.close()
+        self._dirty.discard(index)
+        os.remove(self._segment_path(index))
+
+    def _maybe_sync(self):
+        """Flush now if :attr:`commit_interval` has passed since the
+        last flush.  Otherwise make sure that a timer will.
+
+        """
+        elapsed = time.monotonic() - self._last_sync
+        if elapsed >= self.commit_interval:
+            self._sync()
+        elif self._timer is None:
+            self._timer = threading.Timer(self.commit_interval - elapsed,
+                                          self._deferred_sync)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _deferred_sync(self):
+        with self._lock:
+            self._timer = None
+            self._sync()
+
+    def sync(self):
+        """Flush outstanding writes and consumer offsets to disk.
+        """
+        with self._lock:
+            self._sync()
+
+    def _sync(self):
+        for index in self._dirty:
+            segment = self._segments.get(index)
+            if segment is not None:
+                segment.flush()
+        self._dirty.clear()
+
+        for consumer in self._dirty_offsets:
+            os.fsync(self._offset_fds[consumer])
+        self._dirty_offsets.clear()
+
+        self._last_sync = time.monotonic()
+
+    def close(self):
+        """Flush to disk and release the segment mappings.
+        """
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._sync()
+            for segment in self._segments.values():
+                segment.close()
+            self._segments.clear()
+            for fd in self._offset_fds.values():
+                os.close(fd)
+            self._offset_fds.clear()
@@ -0,0 +1,281 @@
+"""The :mod:`daemoniser.zygote` module provides a fork-server that
+launches short-lived daemons without paying for interpreter start up,
+imports and the :meth:`daemoniser.Daemon.daemonize` double fork on
+every run.
+
+A :class:`Zygote` is itself a :class:`daemoniser.Daemon`, so it is
+started and stopped like any other daemon.  Once running, it imports
+the application modules once and then waits for launch requests on a
+Unix domain socket.  Each request costs a single :func:`os.fork`.  The
+child detaches itself, writes its own PID file and runs the requested
+:class:`daemoniser.Daemon` subclass::
+
+    >>> from daemoniser.zygote import launch
+    >>> launch('/var/tmp/zygote.sock',
+    ...        'myapp.jobs:ReportDaemon',
+    ...        '/var/tmp/report-42.pid',
+    ...        kwargs={'report_id': 42})
+    31337
+
+The socket is created with mode ``0600`` and requests from peers with a
+different user ID (as reported by ``SO_PEERCRED``) are refused, as a
+launch request runs arbitrary importable code.
+
+"""
+__all__ = [
+    "Zygote",
+    "launch",
+]
+
+import os
+import sys
+import json
+import signal
+import struct
+import socket
+import importlib
+
+from logga.log import log
+from daemoniser import activation
+from daemoniser.daemon import (Daemon,
+                               DaemonError)
+
+# struct ucred: pid, uid, gid.
+UCRED = struct.Struct('=iII')
+
+
+class Zygote(Daemon):
+    """Fork-server for :class:`daemoniser.Daemon` subclasses.
+
+    A launch request is a single line of JSON::
+
+        {"target": "module:Class", "pidfile": "/path", "kwargs": {}}
+
+    The reply is a single line of JSON holding either the ``pid`` of
+    the launched daemon or an ``error``.
+
+    .. attribute:: socket_path
+
+        location of the Unix domain socket that accepts launch requests
+
+    .. attribute:: preload
+
+        list of module names to import before serving requests
+
+    """
+    _socket_path = None
+
+    def __init__(self, pidfile, socket_path, preload=None, term_parent=True):
+        """Zygote initialiser.
+
+        **Args:**
+            pidfile (str): Path to the zygote's PID file.
+
+            socket_path (str): Path to the launch request socket.
+
+        **Kwargs:**
+            preload (list): Module names to import before serving.
+
+            term_parent (boolean): See :class:`daemoniser.Daemon`.
+
+        """
+        self._socket_path = socket_path
+        self._preload = list(preload or [])
+        self._server = None
+
+        super(Zygote, self).__init__(pidfile, term_parent=term_parent)
+
+    @property
+    def socket_path(self):
+        return self._socket_path
+
+    @property
+    def preload(self):
+        return self._preload
+
+    def _start(self, event):
+        self.handle_signal(signal.SIGTERM, self._exit_handler)
+
+        # Launched daemons are not waited on -- let the kernel reap them.
+        self.handle_signal(signal.SIGCHLD, signal.SIG_IGN)
+
+        for name in self.preload:
+            log.debug('Zygote preloading "%s"' % name)
+            importlib.import_module(name)
+
+        # A live zygote's socket is left alone, so bind fails.
+        activation._remove_stale(self.socket_path)
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        umask = os.umask(0o177)
+        try:
+            self._server.bind(self.socket_path)
+        finally:
+            os.umask(umask)
+        os.chmod(self.socket_path, 0o600)
+        self._server.listen(128)
+        self._server.settimeout(1.0)
+        log.info('Zygote serving launch requests on "%s"' %
+                 self.socket_path)
+
+        try:
+            while not event.is_set():
+                try:
+                    (conn, _) = self._server.accept()
+                except socket.timeout:
+                    continue
+                except (OSError, socket.error) as error:
+                    if event.is_set():
+                        break
+                    log.error('Zygote accept error: %s' % error)
+                    continue
+                self._serve(conn)
+        finally:
+            self._server.close()
+            os.remove(self.socket_path)
+
+    @staticmethod
+    def peer_uid(conn):
+        """User ID of the process at the other end of *conn*.
+        """
+        (_, uid, _) = UCRED.unpack(conn.getsockopt(socket.SOL_SOCKET,
+                                                   socket.SO_PEERCRED,
+                                                   UCRED.size))
+
+        return uid
+
+    def _serve(self, conn):
+        """Handle a single launch request on *conn*.
+
+        Requests from other users are refused.
+
+        """
+        uid = self.peer_uid(conn)
+        if uid != os.geteuid():
+            log.warn('Zygote refused launch request from UID %d' % uid)
+            conn.close()
+            return
+
+        conn.settimeout(5.0)
+        try:
+            with conn.makefile('rwb') as stream:
+                request = json.loads(stream.readline().decode('utf-8'))
+                try:
+                    reply = {'pid': self.spawn(conn, **request)}
+                except Exception as error:
+                    log.error('Zygote launch failed: %s' % error)
+                    reply = {'error': getattr(error, 'msg', str(error))}
+                stream.write(json.dumps(reply).encode('utf-8') + b'\n')
+        except (ValueError, TypeError, OSError, socket.error) as error:
+            log.error('Zygote request error: %s' % error)
+        finally:
+            conn.close()
+
+    def spawn(self, conn, target, pidfile, kwargs=None):
+        """Fork and run *target* as a daemon.
+
+        **Args:**
+            conn (:class:`socket.socket`): Client connection (closed in
+            the child).
+
+            target (str): ``"module:Class"`` of a
+            :class:`daemoniser.Daemon` subclass.
+
+            pidfile (str): PID file for the launched daemon.
+
+        **Kwargs:**
+            kwargs (dict): Additional keyword arguments for the
+            *target* initialiser.
+
+        **Returns:**
+            PID of the launched daemon
+
+        **Raises:**
+            :mod:`daemoniser.DaemonError` if *target* cannot be resolved
+
+        """
+        (module_name, _, class_name) = target.partition(':')
+        try:
+            cls = getattr(importlib.import_module(module_name), class_name)
+        except (ImportError, AttributeError, ValueError) as error:
+            raise DaemonError('Unable to resolve "%s": %s' % (target, error))
+
+        if os.path.exists(pidfile):
+            raise DaemonError('PID file "%s" exists' % pidfile)
+
+        pid = os.fork()
+        if pid > 0:
+            log.info('Zygote launched %s with PID %d' % (target, pid))
+            return pid
+
+        status = 0
+        try:
+            conn.close()
+            self._server.close()
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            os.setsid()
+            os.chdir('/')
+            os.umask(0)
+
+            daemon = cls(pidfile, **(kwargs or {}))
+            daemon._detach()
+            try:
+                daemon._run()
+            finally:
+                daemon._delpid()
+        except SystemExit as error:
+            status = error.code or 0
+        except BaseException:
+            log.exception('%s launched by zygote failed' % target)
+            status = 1
+        finally:
+            # Never return into the zygote's serving loop.
+            sys.stdout.flush()
+            os._exit(status)
+
+
+def launch(socket_path, target, pidfile, kwargs=None, timeout=5.0):
+    """Ask the :class:`Zygote` listening on *socket_path* to launch
+    *target*.
+
+    **Args:**
+        socket_path (str): Path to the zygote's launch request socket.
+
+        target (str): ``"module:Class"`` of a :class:`daemoniser.Daemon`
+        subclass.
+
+        pidfile (str): PID file for the launched daemon.
+
+    **Kwargs:**
+        kwargs (dict): Additional keyword arguments for the *target*
+        initialiser.
+
+        timeout (float): Seconds to wait for the zygote to reply.
+
+    **Returns:**
+        PID of the launched daemon
+
+    **Raises:**
+        :mod:`daemoniser.DaemonError` if the launch failed
+
+    """
+    request = {'target': target, 'pidfile': pidfile, 'kwargs': kwargs or {}}
+
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(timeout)
+    try:
+        client.connect(socket_path)
+        with client.makefile('rwb') as stream:
+            stream.write(json.dumps(request).encode('utf-8') + b'\n')
+            stream.flush()
+            reply = json.loads(stream.readline().decode('utf-8'))
+    except (OSError, socket.error, ValueError) as error:
+        raise DaemonError('Zygote launch via "%s" failed: %s' %
+                          (socket_path, error))
+    finally:
+        client.close()
+
+    if 'error' in reply:
+        raise DaemonError(reply['error'])
+
+    return reply['pid']
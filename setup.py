@@ -48,7 +48,8 @@ def find_data_files(srcdir, *wildcards, **kw):
     file_list = []
     recursive = kw.get('recursive', True)
     if recursive:
-        os.path.walk(srcdir, walk_helper, (file_list, wildcards))
+        for dirname, _, files in os.walk(srcdir):
+            walk_helper((file_list, wildcards), dirname, files)
     else:
         source_files = glob.glob(opj(srcdir, '*'))
         walk_helper((file_list, wildcards),
@@ -63,4 +64,7 @@ setup(name='python-daemoniser',
       author='Lou Markovski',
       author_email='lou.markovski@gmail.com',
       url='https://www.triple20.com',
+      python_requires='>=3.9',
+      extras_require={'testing': ['pytest']},
+      classifiers=['Programming Language :: Python :: 3 :: Only'],
       packages=['daemoniser'])